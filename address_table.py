@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# address_table.py - module contains class holding precomputed lookup tables of addresses stack owns and listens on
+#
+
+
+from ipv4_address import IPv4Address
+from ipv6_address import IPv6Address
+
+
+class AddressTable:
+    """ Read only snapshot of stack addresses, packet handler builds new one on every address change and publishes it as whole so RX / TX path
+    always sees consistent set of tables and needs single set lookup per check, IP addresses are kept as integers as those hash much faster """
+
+    def __init__(self, generation, mac_unicast, mac_multicast, mac_broadcast, ip6_address, ip6_multicast, ip4_address, ip4_multicast):
+        """ Class constructor """
+
+        self.generation = generation
+
+        self.mac_rx_filter = frozenset({mac_unicast, *mac_multicast, mac_broadcast})
+
+        self.ip6_unicast = tuple(_.ip for _ in ip6_address)
+        self.ip6_unicast_int = frozenset(int(_) for _ in self.ip6_unicast)
+        self.ip6_multicast_int = frozenset(int(_) for _ in ip6_multicast)
+        self.ip6_rx_filter = self.ip6_unicast_int | self.ip6_multicast_int
+        self.ip6_tx_filter = self.ip6_rx_filter | {int(IPv6Address("::"))}
+
+        self.ip4_unicast = tuple(_.ip for _ in ip4_address)
+        self.ip4_broadcast = (*(_.network.broadcast_address for _ in ip4_address), IPv4Address("255.255.255.255"))
+        self.ip4_unicast_int = frozenset(int(_) for _ in self.ip4_unicast)
+        self.ip4_multicast_int = frozenset(int(_) for _ in ip4_multicast)
+        self.ip4_broadcast_int = frozenset(int(_) for _ in self.ip4_broadcast)
+        # IPv4 destination filtering is disabled till stack has any unicast address assigned (needed for DHCP)
+        self.ip4_rx_filter = self.ip4_unicast_int | self.ip4_multicast_int | self.ip4_broadcast_int if ip4_address else None
+        self.ip4_tx_filter = self.ip4_unicast_int | self.ip4_multicast_int | self.ip4_broadcast_int | {int(IPv4Address("0.0.0.0"))}
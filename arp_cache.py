@@ -41,17 +41,29 @@
 #
 
 
-import time
+import threading
 
 import loguru
 
+import config
 import ps_arp
 import stack
 from ipv4_address import IPv4Address
+from mac_address import MAC_BROADCAST, MAC_UNSPECIFIED
+from neighbor_hold_queue import NeighborHoldQueue
+from neighbor_table import NeighborTable
+from timer import timer_tick
 
 ARP_ENTRY_MAX_AGE = 3600
 ARP_ENTRY_REFRESH_TIME = 300
 
+# ARP request retransmission interval (ms) and number of requests sent before address resolution is considered failed
+ARP_RETRANS_TIMER = 1000
+ARP_MAX_SOLICIT = 3
+
+ARP_INCOMPLETE = "INCOMPLETE"
+ARP_FAILED = "FAILED"
+
 
 class ArpCache:
     """ Support for ARP cache operations """
@@ -62,15 +74,35 @@ class ArpCache:
         def __init__(self, mac_address, permanent=False):
             self.mac_address = mac_address
             self.permanent = permanent
-            self.creation_time = time.time()
+            self.confirmed = timer_tick()  # Time entry has been learned, ARP has no other means of reachability confirmation
+            self.deadline = None
             self.hit_count = 0
 
+    class ResolutionEntry:
+        """ Container class for address resolution that is in progress or has failed recently """
+
+        def __init__(self, ip4_address):
+            self.ip4_address = ip4_address
+            self.state = ARP_INCOMPLETE
+            self.request_count = 0
+            self.timer = None
+
     def __init__(self, packet_handler):
         """ Class constructor """
 
         self.packet_handler = packet_handler
 
-        self.arp_cache = {}
+        self.arp_cache = NeighborTable(
+            config.neighbor_gc_thresh1,
+            config.neighbor_gc_thresh2,
+            config.neighbor_gc_thresh3,
+            config.neighbor_gc_interval,
+            config.neighbor_gc_protect_time,
+            evict_callback=self.__evict_entry,
+        )
+        self.arp_resolution = {}
+        self.lock = threading.RLock()
+        self.hold_queue = NeighborHoldQueue(config.neighbor_hold_queue_len, config.neighbor_hold_timeout)
 
         self.logger = loguru.logger.bind(object_name="arp_cache.")
 
@@ -82,53 +114,138 @@ class ArpCache:
     def maintain_cache(self):
         """ Method responsible for maintaining ARP cache entries """
 
-        for ip4_address in list(self.arp_cache):
+        # Only entries that reached their refresh or expiry deadline are looked at
+        for ip4_address, arp_entry in self.arp_cache.expire():
 
-            # Skip permanent entries
-            if self.arp_cache[ip4_address].permanent:
+            # If entry age is over maximum age then discard the entry
+            if timer_tick() - arp_entry.confirmed >= ARP_ENTRY_MAX_AGE * 1000:
+                self.arp_cache.remove(ip4_address, arp_entry)
+                self.logger.debug(f"Discarded expired ARP cache entry - {ip4_address} -> {arp_entry.mac_address}")
                 continue
 
-            # If entry age is over maximum age then discard the entry
-            if time.time() - self.arp_cache[ip4_address].creation_time > ARP_ENTRY_MAX_AGE:
-                mac_address = self.arp_cache.pop(ip4_address).mac_address
-                self.logger.debug(f"Discarded expired ARP cache entry - {ip4_address} -> {mac_address}")
-
-            # If entry age is close to maximum age but the entry has been used since last refresh then send out request in attempt to refresh it
-            elif (time.time() - self.arp_cache[ip4_address].creation_time > ARP_ENTRY_MAX_AGE - ARP_ENTRY_REFRESH_TIME) and self.arp_cache[
-                ip4_address
-            ].hit_count:
-                self.arp_cache[ip4_address].hit_count = 0
+            # If entry age is close to maximum age but the entry has been used since it was learned then send out request in attempt to refresh it
+            if arp_entry.hit_count:
+                arp_entry.hit_count = 0
                 self.__send_arp_request(ip4_address)
-                self.logger.debug(f"Trying to refresh expiring ARP cache entry for {ip4_address} -> {self.arp_cache[ip4_address].mac_address}")
+                self.logger.debug(f"Trying to refresh expiring ARP cache entry for {ip4_address} -> {arp_entry.mac_address}")
+
+            self.arp_cache.set_deadline(ip4_address, arp_entry, arp_entry.confirmed + ARP_ENTRY_MAX_AGE * 1000)
+
+    def __evict_entry(self, ip4_address, arp_entry):
+        """ Log entry evicted from full cache """
+
+        self.logger.debug(f"Evicted ARP cache entry - {ip4_address} -> {arp_entry.mac_address}")
 
     def add_entry(self, ip4_address, mac_address):
         """ Add / refresh entry in cache """
 
-        self.arp_cache[ip4_address] = self.CacheEntry(mac_address)
+        with self.lock:
+            if (arp_entry := self.arp_cache.peek(ip4_address)) and arp_entry.permanent:
+                return
+
+            arp_entry = self.CacheEntry(mac_address)
+            inserted = self.arp_cache.insert(ip4_address, arp_entry)
+
+            # Address resolution is over either way, packets waiting for it can't be sent out if entry didn't fit into full cache
+            if resolution := self.arp_resolution.pop(ip4_address, None):
+                resolution.timer.cancel()
+
+            if not inserted:
+                self.hold_queue.discard(ip4_address)
+                self.logger.debug(f"ARP cache full, unable to add entry {ip4_address} -> {mac_address}")
+                return
+
+            self.arp_cache.set_deadline(ip4_address, arp_entry, arp_entry.confirmed + (ARP_ENTRY_MAX_AGE - ARP_ENTRY_REFRESH_TIME) * 1000)
+            self.__flush_hold_queue(ip4_address, mac_address)
+
+    def hold_packet(self, ip4_address, ether_packet_tx):
+        """ Park outbound packet till MAC address of its next hop gets resolved """
+
+        # Drop packet right away if neighbor has recently failed to get resolved
+        if (resolution := self.arp_resolution.get(ip4_address, None)) and resolution.state == ARP_FAILED:
+            self.hold_queue.reject()
+            self.logger.debug(f"{ether_packet_tx.tracker} - Recent address resolution for {ip4_address} failed, dropping packet")
+            return
+
+        self.hold_queue.hold(ip4_address, ether_packet_tx)
+        self.logger.debug(f"{ether_packet_tx.tracker} - Parked packet waiting for {ip4_address} to get resolved ({self.hold_queue})")
+
+        # Cover the case of neighbor being resolved between cache lookup and parking the packet
+        with self.lock:
+            if entry := self.arp_cache.peek(ip4_address):
+                self.__flush_hold_queue(ip4_address, entry.mac_address)
+
+    def __flush_hold_queue(self, ip4_address, mac_address):
+        """ Send out packets that have been waiting for neighbor to get resolved """
+
+        for ether_packet_tx in self.hold_queue.release(ip4_address):
+            ether_packet_tx.ether_dst = mac_address
+            self.logger.debug(f"{ether_packet_tx.tracker} - Resolved {ip4_address} to MAC {mac_address}, sending out parked packet")
+            self.packet_handler.tx_ring.enqueue(ether_packet_tx)
+
+    def note_use(self, ip4_address):
+        """ Account use of entry by packet sent out using cached egress state, so entries of busy neighbors get refreshed before they expire """
+
+        if arp_entry := self.arp_cache.peek(ip4_address):
+            arp_entry.hit_count += 1
 
     def find_entry(self, ip4_address):
         """ Find entry in cache and return MAC address """
 
-        if arp_entry := self.arp_cache.get(ip4_address, None):
+        if arp_entry := self.arp_cache.get(ip4_address):
             arp_entry.hit_count += 1
             self.logger.debug(
-                f"Found {ip4_address} -> {arp_entry.mac_address} entry, age {time.time() - arp_entry.creation_time:.0f}s, hit_count {arp_entry.hit_count}"
+                f"Found {ip4_address} -> {arp_entry.mac_address} entry, age {(timer_tick() - arp_entry.confirmed) // 1000}s, hit_count {arp_entry.hit_count}"
             )
             return arp_entry.mac_address
 
-        self.logger.debug(f"Unable to find entry for {ip4_address}, sending ARP request")
-        self.__send_arp_request(ip4_address)
-        return None
+        with self.lock:
+            # Only one address resolution is run for given address at a time, also don't retry address that has recently failed to get resolved
+            if ip4_address in self.arp_resolution:
+                return None
+
+            # Resolutions in progress are bound by the same limit as cache itself
+            if len(self.arp_resolution) >= config.neighbor_gc_thresh3:
+                self.logger.debug(f"Too many address resolutions in progress, unable to resolve {ip4_address}")
+                return None
+
+            self.logger.debug(f"Unable to find entry for {ip4_address}, starting address resolution")
+            resolution = self.arp_resolution[ip4_address] = self.ResolutionEntry(ip4_address)
+            self.__resolution_timer_event(resolution)
+            return None
+
+    def __resolution_timer_event(self, resolution):
+        """ Retransmit ARP request till address gets resolved or the retry limit is reached, then remember the failure for a while """
+
+        with self.lock:
+            # Ignore event that belongs to resolution that is not current anymore
+            if self.arp_resolution.get(resolution.ip4_address, None) is not resolution:
+                return
+
+            if resolution.state == ARP_FAILED:
+                self.arp_resolution.pop(resolution.ip4_address)
+                return
+
+            if resolution.request_count < ARP_MAX_SOLICIT:
+                resolution.request_count += 1
+                resolution.timer = stack.timer.schedule(ARP_RETRANS_TIMER, self.__resolution_timer_event, args=[resolution])
+                self.__send_arp_request(resolution.ip4_address)
+                return
+
+            self.logger.debug(f"Address resolution for {resolution.ip4_address} failed")
+            resolution.state = ARP_FAILED
+            resolution.timer = stack.timer.schedule(config.neighbor_failed_timeout, self.__resolution_timer_event, args=[resolution])
+            self.hold_queue.discard(resolution.ip4_address)
 
     def __send_arp_request(self, arp_tpa):
         """ Enqueue ARP request packet with TX ring """
 
         self.packet_handler.phtx_arp(
             ether_src=self.packet_handler.mac_unicast,
-            ether_dst="ff:ff:ff:ff:ff:ff",
+            ether_dst=MAC_BROADCAST,
             arp_oper=ps_arp.ARP_OP_REQUEST,
             arp_sha=self.packet_handler.mac_unicast,
             arp_spa=self.packet_handler.ip4_unicast[0] if self.packet_handler.ip4_unicast else IPv4Address("0.0.0.0"),
-            arp_tha="00:00:00:00:00:00",
+            arp_tha=MAC_UNSPECIFIED,
             arp_tpa=arp_tpa,
         )
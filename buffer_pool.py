@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# buffer_pool.py - module contains class supporting pool of preallocated packet buffers
+#
+
+
+from collections import deque
+
+
+class BufferPool:
+    """ Pool of preallocated fixed size buffers, buffers are handed out and returned without any allocation on the fast path """
+
+    def __init__(self, buffer_size, buffer_count):
+        """ Class constructor """
+
+        self.buffer_size = buffer_size
+        self.buffers = deque(bytearray(buffer_size) for _ in range(buffer_count))
+
+        self.allocated = buffer_count
+        self.misses = 0
+
+    def __str__(self):
+        """ Pool statistics string """
+
+        return f"buffer size {self.buffer_size}, free {len(self.buffers)}/{self.allocated}, misses {self.misses}"
+
+    def get(self):
+        """ Take buffer from the pool, allocate new one if pool is empty """
+
+        try:
+            return self.buffers.pop()
+        except IndexError:
+            self.misses += 1
+            self.allocated += 1
+            return bytearray(self.buffer_size)
+
+    def put(self, buffer):
+        """ Return buffer to the pool """
+
+        self.buffers.append(buffer)
@@ -121,6 +121,38 @@ ip4_address_candidate = [
     # ("10.10.10.7/24", "10.10.10.1"),
 ]
 
+# Static routes may be configured here, each entry is a tuple of destination network, gateway and metric
+# Gateway needs to belong to one of local networks (for IPv6 it may also be link local), source address of routed packets is picked accordingly
+# Routes to the same network through different gateways with equal metric are used simultaneously, each destination sticks to one of them
+ip6_static_routes = [
+    # ("2010::/64", "2007::1", 10),
+]
+ip4_static_routes = [
+    # ("10.10.0.0/16", "192.168.9.254", 10),
+]
+
+# Maximum number of destinations kept in routing table destination cache
+fib_dst_cache_size = 4096
+
+# IPv4 fragment reassembly limits, incomplete datagrams are discarded after timeout (ms), single datagram can't exceed max_size bytes and all the
+# datagrams being reassembled can't hold more than memory_limit bytes together, the oldest ones are evicted when new fragments need room
+ip4_reassembly_timeout = 30000
+ip4_reassembly_max_size = 65535 - 20
+ip4_reassembly_memory_limit = 4 * 1024 * 1024
+
+# IPv6 fragment reassembly limits, same meaning as IPv4 ones, RFC 8200 sets reassembly timeout to 60s
+ip6_reassembly_timeout = 60000
+ip6_reassembly_max_size = 65535
+ip6_reassembly_memory_limit = 4 * 1024 * 1024
+
+# Path MTU discovery, path MTU learned from ICMP messages is kept for up to pmtu_cache_size destinations and forgotten after pmtu_timeout (ms)
+# so larger path MTU can be discovered again (RFC 1191 and RFC 8201 suggest 10 minutes)
+pmtu_timeout = 600000
+pmtu_cache_size = 1024
+
+# Maximum number of flows kept in egress cache, it holds resolved next hop and pre-serialized headers of TCP / UDP flows
+egress_cache_size = 1024
+
 # TCP ephemeral port range to be used by outbound connections
 TCP_EPHEMERAL_PORT_RANGE = (32168, 60999)
 
@@ -129,8 +161,47 @@ UDP_EPHEMERAL_PORT_RANGE = (32168, 60999)
 
 mtu = 1500  # TAP interface MTU
 
+# Virtio-net header (IFF_VNET_HDR) support on TAP interface, kernel then validates checksums of received TCP / UDP packets and computes them
+# for outbound ones, with TSO enabled TCP sends super-segments of up to 64KB that kernel segments and received packets may arrive GRO coalesced
+vnet_hdr = False
+vnet_hdr_tso = True
+
+# Datapath mode, "threaded" passes packets between RX ring, packet handler and TX ring threads, "run_to_completion" has packet handler thread read
+# TAP interface directly (non-blocking, epoll driven), process each packet and write replies straight to TAP interface
+datapath = "threaded"
+
+# RX and TX ring capacity (packets) and the policy applied when ring is full, "tail" drops the packet being enqueued, "head" drops the oldest queued packet
+rx_ring_size = 1024
+rx_ring_drop = "tail"
+tx_ring_size = 1024
+tx_ring_drop = "tail"
+
+# Maximum number of packets packet handler picks up from RX ring and processes in single wakeup
+rx_batch_budget = 64
+
+# Size and initial count of preallocated RX buffers, size needs to fit largest frame expected on TAP interface (set to 9018 for jumbo frames)
+rx_buffer_size = max(2048, mtu + 14) if not vnet_hdr else 10 + 14 + 65535  # Room for virtio-net header and GRO coalesced frame
+rx_buffer_count = rx_ring_size + rx_batch_budget
+
+# Maximum number of outbound packets parked per neighbor while its MAC address is being resolved and the time (ms) they are allowed to wait
+neighbor_hold_queue_len = 8
+neighbor_hold_timeout = 3000
+
+# Time (ms) failed ARP / ICMPv6 ND address resolution is remembered, packets to such neighbor are dropped right away and no new requests are sent for it
+neighbor_failed_timeout = 5000
+
+# Neighbor table size limits shared by ARP and ICMPv6 ND caches, garbage collection doesn't run below gc_thresh1, runs at most once per gc_interval (ms)
+# above gc_thresh2 and always runs on reaching gc_thresh3 where new entries are refused if nothing can be evicted, permanent entries and entries
+# confirmed within gc_protect_time (ms) are never evicted
+neighbor_gc_thresh1 = 128
+neighbor_gc_thresh2 = 512
+neighbor_gc_thresh3 = 1024
+neighbor_gc_interval = 5000
+neighbor_gc_protect_time = 30000
+
 local_tcp_mss = 1460  # Maximum segment peer can send to us
 local_tcp_win = 65535  # Maximum amount of data peer can send to us without confirmation
+tcp_tx_burst_limit = None  # Maximum number of data segments TCP session sends out in single burst, 'None' means send as much as sliding window allows
 
 # Test services, for detailed configuation of each reffer to pytcp.py and respective service/client file
 # Those are being used for testing various stack components are therefore their 'default' funcionality may be altered fro specific tst needs
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+
+#
+# egress_cache.py - module contains class supporting per flow cache of resolved egress state
+#
+
+
+import struct
+import threading
+
+from inet_cksum import inet_cksum, inet_cksum_fold, inet_sum
+
+# Offset of checksum field in headers of protocols supported by egress cache
+CKSUM_OFFSET = {"TCP": 16, "UDP": 6}
+
+
+def build_ether_header(ether_src, ether_dst, ether_type):
+    """ Serialize Ethernet header """
+
+    return ether_dst + ether_src + struct.pack("!H", ether_type)
+
+
+class EgressFrame:
+    """ Ethernet frame assembled from egress cache templates, exposes the same interface as EtherPacket to TX ring """
+
+    protocol = "ETHER"
+
+    def __init__(self, raw_packet, tracker):
+        self.raw_packet = raw_packet
+        self.tracker = tracker
+        self.vnet_hdr = None  # Checksums are always complete in cached frames
+
+    def __str__(self):
+        """ Short packet log string """
+
+        return f"ETHER (cached egress), len {len(self.raw_packet)}"
+
+    def __len__(self):
+        """ Length of the packet """
+
+        return len(self.raw_packet)
+
+    def get_raw_packet(self):
+        """ Get packet in raw format ready to be sent out """
+
+        return self.raw_packet
+
+
+class EgressCacheEntry:
+    """ Container class for resolved egress state of single flow """
+
+    def __init__(self, ether_src, ether_dst, ether_type, ip_header, pseudo_header, protocol, generations, next_hop=None):
+        self.ether_src = ether_src
+        self.ether_dst = ether_dst
+        self.next_hop = next_hop  # Neighbor ether_dst belongs to, packets sent using entry count as its use for neighbor reachability tracking
+        self.protocol = protocol
+        self.generations = generations  # Routing table and neighbor cache generations entry is valid for
+
+        # Ethernet header is complete, IP header has length, packet ID and checksum fields zeroed
+        self.ether_header = build_ether_header(ether_src, ether_dst, ether_type)
+        self.ip_header = ip_header
+        self.ip_header_sum = inet_sum(ip_header)
+
+        # Partial sum of pseudo header without the length field
+        self.pseudo_header_sum = inet_sum(pseudo_header)
+
+    def build_frame(self, raw_data, ip4_packet_id=None):
+        """ Assemble frame out of header templates and raw TCP / UDP packet, only length, packet ID and checksum fields need to be filled out """
+
+        raw_data = bytearray(raw_data)
+        cksum_offset = CKSUM_OFFSET[self.protocol]
+        raw_data[cksum_offset : cksum_offset + 2] = b"\0\0"
+        cksum = inet_cksum(raw_data, self.pseudo_header_sum + len(raw_data))
+        # Checksum computed as zero is sent as all ones in UDP since zero means no checksum (RFC 768)
+        if cksum == 0 and self.protocol == "UDP":
+            cksum = 0xFFFF
+        struct.pack_into("!H", raw_data, cksum_offset, cksum)
+
+        ip_header = bytearray(self.ip_header)
+        if ip4_packet_id is None:
+            struct.pack_into("!H", ip_header, 4, len(raw_data))
+        else:
+            ip4_plen = len(ip_header) + len(raw_data)
+            struct.pack_into("!HH", ip_header, 2, ip4_plen, ip4_packet_id)
+            struct.pack_into("!H", ip_header, 10, inet_cksum_fold(self.ip_header_sum + ip4_plen + ip4_packet_id))
+
+        return self.ether_header + ip_header + raw_data
+
+
+class EgressCache:
+    """ Per flow cache of resolved next hop and pre-serialized headers, entries become invalid on routing table or neighbor cache change """
+
+    def __init__(self, size):
+        """ Class constructor """
+
+        self.size = size
+        self.lock = threading.Lock()
+        self.entries = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def __str__(self):
+        """ Egress cache statistics string """
+
+        return f"flows {len(self.entries)}/{self.size}, hits {self.hits}, misses {self.misses}"
+
+    def get(self, flow, generations):
+        """ Return entry for given flow if it's still valid for current routing table and neighbor cache generations """
+
+        if (entry := self.entries.get(flow, None)) is not None and entry.generations == generations:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        return None
+
+    def add(self, flow, entry):
+        """ Add entry for given flow """
+
+        if entry.protocol not in CKSUM_OFFSET:
+            return
+
+        with self.lock:
+            if len(self.entries) >= self.size and flow not in self.entries:
+                self.entries = {}
+            self.entries[flow] = entry
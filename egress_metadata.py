@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+
+#
+# egress_metadata.py - module contains storage class for outbound packet's egress metadata
+#
+
+
+EGRESS_UNICAST = "unicast"
+EGRESS_MULTICAST = "multicast"
+EGRESS_BROADCAST = "broadcast"
+
+
+class EgressMetadata:
+    """ Store egress metadata resolved by IP layer so Ethernet layer doesn't need to parse outbound packet again """
+
+    def __init__(self, dst_class, ether_src, next_hop=None, route=None):
+        self.dst_class = dst_class  # One of EGRESS_UNICAST, EGRESS_MULTICAST and EGRESS_BROADCAST
+        self.ether_src = ether_src
+        self.next_hop = next_hop  # IP address of neighbor (or multicast group) packet is sent to
+        self.route = route
+        self.ether_dst = None  # Filled out by Ethernet layer once destination MAC gets resolved
+
+    def __str__(self):
+        """ Egress metadata log string """
+
+        return f"{self.dst_class} via {self.next_hop}" if self.next_hop else self.dst_class
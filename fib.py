@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+
+#
+# fib.py - module contains class supporting routing table (FIB) with longest prefix match lookup
+#
+
+
+import threading
+
+# Metrics of the routes stack creates for its own interface addresses
+METRIC_CONNECTED = 0
+METRIC_DEFAULT_GATEWAY = 100
+
+
+class RadixTrie:
+    """ Binary radix trie keyed by integer address prefixes, supports longest prefix match lookup """
+
+    def __init__(self, width):
+        """ Class constructor """
+
+        self.width = width
+
+        # Each node is a list of [zero branch, one branch, value]
+        self.root = [None, None, None]
+
+    def __iter__(self):
+        """ Iterate over values stored in trie """
+
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            if node[2] is not None:
+                yield node[2]
+            nodes.extend(_ for _ in node[:2] if _ is not None)
+
+    def __path(self, prefix, prefix_len):
+        """ Return the list of nodes leading to given prefix, shorter list if prefix is not present in trie """
+
+        path = [self.root]
+        for bit in range(self.width - 1, self.width - 1 - prefix_len, -1):
+            if (node := path[-1][(prefix >> bit) & 1]) is None:
+                break
+            path.append(node)
+        return path
+
+    def get(self, prefix, prefix_len):
+        """ Return value stored for exact prefix """
+
+        path = self.__path(prefix, prefix_len)
+        return path[-1][2] if len(path) == prefix_len + 1 else None
+
+    def insert(self, prefix, prefix_len, value):
+        """ Store value for given prefix """
+
+        node = self.root
+        for bit in range(self.width - 1, self.width - 1 - prefix_len, -1):
+            branch = (prefix >> bit) & 1
+            if node[branch] is None:
+                node[branch] = [None, None, None]
+            node = node[branch]
+        node[2] = value
+
+    def remove(self, prefix, prefix_len):
+        """ Remove value stored for given prefix and prune nodes left empty """
+
+        path = self.__path(prefix, prefix_len)
+        if len(path) != prefix_len + 1:
+            return
+        path[-1][2] = None
+
+        for depth in range(prefix_len, 0, -1):
+            node = path[depth]
+            if node[0] is not None or node[1] is not None or node[2] is not None:
+                break
+            path[depth - 1][(prefix >> (self.width - depth)) & 1] = None
+
+    def lookup(self, address):
+        """ Return value stored for the longest prefix matching given address """
+
+        node = self.root
+        value = node[2]
+        bit = self.width - 1
+        while bit >= 0 and (node := node[(address >> bit) & 1]) is not None:
+            if node[2] is not None:
+                value = node[2]
+            bit -= 1
+        return value
+
+
+class Route:
+    """ Container class for routing table entries """
+
+    def __init__(self, network, gateway=None, metric=0, src=None):
+        self.network = network
+        self.gateway = gateway  # 'None' for on-link routes
+        self.metric = metric
+        self.src = src  # Source address used for packets following this route
+
+    def __str__(self):
+        """ Route log string """
+
+        return f"{self.network} {f'via {self.gateway}' if self.gateway else 'on-link'} src {self.src} metric {self.metric}"
+
+
+class Fib:
+    """ Routing table with longest prefix match lookup and generation versioned destination cache """
+
+    def __init__(self, width, dst_cache_size):
+        """ Class constructor """
+
+        self.lock = threading.Lock()
+        self.trie = RadixTrie(width)
+        self.dst_cache_size = dst_cache_size
+        self.dst_cache = {}
+
+        # Generation is bumped with every routing table change, anything that caches routes can use it to detect they are not current anymore
+        self.generation = 0
+
+    def __str__(self):
+        """ Routing table string """
+
+        return "\n".join(str(_) for _ in self.routes)
+
+    @property
+    def routes(self):
+        """ List of all routes sorted by prefix length and metric """
+
+        with self.lock:
+            routes = [_ for routes in self.trie for _ in routes]
+        return sorted(routes, key=lambda _: (-_.network.prefixlen, _.metric))
+
+    def __changed(self):
+        """ Invalidate destination cache after routing table change """
+
+        self.generation += 1
+        self.dst_cache = {}
+
+    def add_route(self, network, gateway=None, metric=0, src=None):
+        """ Add route, routes to the same network are kept side by side and picked by metric """
+
+        with self.lock:
+            routes = self.trie.get(int(network.network_address), network.prefixlen) or []
+            routes = [_ for _ in routes if (_.gateway, _.src) != (gateway, src)] + [route := Route(network, gateway, metric, src)]
+            routes.sort(key=lambda _: _.metric)
+            self.trie.insert(int(network.network_address), network.prefixlen, routes)
+            self.__changed()
+        return route
+
+    def remove_route(self, network, gateway=None, src=None):
+        """ Remove route to given network via given gateway, if source is given only route using it is removed """
+
+        with self.lock:
+            if not (routes := self.trie.get(int(network.network_address), network.prefixlen)):
+                return
+            if routes := [_ for _ in routes if _.gateway != gateway or (src is not None and _.src != src)]:
+                self.trie.insert(int(network.network_address), network.prefixlen, routes)
+            else:
+                self.trie.remove(int(network.network_address), network.prefixlen)
+            self.__changed()
+
+    def add_interface_routes(self, interface, default_network):
+        """ Add on-link route for interface address and default route through its gateway if one is set """
+
+        self.add_route(interface.network, metric=METRIC_CONNECTED, src=interface.ip)
+        if interface.gateway:
+            self.add_route(default_network, gateway=interface.gateway, metric=METRIC_DEFAULT_GATEWAY, src=interface.ip)
+
+    def remove_interface_routes(self, interface, default_network):
+        """ Remove routes created for interface address """
+
+        self.remove_route(interface.network, src=interface.ip)
+        if interface.gateway:
+            self.remove_route(default_network, gateway=interface.gateway, src=interface.ip)
+
+    def lookup(self, address, src=None):
+        """ Find route for given destination address, if source is given route using it is preferred, on the hot path this is single destination cache hit """
+
+        if (route := self.dst_cache.get((address, src), None)) is not None:
+            return route
+
+        generation = self.generation
+        if not (routes := self.trie.lookup(int(address))):
+            return None
+
+        # Keep packets sent from given address on the routes (gateways) that belong to it, fall back to any route if none of them uses that address
+        if src is not None:
+            routes = [_ for _ in routes if _.src == src] or routes
+
+        # Equal cost routes through different gateways are spread over destinations, the first route added wins among routes through the same gateway
+        best = {}
+        for _ in routes:
+            if _.metric == routes[0].metric:
+                best.setdefault(_.gateway, _)
+        best = list(best.values())
+        route = best[int(address) % len(best)]
+
+        # Don't cache the result if routing table has changed in the meantime
+        with self.lock:
+            if generation == self.generation:
+                if len(self.dst_cache) >= self.dst_cache_size:
+                    self.dst_cache = {}
+                self.dst_cache[(address, src)] = route
+
+        return route
@@ -41,16 +41,41 @@
 #
 
 
-import time
+import random
+import threading
 
 import loguru
 
+import config
 import ps_icmp6
 import stack
 from ipv6_address import IPv6Address
-
-ND_ENTRY_MAX_AGE = 3600
-ND_ENTRY_REFRESH_TIME = 300
+from neighbor_hold_queue import NeighborHoldQueue
+from neighbor_table import NeighborTable
+from timer import timer_tick
+
+# Neighbor Unreachability Detection constants (RFC 4861, section 10), all times in miliseconds
+MAX_MULTICAST_SOLICIT = 3
+MAX_UNICAST_SOLICIT = 3
+REACHABLE_TIME = 30000
+RETRANS_TIMER = 1000
+DELAY_FIRST_PROBE_TIME = 5000
+MIN_RANDOM_FACTOR = 0.5
+MAX_RANDOM_FACTOR = 1.5
+
+# Time after which STALE entry that hasn't been used is discarded
+ND_ENTRY_STALE_TIME = 600000
+
+# Neighbor cache entry states (RFC 4861, section 7.3.2)
+ND_INCOMPLETE = "INCOMPLETE"
+ND_REACHABLE = "REACHABLE"
+ND_STALE = "STALE"
+ND_DELAY = "DELAY"
+ND_PROBE = "PROBE"
+ND_FAILED = "FAILED"  # Not part of RFC 4861, used to remember failed address resolution for a while
+
+# States in which entry can't be used to send packets out
+ND_UNUSABLE_STATES = {None, ND_INCOMPLETE, ND_FAILED}
 
 
 class ICMPv6NdCache:
@@ -59,67 +84,250 @@ class ICMPv6NdCache:
     class CacheEntry:
         """ Container class fo cache entries """
 
-        def __init__(self, mac_address, permanent=False):
+        def __init__(self, ip6_address, mac_address=None, permanent=False):
+            self.ip6_address = ip6_address
             self.mac_address = mac_address
             self.permanent = permanent
-            self.creation_time = time.time()
-            self.hit_count = 0
+            self.state = None
+            self.confirmed = None  # Time of the last reachability confirmation
+            self.probe_count = 0
+            self.timer = None
 
     def __init__(self, packet_handler):
         """ Class constructor """
 
         self.packet_handler = packet_handler
 
-        self.nd_cache = {}
-
-        self.logger = loguru.logger.bind(object_name="icmp6_nd_cache.")
-
-        # Setup timer to execute ND Cache maintainer every second
-        stack.timer.register_method(method=self.maintain_cache, delay=1000)
-
-        self.logger.debug("Started ICMPv6 Neighbor Discovery cache")
-
-    def maintain_cache(self):
-        """ Method responsible for maintaining ND cache entries """
-
-        for ip6_address in list(self.nd_cache):
+        self.nd_cache = NeighborTable(
+            config.neighbor_gc_thresh1,
+            config.neighbor_gc_thresh2,
+            config.neighbor_gc_thresh3,
+            config.neighbor_gc_interval,
+            config.neighbor_gc_protect_time,
+            evict_callback=self.__evict_entry,
+        )
+        self.hold_queue = NeighborHoldQueue(config.neighbor_hold_queue_len, config.neighbor_hold_timeout)
 
-            # Skip permanent entries
-            if self.nd_cache[ip6_address].permanent:
-                continue
+        self.lock = threading.RLock()
 
-            # If entry age is over maximum age then discard the entry
-            if time.time() - self.nd_cache[ip6_address].creation_time > ND_ENTRY_MAX_AGE:
-                mac_address = self.nd_cache.pop(ip6_address).mac_address
-                self.logger.debug(f"Discarded expired ICMPv6 ND cache entry - {ip6_address} -> {mac_address}")
+        # Base for the randomized reachable time (RFC 4861, section 6.3.2)
+        self.reachable_time = int(REACHABLE_TIME * random.uniform(MIN_RANDOM_FACTOR, MAX_RANDOM_FACTOR))
 
-            # If entry age is close to maximum age but the entry has been used since last refresh then send out request in attempt to refresh it
-            elif (time.time() - self.nd_cache[ip6_address].creation_time > ND_ENTRY_MAX_AGE - ND_ENTRY_REFRESH_TIME) and self.nd_cache[ip6_address].hit_count:
-                self.nd_cache[ip6_address].hit_count = 0
-                self.__send_icmp6_neighbor_solicitation(ip6_address)
-                self.logger.debug(f"Trying to refresh expiring ICMPv6 ND cache entry for {ip6_address} -> {self.nd_cache[ip6_address].mac_address}")
+        self.logger = loguru.logger.bind(object_name="icmp6_nd_cache.")
 
-    def add_entry(self, ip6_address, mac_address):
-        """ Add / refresh entry in cache """
+        self.logger.debug("Started ICMPv6 Neighbor Discovery cache")
 
-        self.nd_cache[ip6_address] = self.CacheEntry(mac_address)
+    def __change_state(self, nd_entry, state, delay):
+        """ Change the state of cache entry and schedule its next timer event """
+
+        if nd_entry.timer:
+            nd_entry.timer.cancel()
+
+        if nd_entry.state != state:
+            self.logger.debug(f"Entry {nd_entry.ip6_address} -> {nd_entry.mac_address} changed state {nd_entry.state} -> {state}")
+
+            # Let egress cache know its entries may not reflect neighbor state anymore, only moves between usable and unusable states matter
+            if (nd_entry.state in ND_UNUSABLE_STATES) != (state in ND_UNUSABLE_STATES):
+                self.nd_cache.invalidate()
+
+            nd_entry.state = state
+            nd_entry.probe_count = 0
+
+        nd_entry.timer = stack.timer.schedule(delay, self.__timer_event, args=[nd_entry])
+
+    def __discard_entry(self, nd_entry):
+        """ Remove entry from cache along with packets waiting for it to get resolved """
+
+        if nd_entry.timer:
+            nd_entry.timer.cancel()
+        self.nd_cache.remove(nd_entry.ip6_address, nd_entry)
+        self.hold_queue.discard(nd_entry.ip6_address)
+        self.logger.debug(f"Discarded {nd_entry.state} ICMPv6 ND cache entry for {nd_entry.ip6_address} -> {nd_entry.mac_address}")
+
+    def __evict_entry(self, ip6_address, nd_entry):
+        """ Clean up after entry evicted from full cache """
+
+        if nd_entry.timer:
+            nd_entry.timer.cancel()
+        self.hold_queue.discard(ip6_address)
+        self.logger.debug(f"Evicted {nd_entry.state} ICMPv6 ND cache entry for {ip6_address} -> {nd_entry.mac_address}")
+
+    def __timer_event(self, nd_entry):
+        """ Handle timer event of cache entry according to its state """
+
+        with self.lock:
+            # Ignore event that belongs to entry that has been removed from cache in the meantime
+            if self.nd_cache.peek(nd_entry.ip6_address) is not nd_entry:
+                return
+
+            if nd_entry.state == ND_INCOMPLETE:
+                if nd_entry.probe_count < MAX_MULTICAST_SOLICIT:
+                    self.__change_state(nd_entry, ND_INCOMPLETE, RETRANS_TIMER)
+                    self.__send_icmp6_neighbor_solicitation(nd_entry)
+                    return
+                self.__change_state(nd_entry, ND_FAILED, config.neighbor_failed_timeout)
+                self.hold_queue.discard(nd_entry.ip6_address)
+                return
+
+            if nd_entry.state == ND_FAILED:
+                self.__discard_entry(nd_entry)
+                return
+
+            if nd_entry.state == ND_REACHABLE:
+                # Entry might have been confirmed again since the timer was set
+                if (remaining_time := nd_entry.confirmed + self.reachable_time - timer_tick()) > 0:
+                    self.__change_state(nd_entry, ND_REACHABLE, remaining_time)
+                    return
+                self.__change_state(nd_entry, ND_STALE, ND_ENTRY_STALE_TIME)
+                return
+
+            if nd_entry.state == ND_STALE:
+                self.__discard_entry(nd_entry)
+                return
+
+            if nd_entry.state == ND_DELAY:
+                self.__change_state(nd_entry, ND_PROBE, RETRANS_TIMER)
+                self.__send_icmp6_neighbor_solicitation(nd_entry)
+                return
+
+            if nd_entry.state == ND_PROBE:
+                if nd_entry.probe_count < MAX_UNICAST_SOLICIT:
+                    self.__change_state(nd_entry, ND_PROBE, RETRANS_TIMER)
+                    self.__send_icmp6_neighbor_solicitation(nd_entry)
+                    return
+                self.__discard_entry(nd_entry)
+                return
+
+    def add_entry(self, ip6_address, mac_address, solicited=False, override=True):
+        """ Add / refresh entry in cache based on received Neighbor Advertisement or Solicitation (RFC 4861, sections 7.2.3 and 7.2.5) """
+
+        with self.lock:
+            nd_entry = self.nd_cache.peek(ip6_address)
+
+            if nd_entry and nd_entry.permanent:
+                return
+
+            # Solicited advertisement answering unicast probe doesn't need to carry Target Link-Layer Address option (RFC 4861, section 7.2.4),
+            # such advertisement can only confirm entry that already has MAC address resolved
+            if mac_address is None:
+                if nd_entry is None or nd_entry.state in {ND_INCOMPLETE, ND_FAILED}:
+                    return
+                mac_address = nd_entry.mac_address
+
+            if nd_entry is None or nd_entry.state in {ND_INCOMPLETE, ND_FAILED}:
+                if nd_entry is None:
+                    nd_entry = self.CacheEntry(ip6_address)
+                    if not self.nd_cache.insert(ip6_address, nd_entry):
+                        self.logger.debug(f"ICMPv6 ND cache full, unable to add entry {ip6_address} -> {mac_address}")
+                        return
+                nd_entry.mac_address = mac_address
+                self.__confirm_or_stale(nd_entry, solicited)
+                self.__flush_hold_queue(ip6_address, mac_address)
+                return
+
+            mac_changed = mac_address != nd_entry.mac_address
+
+            # Advertisement that doesn't override existing entry can only make it stale
+            if mac_changed and not override:
+                if nd_entry.state == ND_REACHABLE:
+                    self.__change_state(nd_entry, ND_STALE, ND_ENTRY_STALE_TIME)
+                return
+
+            nd_entry.mac_address = mac_address
+            if mac_changed:
+                self.nd_cache.invalidate()
+            if solicited or mac_changed:
+                self.__confirm_or_stale(nd_entry, solicited)
+
+    def __confirm_or_stale(self, nd_entry, confirmed):
+        """ Move entry into REACHABLE state if its reachability has been confirmed, into STALE otherwise """
+
+        if confirmed:
+            nd_entry.confirmed = timer_tick()
+            self.__change_state(nd_entry, ND_REACHABLE, self.reachable_time)
+        else:
+            self.__change_state(nd_entry, ND_STALE, ND_ENTRY_STALE_TIME)
+
+    def confirm_reachability(self, ip6_address):
+        """ Reachability confirmation from upper layer protocol, eg. TCP peer acknowledging new data (RFC 4861, section 7.3.1) """
+
+        with self.lock:
+            # Destinations outside of local networks are reached through gateway
+            if (nd_entry := self.nd_cache.get(ip6_address)) is None:
+                if (route := self.packet_handler.ip6_fib.lookup(ip6_address)) and route.gateway:
+                    nd_entry = self.nd_cache.get(route.gateway)
+
+            if nd_entry is None or nd_entry.state in {ND_INCOMPLETE, ND_FAILED}:
+                return
+
+            # Entries in REACHABLE state pick up the new confirmation time when their timer fires
+            nd_entry.confirmed = timer_tick()
+            if nd_entry.state != ND_REACHABLE:
+                self.__change_state(nd_entry, ND_REACHABLE, self.reachable_time)
+
+    def hold_packet(self, ip6_address, ether_packet_tx):
+        """ Park outbound packet till MAC address of its next hop gets resolved """
+
+        # Drop packet right away if neighbor has recently failed to get resolved
+        if (nd_entry := self.nd_cache.peek(ip6_address)) and nd_entry.state == ND_FAILED:
+            self.hold_queue.reject()
+            self.logger.debug(f"{ether_packet_tx.tracker} - Recent address resolution for {ip6_address} failed, dropping packet")
+            return
+
+        self.hold_queue.hold(ip6_address, ether_packet_tx)
+        self.logger.debug(f"{ether_packet_tx.tracker} - Parked packet waiting for {ip6_address} to get resolved ({self.hold_queue})")
+
+        # Cover the case of neighbor being resolved between cache lookup and parking the packet
+        with self.lock:
+            if (nd_entry := self.nd_cache.peek(ip6_address)) and nd_entry.state not in {ND_INCOMPLETE, ND_FAILED}:
+                self.__flush_hold_queue(ip6_address, nd_entry.mac_address)
+
+    def __flush_hold_queue(self, ip6_address, mac_address):
+        """ Send out packets that have been waiting for neighbor to get resolved """
+
+        for ether_packet_tx in self.hold_queue.release(ip6_address):
+            ether_packet_tx.ether_dst = mac_address
+            self.logger.debug(f"{ether_packet_tx.tracker} - Resolved {ip6_address} to MAC {mac_address}, sending out parked packet")
+            self.packet_handler.tx_ring.enqueue(ether_packet_tx)
+
+    def note_use(self, ip6_address):
+        """ Account use of entry by packet sent out using cached egress state, using stale entry starts reachability verification (RFC 4861, section 7.3.3) """
+
+        if (nd_entry := self.nd_cache.peek(ip6_address)) and nd_entry.state == ND_STALE:
+            with self.lock:
+                if nd_entry.state == ND_STALE:
+                    self.__change_state(nd_entry, ND_DELAY, DELAY_FIRST_PROBE_TIME)
 
     def find_entry(self, ip6_address):
         """ Find entry in cache and return MAC address """
 
-        if nd_entry := self.nd_cache.get(ip6_address, None):
-            nd_entry.hit_count += 1
-            self.logger.debug(
-                f"Found {ip6_address} -> {nd_entry.mac_address} entry, age {time.time() - nd_entry.creation_time:.0f}s, hit_count {nd_entry.hit_count}"
-            )
+        with self.lock:
+            if (nd_entry := self.nd_cache.get(ip6_address)) is None:
+                nd_entry = self.CacheEntry(ip6_address)
+                if not self.nd_cache.insert(ip6_address, nd_entry):
+                    self.logger.debug(f"ICMPv6 ND cache full, unable to resolve {ip6_address}")
+                    return None
+                self.logger.debug(f"Unable to find entry for {ip6_address}, starting address resolution")
+                self.__change_state(nd_entry, ND_INCOMPLETE, RETRANS_TIMER)
+                self.__send_icmp6_neighbor_solicitation(nd_entry)
+                return None
+
+            # Only one address resolution is run for given address at a time, also don't retry address that has recently failed to get resolved
+            if nd_entry.state in {ND_INCOMPLETE, ND_FAILED}:
+                return None
+
+            # Using stale entry starts reachability verification, entry remains usable in the meantime
+            if nd_entry.state == ND_STALE:
+                self.__change_state(nd_entry, ND_DELAY, DELAY_FIRST_PROBE_TIME)
+
+            self.logger.debug(f"Found {ip6_address} -> {nd_entry.mac_address} entry, state {nd_entry.state}")
             return nd_entry.mac_address
 
-        self.logger.debug(f"Unable to find entry for {ip6_address}, sending ICMPv6 Neighbor Solicitation message")
-        self.__send_icmp6_neighbor_solicitation(ip6_address)
-        return None
+    def __send_icmp6_neighbor_solicitation(self, nd_entry):
+        """ Enqueue ICMPv6 Neighbor Solicitation packet with TX ring, multicast for address resolution and unicast for reachability probes """
 
-    def __send_icmp6_neighbor_solicitation(self, icmp6_ns_target_address):
-        """ Enqueue ICMPv6 Neighbor Solicitation packet with TX ring """
+        icmp6_ns_target_address = nd_entry.ip6_address
+        nd_entry.probe_count += 1
 
         # Pick apropriate source address
         ip6_src = IPv6Address("::")
@@ -130,7 +338,7 @@ class ICMPv6NdCache:
         # Send out ND Solicitation message
         self.packet_handler.phtx_icmp6(
             ip6_src=ip6_src,
-            ip6_dst=icmp6_ns_target_address.solicited_node_multicast,
+            ip6_dst=icmp6_ns_target_address.solicited_node_multicast if nd_entry.state == ND_INCOMPLETE else icmp6_ns_target_address,
             ip6_hop=255,
             icmp6_type=ps_icmp6.ICMP6_NEIGHBOR_SOLICITATION,
             icmp6_ns_target_address=icmp6_ns_target_address,
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+
+#
+# inet_cksum.py - module contains functions computing Internet Checksum (RFC 1071) and updating it incrementally (RFC 1624)
+#
+
+
+def inet_sum(data, init=0):
+    """ Compute one's complement sum of 16 bit words, partial sum of preceding data (eg. pseudo header) can be passed in as 'init' so data
+    doesn't need to be concatenated, data of odd length is treated as padded with zero byte so it can only be the last piece of chain """
+
+    # Since 0x10000 is congruent with 1 modulo 0xFFFF, reminder of the whole data taken as big integer equals one's complement sum of its words
+    cksum = int.from_bytes(data, "big")
+    if len(data) & 1:
+        cksum <<= 8
+    cksum += init
+
+    # Non zero sum congruent with zero is one's complement negative zero
+    return (cksum % 0xFFFF) or (0xFFFF if cksum else 0)
+
+
+def inet_cksum_fold(cksum):
+    """ Turn partial sum (possibly with 16 bit values like length fields added to it) into Internet Checksum """
+
+    return ~((cksum % 0xFFFF) or (0xFFFF if cksum else 0)) & 0xFFFF
+
+
+def inet_cksum(data, init=0):
+    """ Compute Internet Checksum used by IP/TCP/UDP/ICMPv4 protocols, partial sum of preceding data can be passed in as 'init' """
+
+    return inet_cksum_fold(inet_sum(data, init))
+
+
+def inet_cksum_update(cksum, old_data, new_data):
+    """ Update checksum after header field(s) at even offset changed from old_data to new_data, HC' = ~(~HC + ~m + m') (RFC 1624, eqn. 3) """
+
+    return inet_cksum_fold((~cksum & 0xFFFF) + (0xFFFF - inet_sum(old_data)) + inet_sum(new_data))
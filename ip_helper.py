@@ -41,20 +41,14 @@
 #
 
 
-import struct
 from ipaddress import AddressValueError
 
 from ipv4_address import IPv4Address
 from ipv6_address import IPv6Address
 
-
-def inet_cksum(data):
-    """ Compute Internet Checksum used by IP/TCP/UDP/ICMPv4 protocols """
-
-    data = data + (b"\0" if len(data) & 1 else b"")
-    cksum = sum(struct.unpack(f"! {len(data) >> 1}H", data))
-    cksum = (cksum >> 16) + (cksum & 0xFFFF)
-    return ~(cksum + (cksum >> 16)) & 0xFFFF
+# IPv4 addresses are keyed as IPv4 mapped IPv6 addresses (::ffff:0:0/96), key belongs to IPv4 only when its upper 96 bits equal exactly 0xffff,
+# testing just the 0xffff bit mask would also match native IPv6 addresses that happen to have bits 32-47 set (eg. 2001:db8::ffff:a00:1)
+IP4_MAPPED = 0xFFFF00000000
 
 
 def ip_pick_version(ip_address):
@@ -64,3 +58,15 @@ def ip_pick_version(ip_address):
         return IPv6Address(ip_address)
     except AddressValueError:
         return IPv4Address(ip_address)
+
+
+def ip_key(ip_address):
+    """ Convert IP address into integer used as part of lookup keys, 'None' represents wildcard address matching both IPv6 and IPv4 """
+
+    if ip_address == "*":
+        return None
+
+    if isinstance(ip_address, str):
+        ip_address = ip_pick_version(ip_address)
+
+    return int(ip_address) | IP4_MAPPED if ip_address.version == 4 else int(ip_address)
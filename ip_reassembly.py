@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# ip_reassembly.py - module contains class supporting bounded reassembly of fragmented IP datagrams
+#
+
+
+import threading
+from collections import OrderedDict
+
+import loguru
+
+import stack
+
+# Last octet of the hole that ends where datagram ends, before its length is known (RFC 815 'infinity')
+HOLE_INFINITY = 0xFFFFFFFF
+
+
+class IpReassemblyDatagram:
+    """ Container class for fragments of single datagram being reassembled """
+
+    def __init__(self, key):
+        self.key = key
+        self.holes = [(0, HOLE_INFINITY)]  # Hole descriptor list (RFC 815), first and last octet of each range of data still missing
+        self.fragments = []  # Received fragments as (offset, data), data is copied out of RX buffer as that is going to be reused
+        self.data_len = 0  # Length of data received so far, it's charged against memory limits
+        self.header = None  # Protocol specific information taken from the first fragment (eg. IPv6 next header)
+        self.raw_data = None  # Reassembled datagram data
+        self.timer = None
+
+
+class IpReassembly:
+    """ Bounded IP datagram reassembly engine with hole tracking, overlap rejection, memory limits and timeout based eviction """
+
+    def __init__(self, name, timeout, max_size, memory_limit):
+        """ Class constructor """
+
+        self.logger = loguru.logger.bind(object_name=f"{name}_reassembly.")
+
+        # Incomplete datagram is discarded after timeout (ms), single datagram can't be larger than max_size and all of them together can't hold more
+        # than memory_limit bytes of data, the oldest datagrams are evicted to make room for new fragments once memory limit is reached
+        self.timeout = timeout
+        self.max_size = max_size
+        self.memory_limit = memory_limit
+
+        self.lock = threading.Lock()
+        self.datagrams = OrderedDict()
+        self.memory = 0
+
+        self.reassembled = 0
+        self.timed_out = 0
+        self.evicted = 0
+        self.dropped = 0
+
+    def __str__(self):
+        """ Reassembly engine statistics string """
+
+        return (
+            f"datagrams {len(self.datagrams)}, memory {self.memory}/{self.memory_limit}, reassembled {self.reassembled}, "
+            + f"timed out {self.timed_out}, evicted {self.evicted}, dropped {self.dropped}"
+        )
+
+    def __discard(self, datagram):
+        """ Remove datagram and release memory it holds """
+
+        del self.datagrams[datagram.key]
+        self.memory -= datagram.data_len
+        if datagram.timer:
+            datagram.timer.cancel()
+
+    def __timer_event(self, key):
+        """ Discard datagram that hasn't been completed in time """
+
+        with self.lock:
+            if (datagram := self.datagrams.get(key, None)) is not None:
+                self.__discard(datagram)
+                self.timed_out += 1
+                self.logger.debug(f"Reassembly of datagram {key} timed out, discarded {len(datagram.fragments)} fragment(s)")
+
+    def __drop(self, datagram, reason):
+        """ Discard whole datagram along with fragment that invalidated it """
+
+        self.__discard(datagram)
+        self.dropped += 1
+        self.logger.warning(f"Discarded datagram {datagram.key} - {reason}")
+
+    def add_fragment(self, key, offset, data, more_fragments, header=None):
+        """ Add fragment to datagram identified by key, return reassembled datagram once the last missing fragment arrives """
+
+        first = offset
+        last = offset + len(data) - 1
+
+        with self.lock:
+            if (datagram := self.datagrams.get(key, None)) is None:
+                datagram = self.datagrams[key] = IpReassemblyDatagram(key)
+                datagram.timer = stack.timer.schedule(self.timeout, self.__timer_event, args=[key])
+
+            # Fragment would make datagram larger than allowed
+            if last >= self.max_size:
+                self.__drop(datagram, f"fragment at offset {offset} exceeds maximum datagram size {self.max_size}")
+                return None
+
+            # Find hole fragment belongs to, it needs to fit entirely in it, fragment overlapping already received data could be used to alter
+            # data that has been checked already (eg. by firewall), such datagram is discarded as whole (RFC 5722)
+            for index, (hole_first, hole_last) in enumerate(datagram.holes):
+                if first > hole_last or last < hole_first:
+                    continue
+                if first < hole_first or last > hole_last:
+                    self.__drop(datagram, f"fragment at offset {offset} overlaps already received data")
+                    return None
+                # Last fragment needs to fill the hole that ends with datagram end, anything else means received data lies past its end
+                if not more_fragments and hole_last != HOLE_INFINITY:
+                    self.__drop(datagram, f"last fragment at offset {offset} ends before already received data")
+                    return None
+                break
+
+            # Fragment falls entirely into data that has been received already, it's a duplicate
+            else:
+                self.logger.debug(f"Ignored duplicate fragment of datagram {key} at offset {offset}")
+                return None
+
+            # Make room for fragment data, the oldest incomplete datagrams go first
+            while self.memory + len(data) > self.memory_limit and len(self.datagrams) > 1:
+                oldest = next(iter(self.datagrams.values()))
+                if oldest is datagram:
+                    self.datagrams.move_to_end(key)
+                    continue
+                self.__discard(oldest)
+                self.evicted += 1
+                self.logger.debug(f"Evicted incomplete datagram {oldest.key} to stay within {self.memory_limit} byte memory limit")
+            if self.memory + len(data) > self.memory_limit:
+                self.__drop(datagram, f"fragment at offset {offset} doesn't fit into {self.memory_limit} byte memory limit")
+                return None
+
+            # Replace hole with what remains of it on either side of fragment (RFC 815)
+            datagram.holes[index : index + 1] = [
+                *([(hole_first, first - 1)] if first > hole_first else []),
+                *([(last + 1, hole_last)] if last < hole_last and more_fragments else []),
+            ]
+
+            datagram.fragments.append((offset, bytes(data)))
+            if offset == 0:
+                datagram.header = header
+            datagram.data_len += len(data)
+            self.memory += len(data)
+
+            if datagram.holes:
+                return None
+
+            # All the holes are filled, copy fragments into datagram buffer allocated to its final size
+            self.__discard(datagram)
+            self.reassembled += 1
+
+        datagram.raw_data = bytearray(datagram.data_len)
+        for offset, fragment in datagram.fragments:
+            datagram.raw_data[offset : offset + len(fragment)] = fragment
+
+        self.logger.debug(f"Reassembled datagram {key} out of {len(datagram.fragments)} fragments, {datagram.data_len} bytes")
+        return datagram
@@ -42,6 +42,8 @@
 
 import ipaddress
 
+from mac_address import MacAddress
+
 
 class IPv4Interface(ipaddress.IPv4Interface):
     """ Extensions for ipaddress.IPv4Address class """
@@ -86,8 +88,21 @@ class IPv4Network(ipaddress.IPv4Network):
 class IPv4Address(ipaddress.IPv4Address):
     """ Extensions for ipaddress.IPv4Address class """
 
+    def __init__(self, address):
+        """ Class constructor, accepts memoryview of received packet in addition to standard address formats """
+
+        super().__init__(bytes(address) if isinstance(address, memoryview) else address)
+
     @property
     def is_limited_broadcast(self):
         """ Check if IPv4 address is a limited broadcast """
 
         return str(self) == "255.255.255.255"
+
+    @property
+    def multicast_mac(self):
+        """ Create IPv4 multicast MAC address """
+
+        assert self.is_multicast
+
+        return MacAddress(bytes((0x01, 0x00, 0x5E, self.packed[1] & 0x7F, self.packed[2], self.packed[3])))
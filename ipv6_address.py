@@ -41,7 +41,8 @@
 #
 
 import ipaddress
-from re import sub
+
+from mac_address import MacAddress
 
 
 class IPv6Interface(ipaddress.IPv6Interface):
@@ -104,16 +105,19 @@ class IPv6Network(ipaddress.IPv6Network):
 
         assert self.prefixlen == 64
 
-        eui64 = sub(r"[.:-]", "", mac).lower()
-        eui64 = eui64[0:6] + "fffe" + eui64[6:]
-        eui64 = hex(int(eui64[0:2], 16) ^ 2)[2:].zfill(2) + eui64[2:]
-        eui64 = ":".join(eui64[_ : _ + 4] for _ in range(0, 16, 4))
-        return IPv6Interface(self.network_address.exploded[0:20] + eui64 + "/" + str(self.prefixlen))
+        mac = MacAddress(mac)
+        eui64 = bytes([mac[0] ^ 0x02]) + mac[1:3] + b"\xff\xfe" + mac[3:6]
+        return IPv6Interface((int(self.network_address) | int.from_bytes(eui64, "big"), self.prefixlen))
 
 
 class IPv6Address(ipaddress.IPv6Address):
     """ Extensions for ipaddress.IPv6Address class """
 
+    def __init__(self, address):
+        """ Class constructor, accepts memoryview of received packet in addition to standard address formats """
+
+        super().__init__(bytes(address) if isinstance(address, memoryview) else address)
+
     @property
     def solicited_node_multicast(self):
         """ Create IPv6 solicited node multicast address """
@@ -138,4 +142,4 @@ class IPv6Address(ipaddress.IPv6Address):
 
         assert self.is_multicast
 
-        return "33:33:" + ":".join(["".join(self.exploded[-9:].split(":"))[_ : _ + 2] for _ in range(0, 8, 2)])
+        return MacAddress(b"\x33\x33" + self.packed[-4:])
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# mac_address.py - module contains compact binary MAC address class
+#
+
+
+class MacAddress(bytes):
+    """ MAC address kept as 6 byte binary value, string form is only built when needed for logging """
+
+    def __new__(cls, address):
+        """ Class constructor, accepts 'aa:bb:cc:dd:ee:ff' string or 6 bytes of binary data """
+
+        if type(address) is MacAddress:
+            return address
+
+        if isinstance(address, str):
+            address = bytes.fromhex(address.replace(":", "").replace("-", ""))
+
+        self = super().__new__(cls, address)
+
+        if len(self) != 6:
+            raise ValueError(f"Invalid MAC address length: {len(self)}")
+
+        return self
+
+    def __str__(self):
+        """ Address in 'aa:bb:cc:dd:ee:ff' format, formatted once and cached """
+
+        try:
+            return self.__dict__["str"]
+        except KeyError:
+            self.__dict__["str"] = ":".join(f"{_:0>2x}" for _ in self)
+            return self.__dict__["str"]
+
+    def __repr__(self):
+        """ Address representation """
+
+        return f"MacAddress('{self}')"
+
+    def __format__(self, format_spec):
+        """ Make f-string formatting use string form of the address """
+
+        return format(str(self), format_spec)
+
+    @property
+    def is_unspecified(self):
+        """ Check if address is unspecified (all zeros) """
+
+        return self == MAC_UNSPECIFIED
+
+    @property
+    def is_broadcast(self):
+        """ Check if address is broadcast """
+
+        return self == MAC_BROADCAST
+
+    @property
+    def is_multicast(self):
+        """ Check if address is multicast (group bit set) """
+
+        return bool(self[0] & 0x01)
+
+
+MAC_UNSPECIFIED = MacAddress(bytes(6))
+MAC_BROADCAST = MacAddress(b"\xff" * 6)
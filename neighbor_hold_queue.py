@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# neighbor_hold_queue.py - module contains class supporting queue of packets waiting for ARP / ICMPv6 ND resolution
+#
+
+
+import threading
+from collections import deque
+
+import stack
+
+
+class NeighborHoldQueue:
+    """ Per neighbor queues of outbound packets parked till neighbor's MAC address gets resolved """
+
+    def __init__(self, queue_len, timeout):
+        """ Class constructor """
+
+        self.queue_len = queue_len
+        self.timeout = timeout
+
+        self.lock = threading.Lock()
+        self.queues = {}
+        self.timers = {}
+
+        self.held = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.timed_out = 0
+        self.rejected = 0
+
+    def __str__(self):
+        """ Hold queue statistics string """
+
+        return f"neighbors {len(self.queues)}, held {self.held}, flushed {self.flushed}, dropped {self.dropped}, timed out {self.timed_out}, rejected {self.rejected}"
+
+    def hold(self, ip_address, packet):
+        """ Park packet till neighbor gets resolved, the oldest packet is dropped if neighbor's queue is full """
+
+        with self.lock:
+            if (queue := self.queues.get(ip_address, None)) is None:
+                queue = self.queues[ip_address] = deque()
+                # Give up on all the packets parked for neighbor if it doesn't get resolved in time
+                self.timers[ip_address] = stack.timer.schedule(self.timeout, self.__expire, args=[ip_address])
+
+            if len(queue) >= self.queue_len:
+                queue.popleft()
+                self.dropped += 1
+
+            queue.append(packet)
+            self.held += 1
+
+    def reject(self):
+        """ Account for packet dropped because its neighbor has recently failed to get resolved """
+
+        with self.lock:
+            self.rejected += 1
+
+    def release(self, ip_address):
+        """ Return all packets parked for neighbor that just got resolved """
+
+        with self.lock:
+            if (queue := self.queues.pop(ip_address, None)) is None:
+                return []
+            self.timers.pop(ip_address).cancel()
+            self.flushed += len(queue)
+
+        return list(queue)
+
+    def discard(self, ip_address):
+        """ Drop packets of neighbor that failed to get resolved """
+
+        with self.lock:
+            if queue := self.queues.pop(ip_address, None):
+                self.timers.pop(ip_address).cancel()
+                self.timed_out += len(queue)
+
+    def __expire(self, ip_address):
+        """ Drop packets of neighbor that didn't get resolved in time """
+
+        with self.lock:
+            if queue := self.queues.pop(ip_address, None):
+                self.timers.pop(ip_address)
+                self.timed_out += len(queue)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+
+#
+# neighbor_table.py - module contains class supporting bounded neighbor table shared by ARP and ICMPv6 ND caches
+#
+
+
+import heapq
+import itertools
+import threading
+from collections import OrderedDict
+
+from timer import timer_tick
+
+
+class NeighborTable:
+    """ Bounded LRU table of neighbor cache entries with garbage collection thresholds and deadline ordered expiry """
+
+    def __init__(self, gc_thresh1, gc_thresh2, gc_thresh3, gc_interval, gc_protect_time, evict_callback=None):
+        """ Class constructor """
+
+        # Garbage collection never runs below gc_thresh1, runs at most once per gc_interval above gc_thresh2, and always runs when gc_thresh3 is reached
+        self.gc_thresh1 = gc_thresh1
+        self.gc_thresh2 = gc_thresh2
+        self.gc_thresh3 = gc_thresh3
+        self.gc_interval = gc_interval
+
+        # Entries confirmed within this time (ms) are never evicted, same as permanent entries
+        self.gc_protect_time = gc_protect_time
+
+        # Method called for every evicted entry so the owner can cancel its timers and discard its parked packets
+        self.evict_callback = evict_callback
+
+        self.lock = threading.RLock()
+        self.entries = OrderedDict()
+        self.deadlines = []
+        self.sequence = itertools.count()
+        self.last_gc = timer_tick()
+
+        # Generation is bumped whenever MAC address or usability of neighbor changes, anything that caches resolved neighbors can use it to detect
+        # they are not current anymore, refreshing entry with unchanged MAC address keeps it so cached state stays valid
+        self.generation = 0
+
+        self.evicted = 0
+        self.rejected = 0
+
+    def __str__(self):
+        """ Neighbor table statistics string """
+
+        return f"entries {len(self.entries)}/{self.gc_thresh3}, evicted {self.evicted}, rejected {self.rejected}"
+
+    def __len__(self):
+        """ Number of entries in table """
+
+        return len(self.entries)
+
+    def __contains__(self, key):
+        """ Check if table contains entry for given address """
+
+        return key in self.entries
+
+    def __iter__(self):
+        """ Iterate over snapshot of table entries, the least recently used first """
+
+        with self.lock:
+            return iter(list(self.entries.items()))
+
+    def get(self, key):
+        """ Return entry and mark it as the most recently used one """
+
+        with self.lock:
+            if (entry := self.entries.get(key, None)) is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def peek(self, key):
+        """ Return entry without affecting its LRU position """
+
+        return self.entries.get(key, None)
+
+    def insert(self, key, entry):
+        """ Add entry to table, make room by evicting the least recently used unprotected entries if needed, return False if table is full """
+
+        with self.lock:
+            if key not in self.entries:
+                now = timer_tick()
+                if len(self.entries) >= self.gc_thresh3 or (len(self.entries) >= self.gc_thresh2 and now - self.last_gc >= self.gc_interval):
+                    self.__gc(now)
+                if len(self.entries) >= self.gc_thresh3:
+                    self.rejected += 1
+                    return False
+
+            # New entry can't be referred to by anything cached yet, only replacing one that resolves to different MAC address invalidates cached state
+            if (old_entry := self.entries.get(key, None)) is not None and old_entry.mac_address != entry.mac_address:
+                self.generation += 1
+
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            return True
+
+    def remove(self, key, entry=None):
+        """ Remove entry from table, if entry is given it's removed only if it's still the current one for given address """
+
+        with self.lock:
+            if entry is not None and self.entries.get(key, None) is not entry:
+                return None
+            if (entry := self.entries.pop(key, None)) is not None:
+                self.generation += 1
+            return entry
+
+    def invalidate(self):
+        """ Bump generation after MAC address or usability of existing entry has been changed in place """
+
+        self.generation += 1
+
+    def set_deadline(self, key, entry, deadline):
+        """ Set the time (timer ticks) at which entry is going to be returned by expire() """
+
+        with self.lock:
+            entry.deadline = deadline
+            heapq.heappush(self.deadlines, (deadline, next(self.sequence), key, entry))
+
+            # Drop heap items left behind by replaced and removed entries so heap doesn't outgrow table
+            if len(self.deadlines) > 2 * max(len(self.entries), self.gc_thresh1):
+                self.deadlines = [_ for _ in self.deadlines if self.entries.get(_[2], None) is _[3] and _[3].deadline == _[0]]
+                heapq.heapify(self.deadlines)
+
+    def expire(self):
+        """ Return entries whose deadline has passed, cost is proportional to number of such entries rather than table size """
+
+        now = timer_tick()
+        expired = []
+
+        with self.lock:
+            while self.deadlines and self.deadlines[0][0] <= now:
+                deadline, _, key, entry = heapq.heappop(self.deadlines)
+
+                # Skip heap items belonging to entries that have been replaced, removed or got their deadline moved
+                if self.entries.get(key, None) is not entry or entry.deadline != deadline:
+                    continue
+
+                entry.deadline = None
+                expired.append((key, entry))
+
+        return expired
+
+    def __gc(self, now):
+        """ Evict the least recently used entries that are neither permanent nor recently confirmed till table shrinks to gc_thresh1 """
+
+        self.last_gc = now
+
+        for key, entry in list(self.entries.items()):
+            if len(self.entries) <= self.gc_thresh1:
+                break
+
+            if entry.permanent or (entry.confirmed is not None and now - entry.confirmed < self.gc_protect_time):
+                continue
+
+            del self.entries[key]
+            self.generation += 1
+            self.evicted += 1
+            if self.evict_callback:
+                self.evict_callback(key, entry)
@@ -52,10 +52,16 @@ import ps_arp
 import ps_dhcp
 import ps_icmp6
 import stack
+from address_table import AddressTable
 from arp_cache import ArpCache
+from egress_cache import EgressCache
+from fib import Fib
 from icmp6_nd_cache import ICMPv6NdCache
-from ipv4_address import IPv4Address, IPv4Interface
+from ip_reassembly import IpReassembly
+from ipv4_address import IPv4Address, IPv4Interface, IPv4Network
 from ipv6_address import IPv6Address, IPv6Interface, IPv6Network
+from mac_address import MAC_BROADCAST, MAC_UNSPECIFIED, MacAddress
+from pmtu_cache import PmtuCache
 from rx_ring import RxRing
 from tx_ring import TxRing
 from udp_metadata import UdpMetadata
@@ -92,14 +98,29 @@ class PacketHandler:
         # MAC and IPv6 Multicast lists hold duplicate entries by design. This is to accomodate IPv6 Solicited Node Multicast mechanism where multiple
         # IPv6 unicast addresses can be tied to the same SNM address (and the same multicast MAC). This is important when removing one of unicast addresses,
         # so the other ones keep it's SNM entry in multicast list. Its the simplest solution and imho perfectly valid one in this case.
-        self.mac_unicast = config.mac_address
+        self.mac_unicast = MacAddress(config.mac_address)
         self.mac_multicast = []
-        self.mac_broadcast = "ff:ff:ff:ff:ff:ff"
+        self.mac_broadcast = MAC_BROADCAST
         self.ip6_address = []
         self.ip6_multicast = []
         self.ip4_address = []
         self.ip4_multicast = []
 
+        # Routing tables, on-link and default routes get created along with interface addresses
+        self.ip6_fib = Fib(128, config.fib_dst_cache_size)
+        self.ip4_fib = Fib(32, config.fib_dst_cache_size)
+
+        # Path MTU caches, fed by ICMPv6 Packet Too Big and ICMPv4 Fragmentation Needed messages
+        self.ip6_pmtu_cache = PmtuCache("ip6", config.mtu, 1280, config.pmtu_timeout, config.pmtu_cache_size)
+        self.ip4_pmtu_cache = PmtuCache("ip4", config.mtu, 68, config.pmtu_timeout, config.pmtu_cache_size)
+
+        # Resolved egress state of outbound flows, entries are tied to routing table and neighbor cache generations
+        self.egress_cache = EgressCache(config.egress_cache_size)
+
+        # Reassembly of inbound fragmented datagrams
+        self.ip4_reassembly = IpReassembly("ip4", config.ip4_reassembly_timeout, config.ip4_reassembly_max_size, config.ip4_reassembly_memory_limit)
+        self.ip6_reassembly = IpReassembly("ip6", config.ip6_reassembly_timeout, config.ip6_reassembly_max_size, config.ip6_reassembly_memory_limit)
+
         self.rx_ring = RxRing(tap)
         self.tx_ring = TxRing(tap)
         self.arp_cache = ArpCache(self)
@@ -120,6 +141,21 @@ class PacketHandler:
         # Used to keep IPv4 packet ID last value
         self.ip4_packet_id = 0
 
+        # Used to keep IPv6 fragment identification last value, it starts at random value so it's not easy to guess (RFC 7739)
+        self.ip6_frag_id = random.randint(0, 0xFFFFFFFF)
+
+        # Lookup tables of addresses stack owns and listens on, rebuilt on every address change
+        self.address_table_lock = threading.Lock()
+        self.address_table = None
+        self.publish_address_table()
+
+        # RX batch statistics, latency is measured from batch pickup till the last packet of the batch is processed
+        self.rx_batch_count = 0
+        self.rx_batch_packets = 0
+        self.rx_batch_max = 0
+        self.rx_batch_latency_total_ns = 0
+        self.rx_batch_latency_max_ns = 0
+
         # Start packed handler so we can receive packets from network
         threading.Thread(target=self.__thread_packet_handler).start()
         self.logger.debug("Started packet handler")
@@ -130,6 +166,7 @@ class PacketHandler:
             # Create list of IPv6 unicast/multicast addresses stack should listen on
             self.ip6_address_candidate = self.parse_stack_ip6_address_candidate(config.ip6_address_candidate)
             self.create_stack_ip6_addressing()
+            self.add_static_routes(self.ip6_fib, config.ip6_static_routes, IPv6Network, IPv6Address, self.ip6_address)
 
         if config.ip4_support:
             # Create list of IPv4 unicast/multicast/broadcast addresses stack should listen on, use DHCP if enabled
@@ -137,6 +174,7 @@ class PacketHandler:
             ip4_address_dhcp = [ip4_address_dhcp] if ip4_address_dhcp[0] else []
             self.ip4_address_candidate = self.parse_stack_ip4_address_candidate(config.ip4_address_candidate + ip4_address_dhcp)
             self.create_stack_ip4_addressing()
+            self.add_static_routes(self.ip4_fib, config.ip4_static_routes, IPv4Network, IPv4Address, self.ip4_address)
 
         # Log all the addresses stack will listen on
         self.logger.info(f"Stack listening on unicast MAC address: {self.mac_unicast}")
@@ -156,27 +194,67 @@ class PacketHandler:
         """ Thread picks up incoming packets from RX ring and processes them """
 
         while True:
-            self.phrx_ether(self.rx_ring.dequeue())
+            batch = self.rx_ring.dequeue_batch(config.rx_batch_budget)
+            batch_start = time.perf_counter_ns()
+
+            for ether_packet_rx in batch:
+                self.phrx_ether(ether_packet_rx)
+                self.rx_ring.release(ether_packet_rx)
+
+            latency = time.perf_counter_ns() - batch_start
+            self.rx_batch_count += 1
+            self.rx_batch_packets += len(batch)
+            self.rx_batch_max = max(self.rx_batch_max, len(batch))
+            self.rx_batch_latency_total_ns += latency
+            self.rx_batch_latency_max_ns = max(self.rx_batch_latency_max_ns, latency)
+
+    def publish_address_table(self):
+        """ Rebuild address lookup tables after change of stack addresses and replace the current ones in single step """
+
+        with self.address_table_lock:
+            self.address_table = AddressTable(
+                generation=self.address_table.generation + 1 if self.address_table else 0,
+                mac_unicast=self.mac_unicast,
+                mac_multicast=self.mac_multicast,
+                mac_broadcast=self.mac_broadcast,
+                ip6_address=self.ip6_address,
+                ip6_multicast=self.ip6_multicast,
+                ip4_address=self.ip4_address,
+                ip4_multicast=self.ip4_multicast,
+            )
+
+    @property
+    def rx_batch_stats(self):
+        """ RX batch statistics string """
+
+        batch_count = self.rx_batch_count or 1
+        return (
+            f"batches {self.rx_batch_count}, packets {self.rx_batch_packets}, avg batch {self.rx_batch_packets / batch_count:.1f}, max batch {self.rx_batch_max}, "
+            + f"avg latency {self.rx_batch_latency_total_ns / batch_count / 1000:.1f} us, max latency {self.rx_batch_latency_max_ns / 1000:.1f} us"
+        )
 
     @property
     def ip6_unicast(self):
         """ Return list of stack's IPv6 unicast addresses """
 
-        return [_.ip for _ in self.ip6_address]
+        return self.address_table.ip6_unicast
+
+    def path_mtu(self, ip_dst):
+        """ Return path MTU towards destination """
+
+        return self.ip6_pmtu_cache.get(ip_dst) if ip_dst.version == 6 else self.ip4_pmtu_cache.get(ip_dst)
 
     @property
     def ip4_unicast(self):
         """ Return list of stack's IPv4 unicast addresses """
 
-        return [_.ip for _ in self.ip4_address]
+        return self.address_table.ip4_unicast
 
     @property
     def ip4_broadcast(self):
         """ Return list of stack's IPv4 broadcast addresses """
 
-        ip4_broadcast = [_.network.broadcast_address for _ in self.ip4_address]
-        ip4_broadcast.append("255.255.255.255")
-        return ip4_broadcast
+        return self.address_table.ip4_broadcast
 
     def perform_ip6_nd_dad(self, ip6_unicast_candidate):
         """ Perform IPv6 ND Duplicate Address Detection, return True if passed """
@@ -325,7 +403,7 @@ class PacketHandler:
         for ip4_address in list(self.ip4_address_candidate):
             self.ip4_address_candidate.remove(ip4_address)
             if ip4_address.ip not in self.arp_probe_unicast_conflict:
-                self.ip4_address.append(ip4_address)
+                self.assign_ip4_address(ip4_address)
                 self.send_arp_announcement(ip4_address.ip)
                 self.logger.debug(f"Succesfully claimed IPv4 address {ip4_unicast}")
 
@@ -335,16 +413,40 @@ class PacketHandler:
             config.ip4_support = False
             return
 
+    def add_static_routes(self, fib, static_routes, network_class, address_class, stack_addresses):
+        """ Add configured static routes to routing table, source address is taken from the local network gateway belongs to """
+
+        for network, gateway, metric in static_routes:
+            try:
+                network = network_class(network)
+                gateway = address_class(gateway)
+            except ValueError:
+                self.logger.warning(f"Invalid static route '{network}' via '{gateway}' format, skiping...")
+                continue
+
+            # Link local gateway is reachable from any network, prefer the first global address as source
+            if gateway.is_link_local:
+                src = next((_.ip for _ in stack_addresses if not _.is_link_local), None) or next((_.ip for _ in stack_addresses), None)
+            else:
+                src = next((_.ip for _ in stack_addresses if gateway in _.network and gateway != _.ip), None)
+
+            if src is None:
+                self.logger.warning(f"Gateway {gateway} of static route {network} is not reachable through any local network, skiping...")
+                continue
+
+            route = fib.add_route(network, gateway=gateway, metric=metric, src=src)
+            self.logger.debug(f"Added static route {route}")
+
     def send_arp_probe(self, ip4_unicast):
         """ Send out ARP probe to detect possible IP conflict """
 
         self.phtx_arp(
             ether_src=self.mac_unicast,
-            ether_dst="ff:ff:ff:ff:ff:ff",
+            ether_dst=MAC_BROADCAST,
             arp_oper=ps_arp.ARP_OP_REQUEST,
             arp_sha=self.mac_unicast,
             arp_spa=IPv4Address("0.0.0.0"),
-            arp_tha="00:00:00:00:00:00",
+            arp_tha=MAC_UNSPECIFIED,
             arp_tpa=ip4_unicast,
         )
         self.logger.debug(f"Sent out ARP probe for {ip4_unicast}")
@@ -354,11 +456,11 @@ class PacketHandler:
 
         self.phtx_arp(
             ether_src=self.mac_unicast,
-            ether_dst="ff:ff:ff:ff:ff:ff",
+            ether_dst=MAC_BROADCAST,
             arp_oper=ps_arp.ARP_OP_REQUEST,
             arp_sha=self.mac_unicast,
             arp_spa=ip4_unicast,
-            arp_tha="00:00:00:00:00:00",
+            arp_tha=MAC_UNSPECIFIED,
             arp_tpa=ip4_unicast,
         )
         self.logger.debug(f"Sent out ARP Announcement for {ip4_unicast}")
@@ -368,11 +470,11 @@ class PacketHandler:
 
         self.phtx_arp(
             ether_src=self.mac_unicast,
-            ether_dst="ff:ff:ff:ff:ff:ff",
+            ether_dst=MAC_BROADCAST,
             arp_oper=ps_arp.ARP_OP_REPLY,
             arp_sha=self.mac_unicast,
             arp_spa=ip4_unicast,
-            arp_tha="00:00:00:00:00:00",
+            arp_tha=MAC_UNSPECIFIED,
             arp_tpa=ip4_unicast,
         )
         self.logger.debug(f"Sent out Gratitous ARP for {ip4_unicast}")
@@ -424,6 +526,8 @@ class PacketHandler:
         """ Assign IPv6 unicast address to the list stack listens on """
 
         self.ip6_address.append(ip6_address)
+        self.ip6_fib.add_interface_routes(ip6_address, IPv6Network("::/0"))
+        self.publish_address_table()
         self.logger.debug(f"Assigned IPv6 unicast address {ip6_address}")
         self.assign_ip6_multicast(ip6_address.solicited_node_multicast)
 
@@ -431,13 +535,32 @@ class PacketHandler:
         """ Remove IPv6 unicast address from the list stack listens on """
 
         self.ip6_address.remove(ip6_address)
+        self.ip6_fib.remove_interface_routes(ip6_address, IPv6Network("::/0"))
+        self.publish_address_table()
         self.logger.debug(f"Removed IPv6 unicast address {ip6_address}")
         self.remove_ip6_multicast(ip6_address.solicited_node_multicast)
 
+    def assign_ip4_address(self, ip4_address):
+        """ Assign IPv4 unicast address to the list stack listens on """
+
+        self.ip4_address.append(ip4_address)
+        self.ip4_fib.add_interface_routes(ip4_address, IPv4Network("0.0.0.0/0"))
+        self.publish_address_table()
+        self.logger.debug(f"Assigned IPv4 unicast address {ip4_address}")
+
+    def remove_ip4_address(self, ip4_address):
+        """ Remove IPv4 unicast address from the list stack listens on """
+
+        self.ip4_address.remove(ip4_address)
+        self.ip4_fib.remove_interface_routes(ip4_address, IPv4Network("0.0.0.0/0"))
+        self.publish_address_table()
+        self.logger.debug(f"Removed IPv4 unicast address {ip4_address}")
+
     def assign_ip6_multicast(self, ip6_multicast):
         """ Assign IPv6 multicast address to the list stack listens on """
 
         self.ip6_multicast.append(ip6_multicast)
+        self.publish_address_table()
         self.logger.debug(f"Assigned IPv6 multicast {ip6_multicast}")
         self.assign_mac_multicast(ip6_multicast.multicast_mac)
 
@@ -449,6 +572,7 @@ class PacketHandler:
         """ Remove IPv6 multicast address from the list stack listens on """
 
         self.ip6_multicast.remove(ip6_multicast)
+        self.publish_address_table()
         self.logger.debug(f"Removed IPv6 multicast {ip6_multicast}")
         self.remove_mac_multicast(ip6_multicast.multicast_mac)
 
@@ -456,12 +580,14 @@ class PacketHandler:
         """ Assign MAC multicast address to the list stack listens on """
 
         self.mac_multicast.append(mac_multicast)
+        self.publish_address_table()
         self.logger.debug(f"Assigned MAC multicast {mac_multicast}")
 
     def remove_mac_multicast(self, mac_multicast):
         """ Remove MAC multicast address from the list stack listens on """
 
         self.mac_multicast.remove(mac_multicast)
+        self.publish_address_table()
         self.logger.debug(f"Removed MAC multicast {mac_multicast}")
 
     def __dhcp4_client(self):
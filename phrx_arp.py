@@ -59,12 +59,12 @@ def phrx_arp(self, ether_packet_rx, arp_packet_rx):
 
     if arp_packet_rx.arp_oper == ps_arp.ARP_OP_REQUEST:
         # Check if request contains our IP address in SPA field, this indicates IP address conflict
-        if arp_packet_rx.arp_spa in self.ip4_unicast:
+        if int(arp_packet_rx.arp_spa) in self.address_table.ip4_unicast_int:
             self.logger.warning(f"IP ({arp_packet_rx.arp_spa}) conflict detected with host at {arp_packet_rx.arp_sha}")
             return
 
         # Check if the request is for one of our IP addresses, if so the craft ARP reply packet and send it out
-        if arp_packet_rx.arp_tpa in self.ip4_unicast:
+        if int(arp_packet_rx.arp_tpa) in self.address_table.ip4_unicast_int:
             self.phtx_arp(
                 ether_src=self.mac_unicast,
                 ether_dst=arp_packet_rx.arp_sha,
@@ -103,7 +103,7 @@ def phrx_arp(self, ether_packet_rx, arp_packet_rx):
             return
 
         # Update ARP cache with maping received as gratuitous ARP reply
-        if ether_packet_rx.ether_dst == "ff:ff:ff:ff:ff:ff" and arp_packet_rx.arp_spa == arp_packet_rx.arp_tpa and ARP_CACHE_UPDATE_FROM_GRATUITOUS_REPLY:
+        if ether_packet_rx.ether_dst.is_broadcast and arp_packet_rx.arp_spa == arp_packet_rx.arp_tpa and ARP_CACHE_UPDATE_FROM_GRATUITOUS_REPLY:
             self.logger.debug(f"Adding/refreshing ARP cache entry from gratuitous reply - {arp_packet_rx.arp_spa} -> {arp_packet_rx.arp_sha}")
             self.arp_cache.add_entry(arp_packet_rx.arp_spa, arp_packet_rx.arp_sha)
             return
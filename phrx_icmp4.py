@@ -41,7 +41,11 @@
 #
 
 
+import struct
+
 import ps_icmp4
+from ipv4_address import IPv4Address
+from pmtu_cache import ip4_mtu_plateau
 
 
 def phrx_icmp4(self, ip4_packet_rx, icmp4_packet_rx):
@@ -53,6 +57,20 @@ def phrx_icmp4(self, ip4_packet_rx, icmp4_packet_rx):
 
     self.logger.opt(ansi=True).info(f"<green>{icmp4_packet_rx.tracker}</green> - {icmp4_packet_rx}")
 
+    # Lower path MTU towards destination of packet that router wasn't able to forward without fragmentation (RFC 1191)
+    if icmp4_packet_rx.icmp4_type == ps_icmp4.ICMP4_UNREACHABLE and icmp4_packet_rx.icmp4_code == ps_icmp4.ICMP4_UNREACHABLE__FAGMENTATION:
+        raw_packet = icmp4_packet_rx.icmp4_un_raw_data
+
+        # Message needs to quote header of packet that has been sent out by this stack
+        if len(raw_packet) < 20 or raw_packet[0] >> 4 != 4 or int(IPv4Address(raw_packet[12:16])) not in self.address_table.ip4_unicast_int:
+            self.logger.debug(f"Received ICMPv4 Fragmentation Needed message from {ip4_packet_rx.ip4_src} not related to any packet we sent, ignoring")
+            return
+
+        # Router that doesn't report next hop MTU gets it estimated based on length of the packet (RFC 1191)
+        mtu = icmp4_packet_rx.icmp4_un_mtu or ip4_mtu_plateau(struct.unpack("!H", raw_packet[2:4])[0])
+        self.ip4_pmtu_cache.update(IPv4Address(raw_packet[16:20]), mtu)
+        return
+
     # Respond to ICMPv4 Echo Request packet
     if icmp4_packet_rx.icmp4_type == ps_icmp4.ICMP4_ECHOREQUEST:
         self.logger.debug(f"Received ICMPv4 Echo Request packet from {ip4_packet_rx.ip4_src}, sending reply")
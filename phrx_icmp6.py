@@ -54,11 +54,23 @@ def phrx_icmp6(self, ip6_packet_rx, icmp6_packet_rx):
 
     self.logger.opt(ansi=True).info(f"<green>{icmp6_packet_rx.tracker}</green> - {icmp6_packet_rx}")
 
+    # Lower path MTU towards destination of packet that router wasn't able to forward (RFC 8201)
+    if icmp6_packet_rx.icmp6_type == ps_icmp6.ICMP6_PACKET_TOO_BIG:
+        raw_packet = icmp6_packet_rx.icmp6_ptb_raw_data
+
+        # Message needs to quote header of packet that has been sent out by this stack
+        if len(raw_packet) < 40 or raw_packet[0] >> 4 != 6 or int(IPv6Address(raw_packet[8:24])) not in self.address_table.ip6_unicast_int:
+            self.logger.debug(f"Received ICMPv6 Packet Too Big message from {ip6_packet_rx.ip6_src} not related to any packet we sent, ignoring")
+            return
+
+        self.ip6_pmtu_cache.update(IPv6Address(raw_packet[24:40]), icmp6_packet_rx.icmp6_ptb_mtu)
+        return
+
     # ICMPv6 Neighbor Solicitation packet
     if icmp6_packet_rx.icmp6_type == ps_icmp6.ICMP6_NEIGHBOR_SOLICITATION:
 
         # Check if request is for one of stack's IPv6 unicast addresses
-        if icmp6_packet_rx.icmp6_ns_target_address not in self.ip6_unicast:
+        if int(icmp6_packet_rx.icmp6_ns_target_address) not in self.address_table.ip6_unicast_int:
             self.logger.debug(
                 f"Received ICMPv6 Neighbor Solicitation packet from {ip6_packet_rx.ip6_src}, not matching any of stack's IPv6 unicast addresses, droping..."
             )
@@ -98,11 +110,13 @@ def phrx_icmp6(self, ip6_packet_rx, icmp6_packet_rx):
             self.event_icmp6_nd_dad.release()
             return
 
-        # Update ICMPv6 ND cache
-        if icmp6_packet_rx.icmp6_nd_opt_tlla:
-            self.icmp6_nd_cache.add_entry(icmp6_packet_rx.icmp6_na_target_address, icmp6_packet_rx.icmp6_nd_opt_tlla)
-            return
-
+        # Update ICMPv6 ND cache, advertisement without TLLA option can still confirm reachability of already resolved entry
+        self.icmp6_nd_cache.add_entry(
+            icmp6_packet_rx.icmp6_na_target_address,
+            icmp6_packet_rx.icmp6_nd_opt_tlla,
+            solicited=icmp6_packet_rx.icmp6_na_flag_s,
+            override=icmp6_packet_rx.icmp6_na_flag_o,
+        )
         return
 
     # ICMPv6 Router Solicitaion packet (this is not currently used by the stack)
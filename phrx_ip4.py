@@ -45,45 +45,42 @@ import ps_icmp4
 import ps_ip4
 import ps_tcp
 import ps_udp
-from ip_helper import inet_cksum
+from inet_cksum import inet_cksum
 
-ip4_fragments = {}
 
+def handle_ip4_fragmentation(self, ip4_packet_rx):
+    """ Check if packet is fragmented, if so pass it to reassembly engine and return reassembled packet once all fragments are received """
 
-def handle_ip4_fragmentation(ip4_packet_rx):
-    """ Check if packet is fragmented """
+    if not ip4_packet_rx.ip4_flag_mf and ip4_packet_rx.ip4_frag_offset == 0:
+        return ip4_packet_rx
 
-    # Check if IP packet is a first fragment
-    if ip4_packet_rx.ip4_frag_offset == 0 and ip4_packet_rx.ip4_flag_mf:
-        ip4_fragments[ip4_packet_rx.ip4_packet_id] = {}
-        ip4_fragments[ip4_packet_rx.ip4_packet_id][ip4_packet_rx.ip4_frag_offset] = ip4_packet_rx.raw_data
+    # Every fragment but the last one needs to carry multiple of 8 bytes, otherwise the next one's offset couldn't follow it
+    if not ip4_packet_rx.raw_data or (ip4_packet_rx.ip4_flag_mf and len(ip4_packet_rx.raw_data) % 8):
+        self.logger.warning(f"{ip4_packet_rx.tracker} - Fragment has invalid length {len(ip4_packet_rx.raw_data)}, droping")
         return None
 
-    # Check if IP packet is one of middle fragments
-    if ip4_packet_rx.ip4_frag_offset != 0 and ip4_packet_rx.ip4_flag_mf:
-        # Check if packet is part of existing fagment flow
-        if ip4_fragments.get(ip4_packet_rx.ip4_packet_id, None):
-            ip4_fragments[ip4_packet_rx.ip4_packet_id][ip4_packet_rx.ip4_frag_offset] = ip4_packet_rx.raw_data
+    # Fragments are told apart by source, destination, protocol and packet ID (RFC 791)
+    datagram = self.ip4_reassembly.add_fragment(
+        key=(ip4_packet_rx.ip4_src, ip4_packet_rx.ip4_dst, ip4_packet_rx.ip4_proto, ip4_packet_rx.ip4_packet_id),
+        offset=ip4_packet_rx.ip4_frag_offset,
+        data=ip4_packet_rx.raw_data,
+        more_fragments=ip4_packet_rx.ip4_flag_mf,
+    )
+    if datagram is None:
         return None
 
-    # Check if IP packet is last fragment
-    if ip4_packet_rx.ip4_frag_offset != 0 and not ip4_packet_rx.ip4_flag_mf:
-
-        # Check if packet is part of existing fagment flow
-        if ip4_fragments.get(ip4_packet_rx.ip4_packet_id, None):
-            ip4_fragments[ip4_packet_rx.ip4_packet_id][ip4_packet_rx.ip4_frag_offset] = ip4_packet_rx.raw_data
-
-            raw_data = b""
-            for offset in sorted(ip4_fragments[ip4_packet_rx.ip4_packet_id]):
-                raw_data += ip4_fragments[ip4_packet_rx.ip4_packet_id][offset]
+    if ip4_packet_rx.ip4_hlen + len(raw_data := datagram.raw_data) > 65535:
+        self.logger.warning(f"{ip4_packet_rx.tracker} - Reassembled packet exceeds maximum IPv4 packet length, droping")
+        return None
 
-            # Craft complete IP packet based on last fragment for further processing
-            ip4_packet_rx.ip4_flag_mf = False
-            ip4_packet_rx.ip4_frag_offset = 0
-            ip4_packet_rx.ip4_plen = ip4_packet_rx.ip4_hlen + len(raw_data)
-            ip4_packet_rx.ip4_cksum = 0
-            ip4_packet_rx.ip4_cksum = inet_cksum(ip4_packet_rx.raw_header)
-            ip4_packet_rx.raw_data = raw_data
+    # Craft complete IP packet based on the fragment that completed it for further processing
+    ip4_packet_rx.ip4_flag_mf = False
+    ip4_packet_rx.ip4_frag_offset = 0
+    ip4_packet_rx.ip4_plen = ip4_packet_rx.ip4_hlen + len(raw_data)
+    ip4_packet_rx.ip4_cksum = 0
+    ip4_packet_rx.ip4_cksum = inet_cksum(ip4_packet_rx.raw_header)
+    ip4_packet_rx.raw_data = raw_data
+    ip4_packet_rx.rx_cksum_valid = False
 
     return ip4_packet_rx
 
@@ -98,12 +95,12 @@ def phrx_ip4(self, ip4_packet_rx):
     self.logger.debug(f"{ip4_packet_rx.tracker} - {ip4_packet_rx}")
 
     # Check if received packet has been sent to us directly or by unicast/broadcast, allow any destination if no unicast address is configured (for DHCP client)
-    if self.ip4_unicast and ip4_packet_rx.ip4_dst not in {*self.ip4_unicast, *self.ip4_multicast, *self.ip4_broadcast}:
+    if (ip4_rx_filter := self.address_table.ip4_rx_filter) is not None and int(ip4_packet_rx.ip4_dst) not in ip4_rx_filter:
         self.logger.debug(f"{ip4_packet_rx.tracker} - IP packet not destined for this stack, droping")
         return
 
     # Check if packet is a fragment, and if so process it accrdingly
-    ip4_packet_rx = handle_ip4_fragmentation(ip4_packet_rx)
+    ip4_packet_rx = handle_ip4_fragmentation(self, ip4_packet_rx)
     if not ip4_packet_rx:
         return
 
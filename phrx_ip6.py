@@ -47,6 +47,43 @@ import ps_tcp
 import ps_udp
 
 
+def handle_ip6_fragmentation(self, ip6_packet_rx):
+    """ Pass packet carrying Fragment header to reassembly engine and return reassembled packet once all fragments are received """
+
+    ip6_ext_frag = ps_ip6.Ip6ExtFrag(ip6_packet_rx.raw_data, tracker=ip6_packet_rx.tracker)
+    if ip6_ext_frag.sanity_check_failed:
+        return None
+
+    self.logger.debug(f"{ip6_packet_rx.tracker} - {ip6_ext_frag}")
+
+    # Atomic fragment is processed right away, there is nothing to reassemble (RFC 6946)
+    if ip6_ext_frag.frag_offset == 0 and not ip6_ext_frag.frag_flag_mf:
+        raw_data = ip6_ext_frag.raw_data
+        ip6_next = ip6_ext_frag.frag_next
+
+    # Fragments are told apart by source, destination and identification, next header is taken from the first fragment (RFC 8200)
+    else:
+        datagram = self.ip6_reassembly.add_fragment(
+            key=(ip6_packet_rx.ip6_src, ip6_packet_rx.ip6_dst, ip6_ext_frag.frag_id),
+            offset=ip6_ext_frag.frag_offset,
+            data=ip6_ext_frag.raw_data,
+            more_fragments=ip6_ext_frag.frag_flag_mf,
+            header=ip6_ext_frag.frag_next,
+        )
+        if datagram is None:
+            return None
+        raw_data = datagram.raw_data
+        ip6_next = datagram.header
+
+    # Craft complete IP packet based on the fragment that completed it for further processing
+    ip6_packet_rx.ip6_next = ip6_next
+    ip6_packet_rx.ip6_dlen = len(raw_data)
+    ip6_packet_rx.raw_data = raw_data
+    ip6_packet_rx.rx_cksum_valid = False
+
+    return ip6_packet_rx
+
+
 def phrx_ip6(self, ip6_packet_rx):
     """ Handle inbound IP packets """
 
@@ -57,10 +94,16 @@ def phrx_ip6(self, ip6_packet_rx):
     self.logger.debug(f"{ip6_packet_rx.tracker} - {ip6_packet_rx}")
 
     # Check if received packet has been sent to us directly or by unicast or multicast
-    if ip6_packet_rx.ip6_dst not in {*self.ip6_unicast, *self.ip6_multicast}:
+    if int(ip6_packet_rx.ip6_dst) not in self.address_table.ip6_rx_filter:
         self.logger.debug(f"{ip6_packet_rx.tracker} - IP packet not destined for this stack, droping")
         return
 
+    # Check if packet is a fragment, and if so process it accrdingly
+    if ip6_packet_rx.ip6_next == ps_ip6.IP6_NEXT_HEADER_FRAG:
+        ip6_packet_rx = handle_ip6_fragmentation(self, ip6_packet_rx)
+        if not ip6_packet_rx:
+            return
+
     if ip6_packet_rx.ip6_next == ps_ip6.IP6_NEXT_HEADER_ICMP6:
         self.phrx_icmp6(ip6_packet_rx, ps_icmp6.Icmp6Packet(ip6_packet_rx))
         return
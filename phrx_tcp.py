@@ -75,7 +75,7 @@ def phrx_tcp(self, ip_packet_rx, tcp_packet_rx):
         win=tcp_packet_rx.tcp_win,
         wscale=tcp_packet_rx.tcp_wscale,
         mss=tcp_packet_rx.tcp_mss,
-        raw_data=tcp_packet_rx.raw_data,
+        raw_data=bytes(tcp_packet_rx.raw_data),
         tracker=tcp_packet_rx.tracker,
     )
 
@@ -88,18 +88,17 @@ def phrx_tcp(self, ip_packet_rx, tcp_packet_rx):
             return
 
     # Check if incoming packet matches active TCP session
-    if tcp_session := stack.tcp_sessions.get(packet.tcp_session_id, None):
+    if tcp_session := stack.tcp_sessions.find_connection(packet.local_ip_address, packet.local_port, packet.remote_ip_address, packet.remote_port):
         self.logger.debug(f"{packet.tracker} - TCP packet is part of active session {tcp_session.tcp_session_id}")
         tcp_session.tcp_fsm(packet=packet)
         return
 
     # Check if incoming packet is an initial SYN packet and if it matches any listening TCP session
     if all({packet.flag_syn}) and not any({packet.flag_ack, packet.flag_fin, packet.flag_rst}):
-        for tcp_session_id_pattern in packet.tcp_session_listening_patterns:
-            if tcp_session := stack.tcp_sessions.get(tcp_session_id_pattern, None):
-                self.logger.debug(f"{packet.tracker} - TCP packet matches listening session {tcp_session.tcp_session_id}")
-                tcp_session.tcp_fsm(packet=packet)
-                return
+        if tcp_session := stack.tcp_sessions.find_listener(packet.local_ip_address, packet.local_port):
+            self.logger.debug(f"{packet.tracker} - TCP packet matches listening session {tcp_session.tcp_session_id}")
+            tcp_session.tcp_fsm(packet=packet)
+            return
 
     # In case packet doesn't match any session send RST packet in response to it
     self.logger.debug(f"Received TCP packet from {ip_packet_rx.ip_src} to closed port {tcp_packet_rx.tcp_dport}, responding with TCP RST packet")
@@ -70,7 +70,7 @@ def phrx_udp(self, ip_packet_rx, udp_packet_rx):
         local_port=udp_packet_rx.udp_dport,
         remote_ip_address=ip_packet_rx.ip_src,
         remote_port=udp_packet_rx.udp_sport,
-        raw_data=udp_packet_rx.raw_data,
+        raw_data=bytes(udp_packet_rx.raw_data),
         tracker=udp_packet_rx.tracker,
     )
 
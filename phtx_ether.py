@@ -42,12 +42,12 @@
 
 
 import ps_ether
-import ps_ip4
-import ps_ip6
+from egress_metadata import EGRESS_BROADCAST, EGRESS_MULTICAST
+from mac_address import MAC_BROADCAST, MAC_UNSPECIFIED
 
 
-def phtx_ether(self, child_packet, ether_src="00:00:00:00:00:00", ether_dst="00:00:00:00:00:00"):
-    """ Handle outbound Ethernet packets """
+def phtx_ether(self, child_packet, ether_src=MAC_UNSPECIFIED, ether_dst=MAC_UNSPECIFIED, egress=None):
+    """ Handle outbound Ethernet packets, IP layer passes resolved egress metadata so packet doesn't need to be parsed again """
 
     def __send_out_packet():
         self.logger.opt(depth=1).debug(f"{ether_packet_tx.tracker} - {ether_packet_tx}")
@@ -56,91 +56,42 @@ def phtx_ether(self, child_packet, ether_src="00:00:00:00:00:00", ether_dst="00:
     ether_packet_tx = ps_ether.EtherPacket(ether_src=ether_src, ether_dst=ether_dst, child_packet=child_packet)
 
     # Check if packet contains valid source address, fill it out if needed
-    if ether_packet_tx.ether_src == "00:00:00:00:00:00":
-        ether_packet_tx.ether_src = self.mac_unicast
+    if ether_packet_tx.ether_src.is_unspecified:
+        ether_packet_tx.ether_src = egress.ether_src if egress else self.mac_unicast
         self.logger.debug(f"{ether_packet_tx.tracker} - Set source to stack MAC {ether_packet_tx.ether_src}")
 
     # Send out packet if it contains valid destination MAC address
-    if ether_packet_tx.ether_dst != "00:00:00:00:00:00":
+    if not ether_packet_tx.ether_dst.is_unspecified:
         self.logger.debug(f"{ether_packet_tx.tracker} - Contains valid destination MAC address")
         __send_out_packet()
         return
 
-    # Check if we can obtain destination MAC based on IPv6 header data
-    if ether_packet_tx.ether_type == ps_ether.ETHER_TYPE_IP6:
-        ip6_packet_tx = ps_ip6.Ip6Packet(ether_packet_tx)
-
-        # Send packet out if its destined to multicast IPv6 address
-        if ip6_packet_tx.ip6_dst.is_multicast:
-            ether_packet_tx.ether_dst = ip6_packet_tx.ip6_dst.multicast_mac
-            self.logger.debug(f"{ether_packet_tx.tracker} - Resolved destiantion IPv6 {ip6_packet_tx.ip6_dst} to MAC {ether_packet_tx.ether_dst}")
-            __send_out_packet()
-            return
-
-        # Send out packet if is destined to external network (in relation to its source address) and we are able to obtain MAC of default gateway from ND cache
-        for stack_ip6_address in self.ip6_address:
-            if stack_ip6_address.ip == ip6_packet_tx.ip6_src and ip6_packet_tx.ip6_dst not in stack_ip6_address.network:
-                if stack_ip6_address.gateway is None:
-                    self.logger.debug(f"{ether_packet_tx.tracker} - No default gateway set for {stack_ip6_address} source address, droping packet...")
-                    return
-                if mac_address := self.icmp6_nd_cache.find_entry(stack_ip6_address.gateway):
-                    ether_packet_tx.ether_dst = mac_address
-                    self.logger.debug(
-                        f"{ether_packet_tx.tracker} - Resolved destiantion IPv6 {ip6_packet_tx.ip6_dst}"
-                        + f" to Default Gateway MAC {ether_packet_tx.ether_dst}"
-                    )
-                    __send_out_packet()
-                    return
-
-        # Send out packet if we are able to obtain destinaton MAC from ICMPv6 ND cache
-        if mac_address := self.icmp6_nd_cache.find_entry(ip6_packet_tx.ip6_dst):
-            ether_packet_tx.ether_dst = mac_address
-            self.logger.debug(f"{ether_packet_tx.tracker} - Resolved destiantion IPv6 {ip6_packet_tx.ip6_dst} to MAC {ether_packet_tx.ether_dst}")
-            __send_out_packet()
-            return
-
-    # Check if we can obtain destination MAC based on IPv4 header data
-    if ether_packet_tx.ether_type == ps_ether.ETHER_TYPE_IP4:
-        ip4_packet_tx = ps_ip4.Ip4Packet(ether_packet_tx)
-
-        # Send out packet if its destinied to limited broadcast addresses
-        if ip4_packet_tx.ip4_dst.is_limited_broadcast:
-            ether_packet_tx.ether_dst = "ff:ff:ff:ff:ff:ff"
-            self.logger.debug(f"{ether_packet_tx.tracker} - Resolved destiantion IPv4 {ip4_packet_tx.ip4_dst} to MAC {ether_packet_tx.ether_dst}")
-            __send_out_packet()
-            return
-
-        # Send out packet if its destinied to directed broadcast or network addresses (in relation to its source address)
-        for ip4_address in self.ip4_address:
-            if ip4_address.ip == ip4_packet_tx.ip4_src:
-                if ip4_packet_tx.ip4_dst in {ip4_address.network_address, ip4_address.broadcast_address}:
-                    ether_packet_tx.ether_dst = "ff:ff:ff:ff:ff:ff"
-                    self.logger.debug(f"{ether_packet_tx.tracker} - Resolved destiantion IPv4 {ip4_packet_tx.ip4_dst} to MAC {ether_packet_tx.ether_dst}")
-                    __send_out_packet()
-                    return
-
-        # Send out packet if is destined to external network (in relation to its source address) and we are able to obtain MAC of default gateway from ARP cache
-        for stack_ip4_address in self.ip4_address:
-            if stack_ip4_address.ip == ip4_packet_tx.ip4_src and ip4_packet_tx.ip4_dst not in stack_ip4_address.network:
-                if stack_ip4_address.gateway is None:
-                    self.logger.debug(f"{ether_packet_tx.tracker} - No default gateway set for {stack_ip4_address} source address, droping packet...")
-                    return
-                if mac_address := self.arp_cache.find_entry(stack_ip4_address.gateway):
-                    ether_packet_tx.ether_dst = mac_address
-                    self.logger.debug(
-                        f"{ether_packet_tx.tracker} - Resolved destiantion IPv4 {ip4_packet_tx.ip4_dst}"
-                        + f" to Default Gateway MAC {ether_packet_tx.ether_dst}"
-                    )
-                    __send_out_packet()
-                    return
-
-        # Send out packet if we are able to obtain destinaton MAC from ARP cache
-        if mac_address := self.arp_cache.find_entry(ip4_packet_tx.ip4_dst):
-            ether_packet_tx.ether_dst = mac_address
-            self.logger.debug(f"{ether_packet_tx.tracker} - Resolved destiantion IPv4 {ip4_packet_tx.ip4_dst} to MAC {ether_packet_tx.ether_dst}")
-            __send_out_packet()
-            return
-
-    # Drop packet in case  we are not able to obtain valid destination MAC address
-    self.logger.debug(f"{ether_packet_tx.tracker} - No valid destination MAC could be obtained, droping packet...")
+    # Drop packet in case we are not able to obtain valid destination MAC address
+    if egress is None:
+        self.logger.debug(f"{ether_packet_tx.tracker} - No valid destination MAC could be obtained, droping packet...")
+        return
+
+    # Send out packet if its destined to broadcast address
+    if egress.dst_class == EGRESS_BROADCAST:
+        ether_packet_tx.ether_dst = egress.ether_dst = MAC_BROADCAST
+        self.logger.debug(f"{ether_packet_tx.tracker} - Resolved broadcast destination to MAC {ether_packet_tx.ether_dst}")
+        __send_out_packet()
+        return
+
+    # Send out packet if its destined to multicast address
+    if egress.dst_class == EGRESS_MULTICAST:
+        ether_packet_tx.ether_dst = egress.ether_dst = egress.next_hop.multicast_mac
+        self.logger.debug(f"{ether_packet_tx.tracker} - Resolved multicast destination {egress.next_hop} to MAC {ether_packet_tx.ether_dst}")
+        __send_out_packet()
+        return
+
+    # Send out packet if we are able to obtain next hop MAC from ICMPv6 ND / ARP cache, park it till next hop gets resolved otherwise
+    neighbor_cache = self.icmp6_nd_cache if egress.next_hop.version == 6 else self.arp_cache
+    if mac_address := neighbor_cache.find_entry(egress.next_hop):
+        ether_packet_tx.ether_dst = egress.ether_dst = mac_address
+        self.logger.debug(f"{ether_packet_tx.tracker} - Resolved next hop {egress.next_hop} to MAC {ether_packet_tx.ether_dst}")
+        __send_out_packet()
+        return
+
+    neighbor_cache.hold_packet(egress.next_hop, ether_packet_tx)
     return
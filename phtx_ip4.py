@@ -47,21 +47,31 @@ import config
 import ps_ether
 import ps_ip4
 import stack
+from egress_cache import CKSUM_OFFSET, EgressCacheEntry, EgressFrame, build_ether_header
+from egress_metadata import EGRESS_BROADCAST, EGRESS_MULTICAST, EGRESS_UNICAST, EgressMetadata
+from inet_cksum import inet_cksum_fold, inet_sum
 from ipv4_address import IPv4Address
 
 
 def validate_src_ip4_address(self, ip4_src, ip4_dst):
     """ Make sure source ip address is valid, supplemt with valid one as appropriate """
 
+    address_table = self.address_table
+    ip4_src_int = int(ip4_src)
+
     # Check if the the source IP address belongs to this stack or its set to all zeros (for DHCP client comunication)
-    if ip4_src not in {*self.ip4_unicast, *self.ip4_multicast, *self.ip4_broadcast, IPv4Address("0.0.0.0")}:
+    if ip4_src_int not in address_table.ip4_tx_filter:
         self.logger.warning(f"Unable to sent out IPv4 packet, stack doesn't own IPv4 address {ip4_src}")
         return None
 
+    # Source is one of stack's unicast addresses, nothing to supplement
+    if ip4_src_int in address_table.ip4_unicast_int:
+        return ip4_src
+
     # If packet is a response to multicast then replace source address with primary address of the stack
-    if ip4_src in self.ip4_multicast:
-        if self.ip4_unicast:
-            ip4_src = self.ip4_unicast[0]
+    if ip4_src_int in address_table.ip4_multicast_int:
+        if address_table.ip4_unicast:
+            ip4_src = address_table.ip4_unicast[0]
             self.logger.debug(f"Packet is response to multicast, replaced source with stack primary IPv4 address {ip4_src}")
         else:
             self.logger.warning("Unable to sent out IPv4 packet, no stack primary unicast IPv4 address available")
@@ -69,15 +79,15 @@ def validate_src_ip4_address(self, ip4_src, ip4_dst):
 
     # If packet is a response to limited broadcast then replace source address with primary address of the stack
     if ip4_src.is_limited_broadcast:
-        if self.ip4_unicast:
-            ip4_src = self.ip4_unicast[0]
+        if address_table.ip4_unicast:
+            ip4_src = address_table.ip4_unicast[0]
             self.logger.debug(f"Packet is response to limited broadcast, replaced source with stack primary IPv4 address {ip4_src}")
         else:
             self.logger.warning("Unable to sent out IPv4 packet, no stack primary unicast IPv4 address available")
             return None
 
     # If packet is a response to directed braodcast then replace source address with first stack address that belongs to appropriate subnet
-    if ip4_src in self.ip4_broadcast:
+    if int(ip4_src) in address_table.ip4_broadcast_int:
         ip4_src = [_.ip for _ in self.ip4_address if _.broadcast_address == ip4_src]
         if ip4_src:
             ip4_src = ip4_src[0]
@@ -86,17 +96,9 @@ def validate_src_ip4_address(self, ip4_src, ip4_dst):
             self.logger.warning("Unable to sent out IPv4 packet, no appropriate stack unicast IPv4 address available")
             return None
 
-    # If source is unspecified check if destination belongs to any of local networks, if so pick source address from that network
-    if ip4_src.is_unspecified:
-        for ip4_address in self.ip4_address:
-            if ip4_dst in ip4_address.network:
-                return ip4_address.ip
-
-    # If source unspcified and destination is external pick source from first network that has default gateway set
-    if ip4_src.is_unspecified:
-        for ip4_address in self.ip4_address:
-            if ip4_address.gateway:
-                return ip4_address.ip
+    # If source is unspecified pick source address of the route leading to destination
+    if ip4_src.is_unspecified and (route := self.ip4_fib.lookup(ip4_dst)):
+        return route.src
 
     return ip4_src
 
@@ -112,6 +114,28 @@ def validate_dst_ip4_address(self, ip4_dst):
     return ip4_dst
 
 
+def resolve_egress_ip4(self, ip4_dst, ip4_src):
+    """ Resolve destination class and next hop of outbound packet, gateway is picked from routes belonging to its source address """
+
+    # Limited broadcast and multicast destinations don't need routing
+    if ip4_dst.is_limited_broadcast:
+        return EgressMetadata(EGRESS_BROADCAST, self.mac_unicast)
+
+    if ip4_dst.is_multicast:
+        return EgressMetadata(EGRESS_MULTICAST, self.mac_unicast, next_hop=ip4_dst)
+
+    # Find next hop in routing table, drop packet if there is no route to its destination
+    if (route := self.ip4_fib.lookup(ip4_dst, ip4_src)) is None:
+        self.logger.debug(f"No route to {ip4_dst}, droping packet...")
+        return None
+
+    # Directed broadcast and network address of local network
+    if route.gateway is None and ip4_dst in {route.network.network_address, route.network.broadcast_address}:
+        return EgressMetadata(EGRESS_BROADCAST, self.mac_unicast, route=route)
+
+    return EgressMetadata(EGRESS_UNICAST, self.mac_unicast, next_hop=route.gateway or ip4_dst, route=route)
+
+
 def phtx_ip4(self, child_packet, ip4_dst, ip4_src, ip4_ttl=config.ip4_default_ttl):
     """ Handle outbound IP packets """
 
@@ -123,6 +147,24 @@ def phtx_ip4(self, child_packet, ip4_dst, ip4_src, ip4_ttl=config.ip4_default_tt
     ip4_src = IPv4Address(ip4_src)
     ip4_dst = IPv4Address(ip4_dst)
 
+    # Generate new IPv4 ID
+    self.ip4_packet_id += 1
+    if self.ip4_packet_id > 65535:
+        self.ip4_packet_id = 1
+
+    # Packets larger than path MTU towards destination need to be fragmented
+    mtu = self.ip4_pmtu_cache.get(ip4_dst)
+
+    # Send out TCP / UDP packet using cached egress state of its flow, only length, packet ID and checksum fields need to be filled out in such case
+    flow = (ip4_src, ip4_dst, child_packet.protocol, ip4_ttl)
+    generations = (self.ip4_fib.generation, self.arp_cache.arp_cache.generation)
+    if child_packet.protocol in CKSUM_OFFSET and (egress_entry := self.egress_cache.get(flow, generations)):
+        if ps_ip4.IP4_HEADER_LEN + len(raw_data := child_packet.raw_packet) <= mtu:
+            self.logger.debug(f"{child_packet.tracker} - Sending out packet using cached egress state, {ip4_src} > {ip4_dst}, id {self.ip4_packet_id}")
+            self.arp_cache.note_use(egress_entry.next_hop)
+            self.tx_ring.enqueue(EgressFrame(egress_entry.build_frame(raw_data, self.ip4_packet_id), child_packet.tracker))
+            return
+
     # Validate source address
     ip4_src = validate_src_ip4_address(self, ip4_src, ip4_dst)
     if not ip4_src:
@@ -133,61 +175,80 @@ def phtx_ip4(self, child_packet, ip4_dst, ip4_src, ip4_ttl=config.ip4_default_tt
     if not ip4_dst:
         return
 
-    # Generate new IPv4 ID
-    self.ip4_packet_id += 1
-    if self.ip4_packet_id > 65535:
-        self.ip4_packet_id = 1
+    # Resolve next hop, it's handed to Ethernet layer along with every packet / fragment
+    egress = resolve_egress_ip4(self, ip4_dst, ip4_src)
+    if not egress:
+        return
 
-    # Check if packet can be sent out without fragmentation, if so send it out
-    if ps_ip4.IP4_HEADER_LEN + len(child_packet.raw_packet) <= config.mtu:
-        ip4_packet_tx = ps_ip4.Ip4Packet(ip4_src=ip4_src, ip4_dst=ip4_dst, ip4_packet_id=self.ip4_packet_id, child_packet=child_packet)
+    # Check if packet can be sent out without fragmentation, if so send it out, TCP super-segment is going to be segmented by kernel (virtio-net header TSO)
+    if (child_packet.protocol == "TCP" and child_packet.tcp_gso_size) or ps_ip4.IP4_HEADER_LEN + len(child_packet.raw_packet) <= mtu:
+        # TCP segments are sent with DF flag set so routers report path MTU to us instead of fragmenting them (RFC 1191)
+        ip4_packet_tx = ps_ip4.Ip4Packet(
+            ip4_src=ip4_src, ip4_dst=ip4_dst, ip4_packet_id=self.ip4_packet_id, ip4_flag_df=child_packet.protocol == "TCP", child_packet=child_packet
+        )
 
         self.logger.debug(f"{ip4_packet_tx.tracker} - {ip4_packet_tx}")
-        self.phtx_ether(child_packet=ip4_packet_tx)
+        self.phtx_ether(child_packet=ip4_packet_tx, egress=egress)
+
+        # Remember resolved egress state of the flow unless source address had to be substituted
+        if egress.ether_dst and child_packet.protocol in CKSUM_OFFSET and ip4_src == flow[0] and not ip4_packet_tx.ip4_options:
+            ip_header = bytearray(ip4_packet_tx.raw_header)
+            ip_header[2:6] = b"\0\0\0\0"
+            ip_header[10:12] = b"\0\0"
+            pseudo_header = struct.pack("! 4s 4s BB", ip4_src.packed, ip4_dst.packed, 0, ip4_packet_tx.ip4_proto)
+            self.egress_cache.add(
+                flow,
+                EgressCacheEntry(
+                    egress.ether_src,
+                    egress.ether_dst,
+                    ps_ether.ETHER_TYPE_IP4,
+                    ip_header,
+                    pseudo_header,
+                    child_packet.protocol,
+                    generations,
+                    egress.next_hop,
+                ),
+            )
         return
 
     # Fragment packet and send all fragments out
     self.logger.debug("Packet exceedes available MTU, IP fragmentation needed...")
 
+    # Payload is serialized only once, fragments carry slices of it
     if child_packet.protocol == "ICMPv4":
         ip4_proto = ps_ip4.IP4_PROTO_ICMP4
-        raw_data = child_packet.get_raw_packet()
+        raw_data = memoryview(child_packet.get_raw_packet())
 
     if child_packet.protocol in {"UDP", "TCP"}:
         ip4_proto = ps_ip4.IP4_PROTO_UDP if child_packet.protocol == "UDP" else ps_ip4.IP4_PROTO_TCP
-        raw_data = child_packet.get_raw_packet(
-            struct.pack(
-                "! 4s 4s BBH",
-                ip4_src.packed,
-                ip4_dst.packed,
-                0,
-                ip4_proto,
-                len(child_packet.raw_packet),
-            )
-        )
+        raw_data = memoryview(child_packet.get_raw_packet(struct.pack("! 4s 4s BBH", ip4_src.packed, ip4_dst.packed, 0, ip4_proto, len(child_packet.raw_packet))))
 
-    raw_data_mtu = (config.mtu - ps_ether.ETHER_HEADER_LEN - ps_ip4.IP4_HEADER_LEN) & 0b1111111111111000
-    raw_data_fragments = [raw_data[_ : raw_data_mtu + _] for _ in range(0, len(raw_data), raw_data_mtu)]
+    # Header template shared by all fragments, total length, flags / fragment offset and checksum fields are zeroed and filled out per fragment
+    ip_header = bytearray(struct.pack("! BBH HH BBH 4s 4s", 0x45, 0, 0, self.ip4_packet_id, 0, ip4_ttl, ip4_proto, 0, ip4_src.packed, ip4_dst.packed))
+    ip_header_sum = inet_sum(ip_header)
 
-    pointer = 0
-    offset = 0
+    raw_data_mtu = (mtu - ps_ip4.IP4_HEADER_LEN) & 0b1111111111111000
+    ether_header = None
 
-    for raw_data_fragment in raw_data_fragments:
-        ip4_packet_tx = ps_ip4.Ip4Packet(
-            ip4_src=ip4_src,
-            ip4_dst=ip4_dst,
-            ip4_proto=ip4_proto,
-            ip4_packet_id=self.ip4_packet_id,
-            ip4_flag_mf=pointer < len(raw_data_fragments) - 1,
-            ip4_frag_offset=offset,
-            ip4_ttl=ip4_ttl,
-            raw_data=raw_data_fragment,
-            tracker=child_packet.tracker,
-        )
-        pointer += 1
-        offset += len(raw_data_fragment)
+    for offset in range(0, len(raw_data), raw_data_mtu):
+        raw_data_fragment = raw_data[offset : offset + raw_data_mtu]
+        ip4_plen = ps_ip4.IP4_HEADER_LEN + len(raw_data_fragment)
+        ip4_frag = (offset + raw_data_mtu < len(raw_data)) << 13 | offset >> 3
+        struct.pack_into("!H", ip_header, 2, ip4_plen)
+        struct.pack_into("!H", ip_header, 6, ip4_frag)
+        struct.pack_into("!H", ip_header, 10, inet_cksum_fold(ip_header_sum + ip4_plen + ip4_frag))
 
-        self.logger.debug(f"{ip4_packet_tx.tracker} - {ip4_packet_tx}")
-        self.phtx_ether(child_packet=ip4_packet_tx)
+        # Once next hop is resolved by the first fragment the remaining ones are put straight into TX ring behind the same Ethernet header
+        if ether_header:
+            self.tx_ring.enqueue(EgressFrame(ether_header + ip_header + raw_data_fragment, child_packet.tracker))
+            continue
+
+        ip4_fragment_tx = ps_ip4.Ip4Fragment(bytes(ip_header), raw_data_fragment, child_packet.tracker)
+        self.logger.debug(f"{ip4_fragment_tx.tracker} - {ip4_fragment_tx}")
+        self.phtx_ether(child_packet=ip4_fragment_tx, egress=egress)
+
+        if egress.ether_dst:
+            ether_header = build_ether_header(egress.ether_src, egress.ether_dst, ps_ether.ETHER_TYPE_IP4)
 
+    self.logger.debug(f"{child_packet.tracker} - Sent out {len(raw_data)} bytes in {-(-len(raw_data) // raw_data_mtu)} fragments, id {self.ip4_packet_id}")
     return
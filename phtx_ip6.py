@@ -41,39 +41,43 @@
 #
 
 
+import struct
+
 import config
+import ps_ether
 import ps_ip6
+from egress_cache import CKSUM_OFFSET, EgressCacheEntry, EgressFrame
+from egress_metadata import EGRESS_MULTICAST, EGRESS_UNICAST, EgressMetadata
 from ipv6_address import IPv6Address
 
 
 def validate_src_ip6_address(self, ip6_src, ip6_dst):
     """ Make sure source ip address is valid, supplement with valid one as appropriate """
 
+    address_table = self.address_table
+    ip6_src_int = int(ip6_src)
+
     # Check if the the source IP address belongs to this stack or its unspecified
-    if ip6_src not in {*self.ip6_unicast, *self.ip6_multicast, IPv6Address("::")}:
+    if ip6_src_int not in address_table.ip6_tx_filter:
         self.logger.warning(f"Unable to sent out IPv6 packet, stack doesn't own IPv6 address {ip6_src}")
         return None
 
+    # Source is one of stack's unicast addresses, nothing to supplement
+    if ip6_src_int in address_table.ip6_unicast_int:
+        return ip6_src
+
     # If packet is a response to multicast then replace source address with link local address of the stack
-    if ip6_src in self.ip6_multicast:
-        if self.ip6_unicast:
-            ip6_src = self.ip6_unicast[0]
+    if ip6_src_int in address_table.ip6_multicast_int:
+        if address_table.ip6_unicast:
+            ip6_src = address_table.ip6_unicast[0]
             self.logger.debug(f"Packet is response to multicast, replaced source with stack link local IPv6 address {ip6_src}")
         else:
             self.logger.warning("Unable to sent out IPv6 packet, no stack link local unicast IPv6 address available")
             return None
 
-    # If source is unspecified check if destination belongs to any of local networks, if so pick source address from that network
-    if ip6_src.is_unspecified:
-        for stack_ip6_address in self.ip6_address:
-            if ip6_dst in stack_ip6_address.network:
-                return stack_ip6_address.ip
-
-    # If source unspcified and destination is external pick source from first network that has default gateway set
-    if ip6_src.is_unspecified:
-        for stack_ip6_address in self.ip6_address:
-            if stack_ip6_address.gateway:
-                return stack_ip6_address.ip
+    # If source is unspecified pick source address of the route leading to destination
+    if ip6_src.is_unspecified and (route := self.ip6_fib.lookup(ip6_dst)):
+        return route.src
 
     return ip6_src
 
@@ -89,6 +93,21 @@ def validate_dst_ip6_address(self, ip6_dst):
     return ip6_dst
 
 
+def resolve_egress_ip6(self, ip6_dst, ip6_src):
+    """ Resolve destination class and next hop of outbound packet, gateway is picked from routes belonging to its source address """
+
+    # Multicast destinations don't need routing
+    if ip6_dst.is_multicast:
+        return EgressMetadata(EGRESS_MULTICAST, self.mac_unicast, next_hop=ip6_dst)
+
+    # Find next hop in routing table, drop packet if there is no route to its destination
+    if (route := self.ip6_fib.lookup(ip6_dst, ip6_src)) is None:
+        self.logger.debug(f"No route to {ip6_dst}, droping packet...")
+        return None
+
+    return EgressMetadata(EGRESS_UNICAST, self.mac_unicast, next_hop=route.gateway or ip6_dst, route=route)
+
+
 def phtx_ip6(self, child_packet, ip6_dst, ip6_src, ip6_hop=config.ip6_default_hop):
     """ Handle outbound IP packets """
 
@@ -100,6 +119,19 @@ def phtx_ip6(self, child_packet, ip6_dst, ip6_src, ip6_hop=config.ip6_default_ho
     ip6_src = IPv6Address(ip6_src)
     ip6_dst = IPv6Address(ip6_dst)
 
+    # Packets larger than path MTU towards destination need to be fragmented
+    mtu = self.ip6_pmtu_cache.get(ip6_dst)
+
+    # Send out TCP / UDP packet using cached egress state of its flow, only length and checksum fields need to be filled out in such case
+    flow = (ip6_src, ip6_dst, child_packet.protocol, ip6_hop)
+    generations = (self.ip6_fib.generation, self.icmp6_nd_cache.nd_cache.generation)
+    if child_packet.protocol in CKSUM_OFFSET and (egress_entry := self.egress_cache.get(flow, generations)):
+        if ps_ip6.IP6_HEADER_LEN + len(raw_data := child_packet.raw_packet) <= mtu:
+            self.logger.debug(f"{child_packet.tracker} - Sending out packet using cached egress state, {ip6_src} > {ip6_dst}")
+            self.icmp6_nd_cache.note_use(egress_entry.next_hop)
+            self.tx_ring.enqueue(EgressFrame(egress_entry.build_frame(raw_data), child_packet.tracker))
+            return
+
     # Validate source address
     ip6_src = validate_src_ip6_address(self, ip6_src, ip6_dst)
     if not ip6_src:
@@ -110,14 +142,68 @@ def phtx_ip6(self, child_packet, ip6_dst, ip6_src, ip6_hop=config.ip6_default_ho
     if not ip6_dst:
         return
 
-    # Check if IP packet can be sent out without fragmentation, if so send it out
-    if ps_ip6.IP6_HEADER_LEN + len(child_packet.raw_packet) <= config.mtu:
+    # Resolve next hop, it's handed to Ethernet layer along with the packet
+    egress = resolve_egress_ip6(self, ip6_dst, ip6_src)
+    if not egress:
+        return
+
+    # Check if IP packet can be sent out without fragmentation, if so send it out, TCP super-segment is going to be segmented by kernel (virtio-net header TSO)
+    if (child_packet.protocol == "TCP" and child_packet.tcp_gso_size) or ps_ip6.IP6_HEADER_LEN + len(child_packet.raw_packet) <= mtu:
         ip6_packet_tx = ps_ip6.Ip6Packet(ip6_src=ip6_src, ip6_dst=ip6_dst, ip6_hop=ip6_hop, child_packet=child_packet)
 
         self.logger.debug(f"{ip6_packet_tx.tracker} - {ip6_packet_tx}")
-        self.phtx_ether(child_packet=ip6_packet_tx)
+        self.phtx_ether(child_packet=ip6_packet_tx, egress=egress)
+
+        # Remember resolved egress state of the flow unless source address had to be substituted
+        if egress.ether_dst and child_packet.protocol in CKSUM_OFFSET and ip6_src == flow[0]:
+            ip_header = bytearray(ip6_packet_tx.raw_header)
+            ip_header[4:6] = b"\0\0"
+            pseudo_header = struct.pack("! 16s 16s BB", ip6_src.packed, ip6_dst.packed, 0, ip6_packet_tx.ip6_next)
+            self.egress_cache.add(
+                flow,
+                EgressCacheEntry(
+                    egress.ether_src,
+                    egress.ether_dst,
+                    ps_ether.ETHER_TYPE_IP6,
+                    ip_header,
+                    pseudo_header,
+                    child_packet.protocol,
+                    generations,
+                    egress.next_hop,
+                ),
+            )
         return
 
-    # Fragment packet and send all fragments out *** Need to add this functionality ***
-    self.logger.debug("Packet exceedes available MTU, IPv6 fragmentation needed... droping...")
+    # Fragment packet and send all fragments out
+    self.logger.debug("Packet exceedes available MTU, IPv6 fragmentation needed...")
+
+    ip6_next = {"ICMPv6": ps_ip6.IP6_NEXT_HEADER_ICMP6, "UDP": ps_ip6.IP6_NEXT_HEADER_UDP, "TCP": ps_ip6.IP6_NEXT_HEADER_TCP}[child_packet.protocol]
+    raw_data = memoryview(
+        child_packet.get_raw_packet(struct.pack("! 16s 16s L BBBB", ip6_src.packed, ip6_dst.packed, len(child_packet.raw_packet), 0, 0, 0, ip6_next))
+    )
+
+    # Each fragment but the last one carries the same multiple of 8 bytes, all of them share single identification value
+    raw_data_mtu = (mtu - ps_ip6.IP6_HEADER_LEN - ps_ip6.IP6_EXT_FRAG_LEN) & 0b1111111111111000
+    self.ip6_frag_id = (self.ip6_frag_id + 1) & 0xFFFFFFFF
+
+    for offset in range(0, len(raw_data), raw_data_mtu):
+        ip6_ext_frag = ps_ip6.Ip6ExtFrag(
+            tracker=child_packet.tracker,
+            frag_next=ip6_next,
+            frag_offset=offset,
+            frag_flag_mf=offset + raw_data_mtu < len(raw_data),
+            frag_id=self.ip6_frag_id,
+        )
+        ip6_packet_tx = ps_ip6.Ip6Packet(
+            ip6_src=ip6_src,
+            ip6_dst=ip6_dst,
+            ip6_hop=ip6_hop,
+            ip6_next=ps_ip6.IP6_NEXT_HEADER_FRAG,
+            raw_data=ip6_ext_frag.raw_header + raw_data[offset : offset + raw_data_mtu],
+            tracker=child_packet.tracker,
+        )
+
+        self.logger.debug(f"{ip6_packet_tx.tracker} - {ip6_packet_tx}, {ip6_ext_frag}")
+        self.phtx_ether(child_packet=ip6_packet_tx, egress=egress)
+
     return
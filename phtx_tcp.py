@@ -70,6 +70,7 @@ def phtx_tcp(
     tcp_win=0,
     tcp_urp=0,
     raw_data=b"",
+    tcp_gso_size=None,
     tracker=None,
     echo_tracker=None,
 ):
@@ -108,6 +109,7 @@ def phtx_tcp(
         tcp_urp=tcp_urp,
         tcp_options=tcp_options,
         raw_data=raw_data,
+        tcp_gso_size=tcp_gso_size,
         tracker=tracker,
         echo_tracker=echo_tracker,
     )
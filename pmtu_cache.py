@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# pmtu_cache.py - module contains class supporting per destination Path MTU cache
+#
+
+
+import threading
+from collections import OrderedDict
+
+import loguru
+
+from timer import timer_tick
+
+# Common MTU values used to estimate path MTU when ICMPv4 Fragmentation Needed message comes from router that doesn't report next hop MTU (RFC 1191)
+IP4_MTU_PLATEAUS = (65535, 32000, 17914, 8166, 4352, 2002, 1492, 1006, 508, 296, 68)
+
+
+class PmtuEntry:
+    """ Container class for path MTU of single destination """
+
+    def __init__(self, mtu):
+        self.mtu = mtu
+        self.updated = timer_tick()
+
+
+class PmtuCache:
+    """ Per destination Path MTU cache, learned values age out so larger path MTU gets discovered again once path changes (RFC 1191, RFC 8201) """
+
+    def __init__(self, name, link_mtu, min_mtu, timeout, size):
+        """ Class constructor """
+
+        self.logger = loguru.logger.bind(object_name=f"{name}_pmtu_cache.")
+
+        # Path MTU can't exceed MTU of local link and is never lowered below minimum MTU of the protocol, learned value is forgotten after timeout (ms)
+        self.link_mtu = link_mtu
+        self.min_mtu = min_mtu
+        self.timeout = timeout
+        self.size = size
+
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def __str__(self):
+        """ Path MTU cache statistics string """
+
+        return f"destinations {len(self.entries)}/{self.size}"
+
+    def __iter__(self):
+        """ Iterate over snapshot of cache entries """
+
+        with self.lock:
+            return iter(list(self.entries.items()))
+
+    def get(self, ip_dst):
+        """ Return path MTU of destination, link MTU is assumed for destinations with no or aged out entry """
+
+        if (entry := self.entries.get(ip_dst, None)) is None:
+            return self.link_mtu
+
+        if timer_tick() - entry.updated >= self.timeout:
+            with self.lock:
+                if self.entries.get(ip_dst, None) is entry:
+                    del self.entries[ip_dst]
+            self.logger.debug(f"Path MTU {entry.mtu} of {ip_dst} aged out, assuming link MTU {self.link_mtu} again")
+            return self.link_mtu
+
+        return entry.mtu
+
+    def update(self, ip_dst, mtu):
+        """ Lower path MTU of destination as reported by ICMP message, reports that would raise it are ignored """
+
+        mtu = max(mtu, self.min_mtu)
+
+        if mtu >= self.get(ip_dst):
+            return
+
+        with self.lock:
+            self.entries[ip_dst] = PmtuEntry(mtu)
+            self.entries.move_to_end(ip_dst)
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+        self.logger.info(f"Lowered path MTU of {ip_dst} to {mtu}")
+
+
+def ip4_mtu_plateau(ip4_plen):
+    """ Pick the largest common MTU value smaller than length of packet that didn't fit (RFC 1191) """
+
+    return next((_ for _ in IP4_MTU_PLATEAUS if _ < ip4_plen), IP4_MTU_PLATEAUS[-1])
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# port_allocator.py - module contains class supporting ephemeral port allocation
+#
+
+
+import random
+import threading
+
+from ip_helper import ip_key
+
+WORD_BITS = 64
+WORD_FULL = (1 << WORD_BITS) - 1
+
+
+def lowest_bit(value):
+    """ Return index of the lowest bit set in value """
+
+    return (value & -value).bit_length() - 1
+
+
+class PortBitmap:
+    """ Two level bitmap keeping track of ports used within ephemeral port range of single local address """
+
+    def __init__(self, size):
+        """ Class constructor """
+
+        self.size = size
+        self.free = size
+
+        # Bit set in word means port is in use, padding bits in the last word are permanently marked as used
+        self.words = [0] * ((size + WORD_BITS - 1) // WORD_BITS)
+        if size % WORD_BITS:
+            self.words[-1] = WORD_FULL & ~((1 << (size % WORD_BITS)) - 1)
+
+        # Bit set in summary means corresponding word still has at least one free port
+        self.summary = (1 << len(self.words)) - 1
+
+    def allocate(self, start):
+        """ Allocate first free port offset at or after start offset, wrapping around the range """
+
+        if not self.free:
+            return None
+
+        word_index = start // WORD_BITS
+        free_bits = ~self.words[word_index] & WORD_FULL & (WORD_FULL << (start % WORD_BITS))
+
+        if not free_bits:
+            # Look for next word with free port, if there is none then wrap around to the beginning of the range
+            if summary := self.summary >> (word_index + 1):
+                word_index += 1 + lowest_bit(summary)
+            else:
+                word_index = lowest_bit(self.summary)
+            free_bits = ~self.words[word_index] & WORD_FULL
+
+        bit_index = lowest_bit(free_bits)
+        self.words[word_index] |= 1 << bit_index
+        if self.words[word_index] == WORD_FULL:
+            self.summary &= ~(1 << word_index)
+        self.free -= 1
+
+        return word_index * WORD_BITS + bit_index
+
+    def release(self, offset):
+        """ Mark port offset as free """
+
+        word_index = offset // WORD_BITS
+        bit = 1 << (offset % WORD_BITS)
+
+        if self.words[word_index] & bit:
+            self.words[word_index] &= ~bit
+            self.summary |= 1 << word_index
+            self.free += 1
+
+
+class PortAllocator:
+    """ Support for ephemeral port allocation, each local address has its own bitmap so the same port can be used with different local addresses """
+
+    def __init__(self, port_range):
+        """ Class constructor """
+
+        self.port_min, self.port_max = port_range
+        self.size = self.port_max - self.port_min + 1
+        self.lock = threading.Lock()
+        self.bitmaps = {}
+
+    def allocate(self, local_ip_address, in_use=None):
+        """ Allocate random free port for given local address (RFC 6056, Algorithm 1 with next free port search on collision), return None when range is exhausted,
+        'in_use' is optional function telling if port is taken by explicit bind allocator doesn't know about, such ports are skipped """
+
+        key = ip_key(local_ip_address)
+
+        with self.lock:
+            if (bitmap := self.bitmaps.get(key, None)) is None:
+                bitmap = self.bitmaps[key] = PortBitmap(self.size)
+
+            # Ports found taken are held in bitmap till search is over so it doesn't return them again, then they are given back
+            skipped = []
+            while (offset := bitmap.allocate(random.randrange(self.size))) is not None and in_use and in_use(self.port_min + offset):
+                skipped.append(offset)
+            for _ in skipped:
+                bitmap.release(_)
+
+            if offset is None and bitmap.free == bitmap.size:
+                del self.bitmaps[key]
+
+        return None if offset is None else self.port_min + offset
+
+    def release(self, local_ip_address, port):
+        """ Return port to the pool of free ports of given local address """
+
+        if not self.port_min <= port <= self.port_max:
+            return
+
+        key = ip_key(local_ip_address)
+
+        with self.lock:
+            if bitmap := self.bitmaps.get(key, None):
+                bitmap.release(port - self.port_min)
+                # Drop bitmaps of addresses that don't use any ports anymore
+                if bitmap.free == bitmap.size:
+                    del self.bitmaps[key]
@@ -47,6 +47,7 @@ import loguru
 
 import config
 from ipv4_address import IPv4Address
+from mac_address import MAC_UNSPECIFIED, MacAddress
 from tracker import Tracker
 
 # ARP packet header - IPv4 stack version only
@@ -79,7 +80,7 @@ class ArpPacket:
 
     protocol = "ARP"
 
-    def __init__(self, parent_packet=None, arp_sha=None, arp_spa=None, arp_tpa=None, arp_tha="00:00:00:00:00:00", arp_oper=ARP_OP_REQUEST, echo_tracker=None):
+    def __init__(self, parent_packet=None, arp_sha=None, arp_spa=None, arp_tpa=None, arp_tha=MAC_UNSPECIFIED, arp_oper=ARP_OP_REQUEST, echo_tracker=None):
         """ Class constructor """
 
         self.logger = loguru.logger.bind(object_name="ps_arp.")
@@ -102,9 +103,9 @@ class ArpPacket:
             self.arp_hrlen = raw_header[4]
             self.arp_prlen = raw_header[5]
             self.arp_oper = struct.unpack("!H", raw_header[6:8])[0]
-            self.arp_sha = ":".join([f"{_:0>2x}" for _ in raw_header[8:14]])
+            self.arp_sha = MacAddress(raw_header[8:14])
             self.arp_spa = IPv4Address(raw_header[14:18])
-            self.arp_tha = ":".join([f"{_:0>2x}" for _ in raw_header[18:24]])
+            self.arp_tha = MacAddress(raw_header[18:24])
             self.arp_tpa = IPv4Address(raw_header[24:28])
 
             if not self.__post_parse_sanity_check():
@@ -119,9 +120,9 @@ class ArpPacket:
             self.arp_hrlen = 6
             self.arp_prlen = 4
             self.arp_oper = arp_oper
-            self.arp_sha = arp_sha
+            self.arp_sha = MacAddress(arp_sha)
             self.arp_spa = IPv4Address(arp_spa)
-            self.arp_tha = arp_tha
+            self.arp_tha = MacAddress(arp_tha)
             self.arp_tpa = IPv4Address(arp_tpa)
 
     def __str__(self):
@@ -149,9 +150,9 @@ class ArpPacket:
             self.arp_hrlen,
             self.arp_prlen,
             self.arp_oper,
-            bytes.fromhex(self.arp_sha.replace(":", "")),
+            self.arp_sha,
             IPv4Address(self.arp_spa).packed,
-            bytes.fromhex(self.arp_tha.replace(":", "")),
+            self.arp_tha,
             IPv4Address(self.arp_tpa).packed,
         )
 
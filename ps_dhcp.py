@@ -296,7 +296,7 @@ class DhcpPacket:
             self.dhcp_yiaddr.packed,
             self.dhcp_siaddr.packed,
             self.dhcp_giaddr.packed,
-            (bytes.fromhex(self.dhcp_chaddr.replace(":", "")) + b"\0" * 16)[:16],
+            (self.dhcp_chaddr + b"\0" * 16)[:16],
             self.dhcp_sname,
             self.dhcp_file,
             b"\x63\x82\x53\x63",
@@ -46,6 +46,7 @@ import struct
 import loguru
 
 import config
+from mac_address import MAC_UNSPECIFIED, MacAddress
 from tracker import Tracker
 
 # Ethernet packet header
@@ -77,7 +78,7 @@ class EtherPacket:
 
     protocol = "ETHER"
 
-    def __init__(self, raw_packet=None, ether_src="00:00:00:00:00:00", ether_dst="00:00:00:00:00:00", child_packet=None):
+    def __init__(self, raw_packet=None, ether_src=MAC_UNSPECIFIED, ether_dst=MAC_UNSPECIFIED, child_packet=None):
         """ Class constructor """
 
         self.logger = loguru.logger.bind(object_name="ps_ether.")
@@ -86,6 +87,7 @@ class EtherPacket:
         # Packet parsing
         if raw_packet:
             self.tracker = Tracker("RX")
+            self.rx_cksum_valid = False  # Set by RX ring if kernel has already validated TCP / UDP checksum
 
             if not self.__pre_parse_sanity_check(raw_packet):
                 self.sanity_check_failed = True
@@ -94,8 +96,8 @@ class EtherPacket:
             raw_header = raw_packet[:ETHER_HEADER_LEN]
 
             self.raw_data = raw_packet[ETHER_HEADER_LEN:]
-            self.ether_dst = ":".join([f"{_:0>2x}" for _ in raw_header[0:6]])
-            self.ether_src = ":".join([f"{_:0>2x}" for _ in raw_header[6:12]])
+            self.ether_dst = MacAddress(raw_header[0:6])
+            self.ether_src = MacAddress(raw_header[6:12])
             self.ether_type = struct.unpack("!H", raw_header[12:14])[0]
 
             if not self.__post_parse_sanity_check():
@@ -105,8 +107,8 @@ class EtherPacket:
         else:
             self.tracker = child_packet.tracker
 
-            self.ether_dst = ether_dst
-            self.ether_src = ether_src
+            self.ether_dst = MacAddress(ether_dst)
+            self.ether_src = MacAddress(ether_src)
 
             assert child_packet.protocol in {"IPv6", "IPv4", "ARP"}, f"Not supported protocol: {child_packet.protocol}"
 
@@ -121,6 +123,9 @@ class EtherPacket:
 
             self.raw_data = child_packet.get_raw_packet()
 
+            # Offload requests for kernel, sent in virtio-net header
+            self.vnet_hdr = child_packet.vnet_hdr if child_packet.protocol in {"IPv6", "IPv4"} else None
+
     def __str__(self):
         """ Short packet log string """
 
@@ -135,7 +140,7 @@ class EtherPacket:
     def raw_header(self):
         """ Packet header in raw format """
 
-        return struct.pack("! 6s 6s H", bytes.fromhex(self.ether_dst.replace(":", "")), bytes.fromhex(self.ether_src.replace(":", "")), self.ether_type)
+        return self.ether_dst + self.ether_src + struct.pack("!H", self.ether_type)
 
     @property
     def raw_packet(self):
@@ -46,7 +46,7 @@ import struct
 import loguru
 
 import config
-from ip_helper import inet_cksum
+from inet_cksum import inet_cksum
 from tracker import Tracker
 
 # Echo reply message (0/0)
@@ -149,7 +149,8 @@ class Icmp4Packet:
                 self.icmp4_ec_raw_data = raw_packet[8:]
 
             elif self.icmp4_type == ICMP4_UNREACHABLE:
-                self.icmp4_un_reserved = struct.unpack("!L", raw_packet[4:6])[0]
+                self.icmp4_un_reserved = struct.unpack("!L", raw_packet[4:8])[0]
+                self.icmp4_un_mtu = struct.unpack("!H", raw_packet[6:8])[0]  # Next hop MTU carried by Fragmentation Needed message (RFC 1191)
                 self.icmp4_un_raw_data = raw_packet[8:]
 
             elif self.icmp4_type == ICMP4_ECHOREQUEST:
@@ -196,6 +197,9 @@ class Icmp4Packet:
         elif self.icmp4_type == ICMP4_UNREACHABLE and self.icmp4_code == ICMP4_UNREACHABLE__PORT:
             pass
 
+        elif self.icmp4_type == ICMP4_UNREACHABLE and self.icmp4_code == ICMP4_UNREACHABLE__FAGMENTATION:
+            log += f", mtu {self.icmp4_un_mtu}"
+
         elif self.icmp4_type == ICMP4_ECHOREQUEST:
             log += f", id {self.icmp4_ec_id}, seq {self.icmp4_ec_seq}"
 
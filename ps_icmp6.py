@@ -46,8 +46,9 @@ import struct
 import loguru
 
 import config
-from ip_helper import inet_cksum
+from inet_cksum import inet_cksum, inet_sum
 from ipv6_address import IPv6Address, IPv6Network
+from mac_address import MacAddress
 from tracker import Tracker
 
 # Destination Unreachable message (1/[0-6])
@@ -381,6 +382,10 @@ class Icmp6Packet:
                 self.icmp6_un_reserved = struct.unpack("!L", raw_packet[4:8])[0]
                 self.icmp6_un_raw_data = raw_packet[8:]
 
+            elif self.icmp6_type == ICMP6_PACKET_TOO_BIG:
+                self.icmp6_ptb_mtu = struct.unpack("!L", raw_packet[4:8])[0]
+                self.icmp6_ptb_raw_data = raw_packet[8:]
+
             elif self.icmp6_type == ICMP6_ECHOREQUEST:
                 self.icmp6_ec_id = struct.unpack("!H", raw_packet[4:6])[0]
                 self.icmp6_ec_seq = struct.unpack("!H", raw_packet[6:8])[0]
@@ -494,6 +499,9 @@ class Icmp6Packet:
         if self.icmp6_type == ICMP6_UNREACHABLE:
             pass
 
+        elif self.icmp6_type == ICMP6_PACKET_TOO_BIG:
+            log += f", mtu {self.icmp6_ptb_mtu}"
+
         elif self.icmp6_type == ICMP6_ECHOREQUEST:
             log += f", id {self.icmp6_ec_id}, seq {self.icmp6_ec_seq}"
 
@@ -615,7 +623,7 @@ class Icmp6Packet:
     def get_raw_packet(self, ip_pseudo_header):
         """ Get packet in raw format ready to be processed by lower level protocol """
 
-        self.icmp6_cksum = inet_cksum(ip_pseudo_header + self.raw_packet)
+        self.icmp6_cksum = inet_cksum(self.raw_packet, inet_sum(ip_pseudo_header))
 
         return self.raw_packet
 
@@ -633,7 +641,7 @@ class Icmp6Packet:
     def validate_cksum(self, ip_pseudo_header):
         """ Validate packet checksum """
 
-        return not bool(inet_cksum(ip_pseudo_header + self.raw_packet))
+        return not bool(inet_cksum(self.raw_packet, inet_sum(ip_pseudo_header)))
 
     @staticmethod
     def __read_nd_options(raw_nd_options):
@@ -701,7 +709,7 @@ class Icmp6Packet:
         if not config.pre_parse_sanity_check:
             return True
 
-        if inet_cksum(pseudo_header + raw_packet):
+        if inet_cksum(raw_packet, inet_sum(pseudo_header)):
             self.logger.critical(f"{self.tracker} - ICMPv6 sanity check fail - wrong packet checksum")
             return False
 
@@ -714,6 +722,11 @@ class Icmp6Packet:
                 self.logger.critical(f"{self.tracker} - ICMPv6 sanity check fail - wrong packet length (II)")
                 return False
 
+        elif raw_packet[0] == ICMP6_PACKET_TOO_BIG:
+            if len(raw_packet) < 8:
+                self.logger.critical(f"{self.tracker} - ICMPv6 sanity check fail - wrong packet length (II)")
+                return False
+
         elif raw_packet[0] == ICMP6_ECHOREQUEST:
             if len(raw_packet) < 8:
                 self.logger.critical(f"{self.tracker} - ICMPv6 sanity check fail - wrong packet length (II)")
@@ -952,15 +965,15 @@ class Icmp6NdOptSLLA:
         if raw_option:
             self.opt_code = raw_option[0]
             self.opt_len = raw_option[1] << 3
-            self.opt_slla = ":".join([f"{_:0>2x}" for _ in raw_option[2:8]])
+            self.opt_slla = MacAddress(raw_option[2:8])
         else:
             self.opt_code = ICMP6_ND_OPT_SLLA
             self.opt_len = ICMP6_ND_OPT_SLLA_LEN
-            self.opt_slla = opt_slla
+            self.opt_slla = MacAddress(opt_slla)
 
     @property
     def raw_option(self):
-        return struct.pack("! BB 6s", self.opt_code, self.opt_len >> 3, bytes.fromhex(self.opt_slla.replace(":", "")))
+        return struct.pack("! BB 6s", self.opt_code, self.opt_len >> 3, self.opt_slla)
 
     def __str__(self):
         return f"slla {self.opt_slla}"
@@ -985,15 +998,15 @@ class Icmp6NdOptTLLA:
         if raw_option:
             self.opt_code = raw_option[0]
             self.opt_len = raw_option[1] << 3
-            self.opt_tlla = ":".join([f"{_:0>2x}" for _ in raw_option[2:8]])
+            self.opt_tlla = MacAddress(raw_option[2:8])
         else:
             self.opt_code = ICMP6_ND_OPT_TLLA
             self.opt_len = ICMP6_ND_OPT_TLLA_LEN
-            self.opt_tlla = opt_tlla
+            self.opt_tlla = MacAddress(opt_tlla)
 
     @property
     def raw_option(self):
-        return struct.pack("! BB 6s", self.opt_code, self.opt_len >> 3, bytes.fromhex(self.opt_tlla.replace(":", "")))
+        return struct.pack("! BB 6s", self.opt_code, self.opt_len >> 3, self.opt_tlla)
 
     def __str__(self):
         return f"tlla {self.opt_tlla}"
@@ -1046,7 +1059,7 @@ class Icmp6NdOptPI:
             self.opt_valid_lifetime = struct.unpack("!L", raw_option[4:8])[0]
             self.opt_preferred_lifetime = struct.unpack("!L", raw_option[8:12])[0]
             self.opt_reserved_2 = struct.unpack("!L", raw_option[12:16])[0]
-            self.opt_prefix = IPv6Network((raw_option[16:32], raw_option[2]))
+            self.opt_prefix = IPv6Network((bytes(raw_option[16:32]), raw_option[2]))
         else:
             self.opt_code = ICMP6_ND_OPT_PI
             self.opt_len = ICMP6_ND_OPT_PI_LEN
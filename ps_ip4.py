@@ -46,8 +46,10 @@ import struct
 import loguru
 
 import config
-from ip_helper import inet_cksum
+from inet_cksum import inet_cksum, inet_sum
 from ipv4_address import IPv4Address
+from ps_ether import ETHER_HEADER_LEN
+from ps_vnet_hdr import VNET_HDR_GSO_TCPV4, vnet_hdr_cksum_offload
 
 # IPv4 protocol header
 
@@ -186,6 +188,8 @@ class Ip4Packet:
 
             self.ip4_options = []
 
+            self.rx_cksum_valid = parent_packet.rx_cksum_valid
+
             opt_cls = {}
 
             i = 0
@@ -230,6 +234,7 @@ class Ip4Packet:
             self.ip4_dst = IPv4Address(ip4_dst)
 
             self.ip4_options = [] if ip4_options is None else ip4_options
+            self.vnet_hdr = None
 
             self.ip4_hlen = IP4_HEADER_LEN + len(self.raw_options)
 
@@ -246,12 +251,18 @@ class Ip4Packet:
                 if child_packet.protocol == "UDP":
                     self.ip4_proto = IP4_PROTO_UDP
                     self.ip4_plen = self.ip4_hlen + child_packet.udp_plen
-                    self.raw_data = child_packet.get_raw_packet(self.ip_pseudo_header)
 
                 if child_packet.protocol == "TCP":
                     self.ip4_proto = IP4_PROTO_TCP
                     self.ip4_plen = self.ip4_hlen + child_packet.tcp_hlen + len(child_packet.raw_data)
-                    self.raw_data = child_packet.get_raw_packet(self.ip_pseudo_header)
+
+                # Leave TCP / UDP checksum (and segmentation of TCP super-segments) to kernel if virtio-net header is in use
+                if child_packet.protocol in {"UDP", "TCP"}:
+                    if config.vnet_hdr:
+                        self.raw_data = child_packet.get_raw_packet(self.ip_pseudo_header, cksum_offload=True)
+                        self.vnet_hdr = vnet_hdr_cksum_offload(ETHER_HEADER_LEN + self.ip4_hlen, child_packet, VNET_HDR_GSO_TCPV4)
+                    else:
+                        self.raw_data = child_packet.get_raw_packet(self.ip_pseudo_header)
 
             else:
                 self.ip4_proto = ip4_proto
@@ -316,7 +327,7 @@ class Ip4Packet:
     def get_raw_packet(self):
         """ Get packet in raw format ready to be processed by lower level protocol """
 
-        self.ip4_cksum = inet_cksum(self.raw_header + self.raw_options)
+        self.ip4_cksum = inet_cksum(self.raw_options, inet_sum(self.raw_header))
 
         return self.raw_packet
 
@@ -331,7 +342,7 @@ class Ip4Packet:
     def validate_cksum(self):
         """ Validate packet checksum """
 
-        return not bool(inet_cksum(self.raw_header + self.raw_options))
+        return not bool(inet_cksum(self.raw_options, inet_sum(self.raw_header)))
 
     def __pre_parse_sanity_check(self, raw_packet):
         """ Preliminary sanity check to be run on raw IPv4 packet prior to packet parsing """
@@ -426,6 +437,36 @@ class Ip4Packet:
         return True
 
 
+class Ip4Fragment:
+    """ Outbound IPv4 fragment made of header filled out from shared template and slice of payload that has been serialized only once """
+
+    protocol = "IPv4"
+
+    def __init__(self, raw_header, raw_data, tracker):
+        """ Class constructor """
+
+        self.raw_header = raw_header
+        self.raw_data = raw_data
+        self.tracker = tracker
+        self.vnet_hdr = None
+
+    def __str__(self):
+        """ Short packet log string """
+
+        ip4_plen, ip4_packet_id, ip4_frag = struct.unpack("! HHH", self.raw_header[2:8])
+        return f"IPv4 fragment, id {ip4_packet_id}{', MF' if ip4_frag & 0b0010000000000000 else ''}, offset {(ip4_frag & 0b0001111111111111) << 3}, plen {ip4_plen}"
+
+    def __len__(self):
+        """ Length of the packet """
+
+        return len(self.raw_header) + len(self.raw_data)
+
+    def get_raw_packet(self):
+        """ Get packet in raw format ready to be processed by lower level protocol """
+
+        return self.raw_header + self.raw_data
+
+
 #
 #   IPv4 options
 #
@@ -47,6 +47,8 @@ import loguru
 
 import config
 from ipv6_address import IPv6Address
+from ps_ether import ETHER_HEADER_LEN
+from ps_vnet_hdr import VNET_HDR_GSO_TCPV6, vnet_hdr_cksum_offload
 
 # IPv6 protocol header
 
@@ -77,9 +79,10 @@ IP6_HEADER_LEN = 40
 
 IP6_NEXT_HEADER_TCP = 6
 IP6_NEXT_HEADER_UDP = 17
+IP6_NEXT_HEADER_FRAG = 44
 IP6_NEXT_HEADER_ICMP6 = 58
 
-IP6_NEXT_HEADER_TABLE = {IP6_NEXT_HEADER_TCP: "TCP", IP6_NEXT_HEADER_UDP: "UDP", IP6_NEXT_HEADER_ICMP6: "ICMPv6"}
+IP6_NEXT_HEADER_TABLE = {IP6_NEXT_HEADER_TCP: "TCP", IP6_NEXT_HEADER_UDP: "UDP", IP6_NEXT_HEADER_FRAG: "FRAG", IP6_NEXT_HEADER_ICMP6: "ICMPv6"}
 
 DSCP_CS0 = 0b000000
 DSCP_CS1 = 0b001000
@@ -178,6 +181,8 @@ class Ip6Packet:
             self.ip6_src = IPv6Address(raw_header[8:24])
             self.ip6_dst = IPv6Address(raw_header[24:40])
 
+            self.rx_cksum_valid = parent_packet.rx_cksum_valid
+
             if not self.__post_parse_sanity_check():
                 self.sanity_check_failed = True
 
@@ -196,6 +201,7 @@ class Ip6Packet:
             self.ip6_hop = ip6_hop
             self.ip6_src = IPv6Address(ip6_src)
             self.ip6_dst = IPv6Address(ip6_dst)
+            self.vnet_hdr = None
 
             if child_packet:
                 assert child_packet.protocol in {"ICMPv6", "UDP", "TCP"}, f"Not supported protocol: {child_packet.protocol}"
@@ -210,7 +216,13 @@ class Ip6Packet:
                     self.ip6_next = IP6_NEXT_HEADER_TCP
 
                 self.ip6_dlen = len(child_packet.raw_packet)
-                self.raw_data = child_packet.get_raw_packet(self.ip_pseudo_header)
+
+                # Leave TCP / UDP checksum (and segmentation of TCP super-segments) to kernel if virtio-net header is in use
+                if config.vnet_hdr and child_packet.protocol in {"UDP", "TCP"}:
+                    self.raw_data = child_packet.get_raw_packet(self.ip_pseudo_header, cksum_offload=True)
+                    self.vnet_hdr = vnet_hdr_cksum_offload(ETHER_HEADER_LEN + IP6_HEADER_LEN, child_packet, VNET_HDR_GSO_TCPV6)
+                else:
+                    self.raw_data = child_packet.get_raw_packet(self.ip_pseudo_header)
 
             else:
                 self.ip6_next = ip6_next
@@ -303,3 +315,95 @@ class Ip6Packet:
             return False
 
         return True
+
+
+# IPv6 Fragment extension header (RFC 8200)
+
+# +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+# |  Next Header  |   Reserved    |      Fragment Offset    |Res|M|
+# +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+# |                         Identification                        |
+# +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+
+
+IP6_EXT_FRAG_LEN = 8
+
+
+class Ip6ExtFrag:
+    """ IPv6 Fragment extension header support class """
+
+    def __init__(self, raw_packet=None, tracker=None, frag_next=None, frag_offset=0, frag_flag_mf=False, frag_id=0):
+        """ Class constructor """
+
+        self.logger = loguru.logger.bind(object_name="ps_ip6.")
+        self.sanity_check_failed = False
+
+        # Header parsing, raw_packet is the payload of IPv6 packet that carries Fragment header
+        if raw_packet is not None:
+            self.tracker = tracker
+
+            if not self.__pre_parse_sanity_check(raw_packet):
+                self.sanity_check_failed = True
+                return
+
+            raw_header = raw_packet[:IP6_EXT_FRAG_LEN]
+
+            self.raw_data = raw_packet[IP6_EXT_FRAG_LEN:]
+
+            self.frag_next = raw_header[0]
+            self.frag_offset = struct.unpack("!H", raw_header[2:4])[0] & 0b1111111111111000
+            self.frag_flag_mf = bool(raw_header[3] & 0b00000001)
+            self.frag_id = struct.unpack("!L", raw_header[4:8])[0]
+
+            if not self.__post_parse_sanity_check():
+                self.sanity_check_failed = True
+
+        # Header building
+        else:
+            self.tracker = tracker
+
+            self.frag_next = frag_next
+            self.frag_offset = frag_offset
+            self.frag_flag_mf = frag_flag_mf
+            self.frag_id = frag_id
+
+    def __str__(self):
+        """ Short header log string """
+
+        return f"FRAG next {self.frag_next} ({IP6_NEXT_HEADER_TABLE.get(self.frag_next, '???')}), offset {self.frag_offset}, mf {int(self.frag_flag_mf)}, id {self.frag_id}"
+
+    @property
+    def raw_header(self):
+        """ Header in raw form """
+
+        return struct.pack("! BBH L", self.frag_next, 0, self.frag_offset | self.frag_flag_mf, self.frag_id)
+
+    def __pre_parse_sanity_check(self, raw_packet):
+        """ Preliminary sanity check to be run on raw Fragment header prior to header parsing """
+
+        if not config.pre_parse_sanity_check:
+            return True
+
+        if len(raw_packet) < IP6_EXT_FRAG_LEN:
+            self.logger.critical(f"{self.tracker} - IPv6 Fragment header sanity check fail - wrong packet length")
+            return False
+
+        return True
+
+    def __post_parse_sanity_check(self):
+        """ Sanity check to be run on parsed Fragment header """
+
+        if not config.post_parse_sanity_check:
+            return True
+
+        # Fragment carries no data
+        if not self.raw_data:
+            self.logger.critical(f"{self.tracker} - IPv6 Fragment header sanity check fail - fragment carries no data")
+            return False
+
+        # Every fragment but the last one needs to carry multiple of 8 bytes (RFC 8200)
+        if self.frag_flag_mf and len(self.raw_data) % 8:
+            self.logger.critical(f"{self.tracker} - IPv6 Fragment header sanity check fail - length of fragment data is not multiple of 8")
+            return False
+
+        return True
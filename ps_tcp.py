@@ -46,7 +46,7 @@ import struct
 import loguru
 
 import config
-from ip_helper import inet_cksum
+from inet_cksum import inet_cksum, inet_sum
 from tracker import Tracker
 
 # TCP packet header (RFC 793)
@@ -94,6 +94,7 @@ class TcpPacket:
         tcp_urp=0,
         tcp_options=None,
         raw_data=b"",
+        tcp_gso_size=None,
         tracker=None,
         echo_tracker=None,
     ):
@@ -107,7 +108,7 @@ class TcpPacket:
             self.tracker = parent_packet.tracker
             raw_packet = parent_packet.raw_data
 
-            if not self.__pre_parse_sanity_check(raw_packet, parent_packet.ip_pseudo_header):
+            if not self.__pre_parse_sanity_check(raw_packet, parent_packet.ip_pseudo_header, parent_packet.rx_cksum_valid):
                 self.sanity_check_failed = True
                 return
 
@@ -193,6 +194,9 @@ class TcpPacket:
 
             self.raw_data = raw_data
 
+            # Segment size kernel is to cut super-segment into (virtio-net header TSO)
+            self.tcp_gso_size = tcp_gso_size
+
             self.tcp_hlen = TCP_HEADER_LEN + len(self.raw_options)
 
             assert self.tcp_hlen % 4 == 0, "TCP header len is not multiplcation of 4 bytes, check options"
@@ -258,17 +262,17 @@ class TcpPacket:
 
         return self.raw_header + self.raw_options + self.raw_data
 
-    def get_raw_packet(self, ip_pseudo_header):
-        """ Get packet in raw format ready to be processed by lower level protocol """
+    def get_raw_packet(self, ip_pseudo_header, cksum_offload=False):
+        """ Get packet in raw format ready to be processed by lower level protocol, with offload only pseudo header sum is filled in for kernel to finish """
 
-        self.tcp_cksum = inet_cksum(ip_pseudo_header + self.raw_packet)
+        self.tcp_cksum = inet_sum(ip_pseudo_header) if cksum_offload else inet_cksum(self.raw_packet, inet_sum(ip_pseudo_header))
 
         return self.raw_packet
 
     def validate_cksum(self, ip_pseudo_header):
         """ Validate packet checksum """
 
-        return not bool(inet_cksum(ip_pseudo_header + self.raw_packet))
+        return not bool(inet_cksum(self.raw_packet, inet_sum(ip_pseudo_header)))
 
     @property
     def tcp_mss(self):
@@ -306,13 +310,13 @@ class TcpPacket:
                 return option.opt_tsval, option.opt_tsecr
         return None
 
-    def __pre_parse_sanity_check(self, raw_packet, pseudo_header):
+    def __pre_parse_sanity_check(self, raw_packet, pseudo_header, cksum_valid):
         """ Preliminary sanity check to be run on raw TCP packet prior to packet parsing """
 
         if not config.pre_parse_sanity_check:
             return True
 
-        if inet_cksum(pseudo_header + raw_packet):
+        if not cksum_valid and inet_cksum(raw_packet, inet_sum(pseudo_header)):
             self.logger.critical(f"{self.tracker} - TCP sanity check fail - wrong packet checksum")
             return False
 
@@ -46,7 +46,7 @@ import struct
 import loguru
 
 import config
-from ip_helper import inet_cksum
+from inet_cksum import inet_cksum, inet_sum
 from tracker import Tracker
 
 # UDP packet header (RFC 768)
@@ -77,7 +77,7 @@ class UdpPacket:
             self.tracker = parent_packet.tracker
             raw_packet = parent_packet.raw_data
 
-            if not self.__pre_parse_sanity_check(raw_packet, parent_packet.ip_pseudo_header):
+            if not self.__pre_parse_sanity_check(raw_packet, parent_packet.ip_pseudo_header, parent_packet.rx_cksum_valid):
                 self.sanity_check_failed = True
                 return
 
@@ -127,10 +127,10 @@ class UdpPacket:
 
         return self.raw_header + self.raw_data
 
-    def get_raw_packet(self, ip_pseudo_header):
-        """ Get packet in raw format ready to be processed by lower level protocol """
+    def get_raw_packet(self, ip_pseudo_header, cksum_offload=False):
+        """ Get packet in raw format ready to be processed by lower level protocol, with offload only pseudo header sum is filled in for kernel to finish """
 
-        self.udp_cksum = inet_cksum(ip_pseudo_header + self.raw_packet)
+        self.udp_cksum = inet_sum(ip_pseudo_header) if cksum_offload else inet_cksum(self.raw_packet, inet_sum(ip_pseudo_header))
 
         return self.raw_packet
 
@@ -141,15 +141,15 @@ class UdpPacket:
         if not self.udp_cksum:
             return True
 
-        return not bool(inet_cksum(ip_pseudo_header + self.raw_packet))
+        return not bool(inet_cksum(self.raw_packet, inet_sum(ip_pseudo_header)))
 
-    def __pre_parse_sanity_check(self, raw_packet, pseudo_header):
+    def __pre_parse_sanity_check(self, raw_packet, pseudo_header, cksum_valid):
         """ Preliminary sanity check to be run on raw UDP packet prior to packet parsing """
 
         if not config.pre_parse_sanity_check:
             return True
 
-        if inet_cksum(pseudo_header + raw_packet):
+        if not cksum_valid and inet_cksum(raw_packet, inet_sum(pseudo_header)):
             self.logger.critical(f"{self.tracker} - UDP sanity check fail - wrong packet checksum")
             return False
 
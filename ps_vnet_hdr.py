@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+
+#
+# ps_vnet_hdr.py - protocol support libary for virtio-net header used by TAP interface in IFF_VNET_HDR mode
+#
+
+
+import struct
+
+# Virtio-net header (virtio spec, section 5.1.6), fields are in host byte order
+
+# +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+# |     Flags     |   GSO type    |         Header length         |
+# +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+# |           GSO size            |        Checksum start         |
+# +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+# |        Checksum offset        |
+# +-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+
+
+
+VNET_HDR_LEN = 10
+
+VNET_HDR_F_NEEDS_CSUM = 0x01  # Checksum needs to be computed starting at csum_start and stored at csum_start + csum_offset
+VNET_HDR_F_DATA_VALID = 0x02  # Checksum has already been validated
+
+VNET_HDR_GSO_NONE = 0
+VNET_HDR_GSO_TCPV4 = 1
+VNET_HDR_GSO_TCPV6 = 4
+
+# Largest TCP super-segment payload that still fits into IPv4 total length / IPv6 payload length field with maximum size headers
+VNET_HDR_GSO_MAX_DATA = 65535 - 20 - 60
+
+
+class VnetHdr:
+    """ Virtio-net header support class """
+
+    def __init__(self, raw_header=None, flags=0, gso_type=VNET_HDR_GSO_NONE, hdr_len=0, gso_size=0, csum_start=0, csum_offset=0):
+        """ Class constructor """
+
+        # Header parsing
+        if raw_header is not None:
+            self.flags, self.gso_type, self.hdr_len, self.gso_size, self.csum_start, self.csum_offset = struct.unpack("= BBHHHH", raw_header[:VNET_HDR_LEN])
+
+        # Header building
+        else:
+            self.flags = flags
+            self.gso_type = gso_type
+            self.hdr_len = hdr_len
+            self.gso_size = gso_size
+            self.csum_start = csum_start
+            self.csum_offset = csum_offset
+
+    def __str__(self):
+        """ Short header log string """
+
+        return (
+            f"VNET flags 0x{self.flags:02x}, gso {self.gso_type}, hdr_len {self.hdr_len}, gso_size {self.gso_size}, "
+            + f"csum_start {self.csum_start}, csum_offset {self.csum_offset}"
+        )
+
+    @property
+    def raw_header(self):
+        """ Header in raw format """
+
+        return struct.pack("= BBHHHH", self.flags, self.gso_type, self.hdr_len, self.gso_size, self.csum_start, self.csum_offset)
+
+    @property
+    def cksum_valid(self):
+        """ Check if kernel either validated checksum of received packet or is going to leave it as partial (packet originated on local host) """
+
+        return bool(self.flags & (VNET_HDR_F_DATA_VALID | VNET_HDR_F_NEEDS_CSUM))
+
+
+# Header sent along with packets that need no offload
+VNET_HDR_NONE = VnetHdr().raw_header
+
+
+def vnet_hdr_cksum_offload(l4_offset, child_packet, gso_type):
+    """ Build header asking kernel to compute TCP / UDP checksum of outbound packet, and to segment it if it's TCP super-segment """
+
+    if child_packet.protocol == "TCP" and child_packet.tcp_gso_size:
+        return VnetHdr(
+            flags=VNET_HDR_F_NEEDS_CSUM,
+            gso_type=gso_type,
+            hdr_len=l4_offset + child_packet.tcp_hlen,
+            gso_size=child_packet.tcp_gso_size,
+            csum_start=l4_offset,
+            csum_offset=16,
+        )
+
+    return VnetHdr(flags=VNET_HDR_F_NEEDS_CSUM, csum_start=l4_offset, csum_offset=16 if child_packet.protocol == "TCP" else 6)
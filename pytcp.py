@@ -50,6 +50,7 @@ import time
 import loguru
 
 import config
+import ps_vnet_hdr
 from client_icmp_echo import ClientIcmpEcho
 from client_tcp_echo import ClientTcpEcho
 from ph import PacketHandler
@@ -65,6 +66,12 @@ from timer import Timer
 TUNSETIFF = 0x400454CA
 IFF_TAP = 0x0002
 IFF_NO_PI = 0x1000
+IFF_VNET_HDR = 0x4000
+TUNSETOFFLOAD = 0x400454D0
+TUNSETVNETHDRSZ = 0x400454D8
+TUN_F_CSUM = 0x01
+TUN_F_TSO4 = 0x02
+TUN_F_TSO6 = 0x04
 
 
 #########################################################
@@ -98,7 +105,12 @@ def main():
     )
 
     tap = os.open("/dev/net/tun", os.O_RDWR)
-    fcntl.ioctl(tap, TUNSETIFF, struct.pack("16sH", config.interface, IFF_TAP | IFF_NO_PI))
+    fcntl.ioctl(tap, TUNSETIFF, struct.pack("16sH", config.interface, IFF_TAP | IFF_NO_PI | (IFF_VNET_HDR if config.vnet_hdr else 0)))
+
+    # Every frame is preceded by virtio-net header, tell kernel its size and which offloads it may leave to us on received frames
+    if config.vnet_hdr:
+        fcntl.ioctl(tap, TUNSETVNETHDRSZ, struct.pack("i", ps_vnet_hdr.VNET_HDR_LEN))
+        fcntl.ioctl(tap, TUNSETOFFLOAD, TUN_F_CSUM | (TUN_F_TSO4 | TUN_F_TSO6 if config.vnet_hdr_tso else 0))
 
     # Initialize stack components
     # StackCliServer()
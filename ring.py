@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# ring.py - module contains class supporting bounded packet queue used by RX and TX rings
+#
+
+
+import threading
+from collections import deque
+
+
+class Ring:
+    """ Bounded FIFO queue with O(1) enqueue / dequeue, drop policy and usage counters """
+
+    def __init__(self, capacity, drop="tail", drop_callback=None):
+        """ Class constructor """
+
+        assert drop in {"tail", "head"}, f"Unknown ring drop policy '{drop}'"
+
+        self.capacity = capacity
+        self.drop = drop
+        self.queue = deque()
+
+        # Method called with every dropped packet so the owner can reclaim resources held by it (eg. RX buffer)
+        self.drop_callback = drop_callback
+
+        # Producers serialize on the lock, single consumer relies on deque.popleft() being atomic
+        self.lock = threading.Lock()
+        self.packet_enqueued = threading.Semaphore(0)
+
+        self.enqueued = 0
+        self.dequeued = 0
+        self.dropped = 0
+        self.high_water = 0
+
+    def __len__(self):
+        """ Number of queued packets """
+
+        return len(self.queue)
+
+    def __str__(self):
+        """ Ring statistics string """
+
+        return (
+            f"len {len(self.queue)}/{self.capacity}, enqueued {self.enqueued}, dequeued {self.dequeued}, dropped {self.dropped}, high-water {self.high_water}"
+        )
+
+    def enqueue(self, packet, urgent=False):
+        """ Put packet at the end of the queue, or at its beginning if urgent, return False if packet had to be dropped """
+
+        with self.lock:
+            if full := len(self.queue) >= self.capacity:
+                self.dropped += 1
+                if self.drop == "tail":
+                    if self.drop_callback:
+                        self.drop_callback(packet)
+                    return False
+
+            if urgent:
+                self.queue.appendleft(packet)
+            else:
+                self.queue.append(packet)
+
+            # Make room by dropping the oldest packet only after the new one is queued so consumer never sees fewer packets than semaphore
+            # tokens, the new packet takes over dropped packet's token unless consumer emptied the queue meanwhile
+            new_packet = True
+            dropped_packet = None
+            if full:
+                try:
+                    if urgent:
+                        dropped_packet = self.queue[1]
+                        del self.queue[1]
+                    else:
+                        dropped_packet = self.queue.popleft()
+                    new_packet = False
+                except IndexError:
+                    pass
+
+            self.enqueued += 1
+            self.high_water = max(self.high_water, len(self.queue))
+
+        if new_packet:
+            self.packet_enqueued.release()
+
+        if dropped_packet is not None and self.drop_callback:
+            self.drop_callback(dropped_packet)
+
+        return True
+
+    def dequeue(self, timeout=None):
+        """ Take packet from the beginning of the queue, wait for it if queue is empty, return None on timeout """
+
+        if not self.packet_enqueued.acquire(timeout=timeout):
+            return None
+
+        self.dequeued += 1
+        return self.queue.popleft()
+
+    def dequeue_batch(self, budget, timeout=None):
+        """ Wait for the first packet and then take up to 'budget' packets from the queue without waiting, return empty list on timeout """
+
+        if not self.packet_enqueued.acquire(timeout=timeout):
+            return []
+
+        batch = [self.queue.popleft()]
+        while len(batch) < budget and self.packet_enqueued.acquire(blocking=False):
+            batch.append(self.queue.popleft())
+
+        self.dequeued += len(batch)
+        return batch
@@ -42,11 +42,16 @@
 
 
 import os
+import select
 import threading
 
 import loguru
 
+import config
 import ps_ether
+import ps_vnet_hdr
+from buffer_pool import BufferPool
+from ring import Ring
 
 
 class RxRing:
@@ -56,10 +61,17 @@ class RxRing:
         """ Initialize access to tap interface and the inbound queue """
 
         self.tap = tap
-        self.rx_ring = []
+        self.rx_ring = Ring(config.rx_ring_size, config.rx_ring_drop, drop_callback=self.release)  # Buffers of dropped packets go back to the pool
+        self.buffer_pool = BufferPool(config.rx_buffer_size, config.rx_buffer_count)
         self.logger = loguru.logger.bind(object_name="rx_ring.")
 
-        self.packet_enqueued = threading.Semaphore(0)
+        # In run to completion mode packets are read from TAP interface by the packet handler thread itself
+        if config.datapath == "run_to_completion":
+            os.set_blocking(self.tap, False)
+            self.epoll = select.epoll()
+            self.epoll.register(self.tap, select.EPOLLIN)
+            self.logger.debug("Started RX ring in run to completion mode")
+            return
 
         threading.Thread(target=self.__thread_receive).start()
         self.logger.debug("Started RX ring")
@@ -67,14 +79,13 @@ class RxRing:
     def __enqueue(self, ether_packet_rx):
         """ Enqueue packet for further processing """
 
-        if ether_packet_rx.ether_type == ps_ether.ETHER_TYPE_ARP:
-            self.rx_ring.insert(0, ether_packet_rx)
-            self.logger.opt(ansi=True).debug(f"{ether_packet_rx.tracker}, priority: Urgent, queue len: {len(self.rx_ring)}")
-        else:
-            self.rx_ring.append(ether_packet_rx)
-            self.logger.opt(ansi=True).debug(f"{ether_packet_rx.tracker}, priority: Normal, queue len: {len(self.rx_ring)}")
+        urgent = ether_packet_rx.ether_type == ps_ether.ETHER_TYPE_ARP
+
+        if not self.rx_ring.enqueue(ether_packet_rx, urgent=urgent):
+            self.logger.warning(f"{ether_packet_rx.tracker}, RX ring full, dropped packet ({self.rx_ring})")
+            return
 
-        self.packet_enqueued.release()
+        self.logger.opt(ansi=True).debug(f"{ether_packet_rx.tracker}, priority: {'Urgent' if urgent else 'Normal'}, queue len: {len(self.rx_ring)}")
 
     def __thread_receive(self):
         """ Thread responsible for receiving and enqueuing incoming packets """
@@ -82,13 +93,65 @@ class RxRing:
         while True:
 
             # Wait till there is any packet comming and pick it up
-            ether_packet_rx = ps_ether.EtherPacket(os.read(self.tap, 2048))
-            self.logger.opt(ansi=True).debug(f"<green>[RX]</green> {ether_packet_rx.tracker} - {len(ether_packet_rx)} bytes")
-            self.__enqueue(ether_packet_rx)
+            self.__enqueue(self.__read())
+
+    def __read(self):
+        """ Read single packet from TAP interface into buffer taken from the pool, packet refers to the buffer till it is released """
+
+        buffer = self.buffer_pool.get()
+        try:
+            frame_len = os.readv(self.tap, [buffer])
+        except BlockingIOError:
+            self.buffer_pool.put(buffer)
+            raise
+
+        if frame_len == len(buffer):
+            self.logger.warning(f"Received frame filled whole {len(buffer)} byte RX buffer and might have been truncated, consider increasing 'rx_buffer_size'")
+
+        # Frame is preceded by virtio-net header telling if kernel has already validated its TCP / UDP checksum
+        if config.vnet_hdr:
+            vnet_hdr = ps_vnet_hdr.VnetHdr(memoryview(buffer)[: ps_vnet_hdr.VNET_HDR_LEN])
+            ether_packet_rx = ps_ether.EtherPacket(memoryview(buffer)[ps_vnet_hdr.VNET_HDR_LEN : frame_len])
+            ether_packet_rx.rx_cksum_valid = vnet_hdr.cksum_valid
+        else:
+            ether_packet_rx = ps_ether.EtherPacket(memoryview(buffer)[:frame_len])
+        ether_packet_rx.rx_buffer = buffer
+        self.logger.opt(ansi=True).debug(f"<green>[RX]</green> {ether_packet_rx.tracker} - {frame_len} bytes")
+        return ether_packet_rx
+
+    def __read_batch(self, budget):
+        """ Wait till TAP interface is readable and read up to 'budget' packets from it without blocking """
+
+        batch = []
+        while not batch:
+            self.epoll.poll()
+            while len(batch) < budget:
+                try:
+                    batch.append(self.__read())
+                except BlockingIOError:
+                    break
+
+        self.rx_ring.enqueued += len(batch)
+        self.rx_ring.dequeued += len(batch)
+        return batch
+
+    def release(self, ether_packet_rx):
+        """ Return packet's buffer to the pool once packet is processed, any data kept after that point needs to be copied out of the buffer """
+
+        self.buffer_pool.put(ether_packet_rx.rx_buffer)
 
     def dequeue(self):
         """ Dequeue inboutd packet from RX ring """
 
-        self.packet_enqueued.acquire()
+        if config.datapath == "run_to_completion":
+            return self.__read_batch(1)[0]
+
+        return self.rx_ring.dequeue()
+
+    def dequeue_batch(self, budget):
+        """ Dequeue up to 'budget' inbound packets from RX ring, wait only for the first one """
+
+        if config.datapath == "run_to_completion":
+            return self.__read_batch(budget)
 
-        return self.rx_ring.pop(0)
+        return self.rx_ring.dequeue_batch(budget)
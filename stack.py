@@ -41,8 +41,15 @@
 #
 
 
+import config
+from port_allocator import PortAllocator
+from tcp_session_table import TcpSessionTable
+
 timer = None
 packet_handler = None
 
-tcp_sessions = {}
+tcp_sessions = TcpSessionTable()
 udp_sockets = {}
+
+tcp_ephemeral_ports = PortAllocator(config.TCP_EPHEMERAL_PORT_RANGE)
+udp_ephemeral_ports = PortAllocator(config.UDP_EPHEMERAL_PORT_RANGE)
@@ -45,6 +45,7 @@ import threading
 
 import loguru
 
+import config
 import stack
 
 
@@ -144,5 +145,52 @@ class StackCliServer:
                     message += b"\n"
                     conn.sendall(message)
 
+                elif message.lower().strip() == b"show ipv6 route":
+                    message = b"\n"
+                    for route in stack.packet_handler.ip6_fib.routes:
+                        message += bytes(str(route), "utf-8") + b"\n"
+                    message += b"\n"
+                    conn.sendall(message)
+
+                elif message.lower().strip() == b"show ipv4 route":
+                    message = b"\n"
+                    for route in stack.packet_handler.ip4_fib.routes:
+                        message += bytes(str(route), "utf-8") + b"\n"
+                    message += b"\n"
+                    conn.sendall(message)
+
+                elif message.lower().strip() == b"show rx stats":
+                    message = b"\n"
+                    message += bytes(f"RX ring: {stack.packet_handler.rx_ring.rx_ring}", "utf-8") + b"\n"
+                    message += bytes(f"RX batch: {stack.packet_handler.rx_batch_stats}", "utf-8") + b"\n"
+                    message += bytes(f"RX buffer pool: {stack.packet_handler.rx_ring.buffer_pool}", "utf-8") + b"\n"
+                    message += bytes(f"TX ring: {stack.packet_handler.tx_ring.tx_ring}", "utf-8") + b"\n"
+                    if config.datapath == "run_to_completion":
+                        message += bytes(f"TX requeued: {stack.packet_handler.tx_ring.requeued}", "utf-8") + b"\n"
+                    message += b"\n"
+                    conn.sendall(message)
+
+                elif message.lower().strip() == b"show egress stats":
+                    message = b"\n"
+                    message += bytes(f"Egress cache: {stack.packet_handler.egress_cache}", "utf-8") + b"\n"
+                    message += b"\n"
+                    conn.sendall(message)
+
+                elif message.lower().strip() == b"show reassembly stats":
+                    message = b"\n"
+                    message += bytes(f"IPv4 reassembly: {stack.packet_handler.ip4_reassembly}", "utf-8") + b"\n"
+                    message += bytes(f"IPv6 reassembly: {stack.packet_handler.ip6_reassembly}", "utf-8") + b"\n"
+                    message += b"\n"
+                    conn.sendall(message)
+
+                elif message.lower().strip() == b"show neighbor stats":
+                    message = b"\n"
+                    message += bytes(f"ARP cache: {stack.packet_handler.arp_cache.arp_cache}", "utf-8") + b"\n"
+                    message += bytes(f"ARP hold queue: {stack.packet_handler.arp_cache.hold_queue}", "utf-8") + b"\n"
+                    message += bytes(f"ICMPv6 ND cache: {stack.packet_handler.icmp6_nd_cache.nd_cache}", "utf-8") + b"\n"
+                    message += bytes(f"ICMPv6 ND hold queue: {stack.packet_handler.icmp6_nd_cache.hold_queue}", "utf-8") + b"\n"
+                    message += b"\n"
+                    conn.sendall(message)
+
                 else:
                     conn.sendall(b"Syntax error...\n")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# tcp_buffer.py - module contains class supporting TCP session's byte stream buffers
+#
+
+
+from collections import deque
+
+BUFFER_COALESCE_SIZE = 4096  # Small writes are merged into the last chunk up to this size to keep number of chunks low
+
+
+class TcpBuffer:
+    """ Byte stream buffer used by TCP session for TX and RX data, data is kept as list of immutable chunks so it can be handed out without copying """
+
+    def __init__(self):
+        """ Class constructor """
+
+        self.chunks = deque()
+        self.length = 0  # Number of bytes stored in the buffer
+        self.offset = 0  # Number of bytes already consumed from the first chunk
+
+    def __len__(self):
+        """ Number of bytes stored in the buffer """
+
+        return self.length
+
+    def append(self, data):
+        """ Add data at the end of the buffer """
+
+        if not data:
+            return
+
+        # Bytes object is immutable so it can be stored as is, anything else (bytearray, memoryview) needs to be copied
+        data = bytes(data)
+
+        if self.chunks and len(self.chunks[-1]) + len(data) <= BUFFER_COALESCE_SIZE:
+            self.chunks[-1] += data
+        else:
+            self.chunks.append(data)
+
+        self.length += len(data)
+
+    def peek(self, offset, length):
+        """ Return data from given offset without removing it from the buffer, data contained in single chunk is returned as memoryview without copying """
+
+        length = min(length, self.length - offset)
+        if length <= 0:
+            return b""
+
+        offset += self.offset
+        segments = []
+
+        for chunk in self.chunks:
+            if offset >= len(chunk):
+                offset -= len(chunk)
+                continue
+            segments.append(memoryview(chunk)[offset : offset + length])
+            length -= len(segments[-1])
+            offset = 0
+            if not length:
+                break
+
+        return segments[0] if len(segments) == 1 else b"".join(segments)
+
+    def consume(self, length):
+        """ Remove data from the beginning of the buffer """
+
+        length = min(length, self.length)
+        self.length -= length
+        length += self.offset
+
+        while self.chunks and length >= len(self.chunks[0]):
+            length -= len(self.chunks.popleft())
+
+        self.offset = length if self.chunks else 0
+
+    def read(self, length=None):
+        """ Remove data from the beginning of the buffer and return it, whole chunk is returned without copying """
+
+        length = self.length if length is None else min(length, self.length)
+        if not length:
+            return b""
+
+        # Data is exactly the first chunk, no need to copy it
+        if not self.offset and len(self.chunks[0]) == length:
+            self.length -= length
+            return self.chunks.popleft()
+
+        data = bytes(self.peek(0, length))
+        self.consume(length)
+        return data
@@ -83,23 +83,3 @@ class TcpMetadata:
         """ Session ID """
 
         return f"TCP/{self.local_ip_address}/{self.local_port}/{self.remote_ip_address}/{self.remote_port}"
-
-    @property
-    def tcp_session_listening_patterns(self):
-        """ Session ID patterns that match listening socket """
-
-        if self.remote_ip_address.version == 6:
-            return [
-                f"TCP/{self.local_ip_address}/{self.local_port}/*/*",
-                f"TCP/::/{self.local_port}/*/*",
-                f"TCP/*/{self.local_port}/*/*",
-            ]
-
-        if self.remote_ip_address.version == 4:
-            return [
-                f"TCP/{self.local_ip_address}/{self.local_port}/*/*",
-                f"TCP/0.0.0.0/{self.local_port}/*/*",
-                f"TCP/*/{self.local_port}/*/*",
-            ]
-
-        return None
@@ -98,7 +98,8 @@ class TcpSession:
         self.logger = loguru.logger.bind(object_name="tcp_session.")
 
         self.local_ip_address = local_ip_address
-        self.local_port = local_port if local_port else self.__pick_random_local_port()
+        self.local_port_ephemeral = not local_port  # Ephemeral port needs to be returned to allocator once session is closed
+        self.local_port = local_port if local_port else stack.tcp_ephemeral_ports.allocate(local_ip_address, self.__local_port_in_use)
         self.remote_ip_address = remote_ip_address
         self.remote_port = remote_port
 
@@ -183,6 +184,9 @@ class TcpSession:
         """ CONNECT syscall """
 
         self.logger.debug(f"{self.tcp_session_id} - State {self.state} - got CONNECT syscall")
+        if self.local_port is None:
+            self.logger.warning(f"{self.tcp_session_id} - Unable to connect, no free ephemeral ports left")
+            return False
         self.tcp_fsm(syscall="CONNECT")
         self.event_connect.acquire()
         return self.state == "ESTABLISHED"
@@ -227,12 +231,10 @@ class TcpSession:
         self.logger.debug(f"{self.tcp_session_id} - State {self.state} - got CLOSE syscall, {len(self.tx_buffer)} bytes in TX buffer")
         self.tcp_fsm(syscall="CLOSE")
 
-    def __pick_random_local_port(self):
-        """ Pick random local port, making sure it is not already being used by any session bound to the same local IP """
+    def __local_port_in_use(self, port):
+        """ Check if port picked by allocator is already used by session explicitly bound to it, eg. listener """
 
-        used_ports = {int(_.split("/")[2]) for _ in stack.tcp_sessions if _.split("/")[1] in {"*", self.local_ip_address}}
-        while (port := random.randint(*config.TCP_EPHEMERAL_PORT_RANGE)) not in used_ports:
-            return port
+        return stack.tcp_sessions.local_port_in_use(self.local_ip_address, port)
 
     def __change_state(self, state):
         """ Change the state of TCP finite state machine """
@@ -245,13 +247,15 @@ class TcpSession:
 
         # Register session
         if self.state in {"SYN_SENT", "LISTEN"}:
-            stack.tcp_sessions[self.tcp_session_id] = self
+            stack.tcp_sessions.register(self)
             self.logger.debug(f"{self.tcp_session_id} - Registered TCP session")
 
         # Unregister session
         if self.state in {"CLOSED"}:
-            stack.tcp_sessions.pop(self.tcp_session_id)
+            stack.tcp_sessions.unregister(self)
             self.logger.debug(f"{self.tcp_session_id} - Unregistered TCP session")
+            if self.local_port_ephemeral:
+                stack.tcp_ephemeral_ports.release(self.local_ip_address, self.local_port)
 
     def __transmit_packet(self, seq=None, flag_syn=False, flag_ack=False, flag_fin=False, flag_rst=False, raw_data=b""):
         """ Send out TCP packet """
@@ -481,14 +485,11 @@ class TcpSession:
                 )
                 tcp_session.listen()
                 # Adjust this session to match incoming connection
-                stack.tcp_sessions.pop(self.tcp_session_id)
                 self.local_ip_address = packet.local_ip_address
                 self.local_port = packet.local_port
                 self.remote_ip_address = packet.remote_ip_address
                 self.remote_port = packet.remote_port
-                stack.tcp_sessions[self.tcp_session_id] = self
-                # Register the new listening session
-                stack.tcp_sessions[tcp_session.tcp_session_id] = tcp_session
+                stack.tcp_sessions.register(self)
                 # Initialize session parameters
                 self.remote_mss = min(packet.mss, config.mtu - 40)
                 self.remote_win = packet.win * self.remote_wscale  # For SYN / SYN + ACK packets this is initialized with wscale=1
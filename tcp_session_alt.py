@@ -48,11 +48,18 @@ import loguru
 
 import config
 import stack
+from ps_ip4 import IP4_HEADER_LEN
+from ps_ip6 import IP6_HEADER_LEN
+from ps_tcp import TCP_HEADER_LEN
+from ps_vnet_hdr import VNET_HDR_GSO_MAX_DATA
+from tcp_buffer import TcpBuffer
 
 PACKET_RETRANSMIT_TIMEOUT = 1000  # Retransmit data if ACK not received
 PACKET_RETRANSMIT_MAX_COUNT = 3  # If data is not acked, retransit it 5 times
 DELAYED_ACK_DELAY = 100  # Delay between consecutive delayed ACK outbound packets
 TIME_WAIT_DELAY = 30000  # 30s delay for the TIME_WAIT state, default is 30-120s
+PERSIST_TIMEOUT = 1000  # Initial delay before probing peer's zero window
+PERSIST_TIMEOUT_MAX = 60000  # Maximum delay between consecutive zero window probes
 
 
 def trace_fsm(function):
@@ -98,20 +105,21 @@ class TcpSession:
         self.logger = loguru.logger.bind(object_name="tcp_session.")
 
         self.local_ip_address = local_ip_address
-        self.local_port = local_port if local_port else self.__pick_random_local_port()
+        self.local_port_ephemeral = not local_port  # Ephemeral port needs to be returned to allocator once session is closed
+        self.local_port = local_port if local_port else stack.tcp_ephemeral_ports.allocate(local_ip_address, self.__local_port_in_use)
         self.remote_ip_address = remote_ip_address
         self.remote_port = remote_port
 
         self.socket = socket  # Keeps track of the socket that owns this session for the session -> socket communication purposes
 
-        self.rx_buffer = []  # Keeps data received from peer and not received by application yet
-        self.tx_buffer = []  # Keeps data sent by application but not acknowledged by peer yet
+        self.rx_buffer = TcpBuffer()  # Keeps data received from peer and not received by application yet
+        self.tx_buffer = TcpBuffer()  # Keeps data sent by application but not acknowledged by peer yet
 
         # Receiving window parameters
         self.rcv_ini = None  # Initial seq number
         self.rcv_nxt = None  # Next seq to be received
         self.rcv_una = None  # Seq we acked
-        self.rcv_mss = config.mtu - 40  # Maximum segment size
+        self.rcv_mss = None  # Maximum segment size, derived from local MTU once IP version of session is known
         self.rcv_wnd = 65535  # Window size
         self.rcv_wsc = 1  # Window scale
 
@@ -127,7 +135,8 @@ class TcpSession:
         self.snd_wsc = 1  # Window scale, this is always initialized as 1 because initial SYN / SYN + ACK packets don't use wscale for backward compatibility
 
         self.tx_retransmit_request_counter = {}  # Keeps track of DUP packets sent from peer to determine if any of them is a retransmit request
-        self.tx_retransmit_timeout_counter = {}  # Keeps track of the timestamps for the sent out packets, used to determine when to retransmit packet
+        self.tx_retransmit_timeout_counter = {}  # Keeps track of the number of times each of the sent out packets has been retransmitted
+        self.tx_retransmit_timer = {}  # Keeps retransmit timers of the sent out packets, used to determine when to retransmit packet
         self.rx_retransmit_request_counter = {}  # Keeps track of us sending 'fast retransmit request' packets so we can limit their count to 2
 
         self.tx_buffer_seq_mod = self.snd_ini  # Used to help translate local_seq_send and snd_una numbers to TX buffer pointers
@@ -145,8 +154,11 @@ class TcpSession:
 
         self.ooo_packet_queue = {}  # Out of order packet buffer
 
-        # Setup timer to execute FSM time event every milisecond
-        stack.timer.register_method(method=self.tcp_fsm, kwargs={"timer": True})
+        # FSM is event driven, timers are armed only when there is a deadline to meet and each of them runs FSM time event once it expires
+        self.timer_delayed_ack = None  # Armed when there is received data we didn't acknowledge yet
+        self.timer_time_wait = None  # Armed when entering TIME_WAIT state
+        self.timer_persist = None  # Armed when peer advertised zero window and we have data waiting to be sent
+        self.persist_backoff = 0  # Number of zero window probes sent since the window closed
 
     def __str__(self):
         """ String representation """
@@ -181,6 +193,9 @@ class TcpSession:
         """ CONNECT syscall """
 
         self.logger.debug(f"{self.tcp_session_id} - State {self.state} - got CONNECT syscall")
+        if self.local_port is None:
+            self.logger.warning(f"{self.tcp_session_id} - Unable to connect, no free ephemeral ports left")
+            return False
         self.tcp_fsm(syscall="CONNECT")
         self.event_connect.acquire()
         return self.state == "ESTABLISHED"
@@ -190,8 +205,11 @@ class TcpSession:
 
         if self.state in {"ESTABLISHED", "CLOSE_WAIT"}:
             with self.lock_tx_buffer:
-                self.tx_buffer.extend(list(raw_data))
-                return len(raw_data) if self.state == "ESTABLISHED" else -1
+                self.tx_buffer.append(raw_data)
+                bytes_sent = len(raw_data) if self.state == "ESTABLISHED" else -1
+            # Let FSM transmit the data right away if sending window allows it
+            self.tcp_fsm(syscall="SEND")
+            return bytes_sent
         return None
 
     def receive(self, byte_count=None):
@@ -205,19 +223,13 @@ class TcpSession:
             return None
 
         with self.lock_rx_buffer:
-            if byte_count is None:
-                byte_count = len(self.rx_buffer)
-            else:
-                byte_count = min(byte_count, len(self.rx_buffer))
-
-            rx_buffer = self.rx_buffer[:byte_count]
-            del self.rx_buffer[:byte_count]
+            rx_buffer = self.rx_buffer.read(byte_count)
 
             # If there is any data left in buffer or the remote end closed connection then release the rx_buffer event
             if self.rx_buffer or self.state == "CLOSE_WAIT":
                 self.event_rx_buffer.release()
 
-        return bytes(rx_buffer)
+        return rx_buffer
 
     def close(self):
         """ CLOSE syscall """
@@ -225,12 +237,10 @@ class TcpSession:
         self.logger.debug(f"{self.tcp_session_id} - State {self.state} - got CLOSE syscall, {len(self.tx_buffer)} bytes in TX buffer")
         self.tcp_fsm(syscall="CLOSE")
 
-    def __pick_random_local_port(self):
-        """ Pick random local port, making sure it is not already being used by any session bound to the same local IP """
+    def __local_port_in_use(self, port):
+        """ Check if port picked by allocator is already used by session explicitly bound to it, eg. listener """
 
-        used_ports = {int(_.split("/")[2]) for _ in stack.tcp_sessions if _.split("/")[1] in {"*", self.local_ip_address}}
-        while (port := random.randint(*config.TCP_EPHEMERAL_PORT_RANGE)) not in used_ports:
-            return port
+        return stack.tcp_sessions.local_port_in_use(self.local_ip_address, port)
 
     def __change_state(self, state):
         """ Change the state of TCP finite state machine """
@@ -242,13 +252,40 @@ class TcpSession:
 
         # Register session
         if self.state in {"SYN_SENT", "LISTEN"}:
-            stack.tcp_sessions[self.tcp_session_id] = self
+            stack.tcp_sessions.register(self)
             self.logger.debug(f"{self.tcp_session_id} - Registered TCP session")
 
         # Unregister session
         if self.state in {"CLOSED"}:
-            stack.tcp_sessions.pop(self.tcp_session_id)
+            stack.tcp_sessions.unregister(self)
             self.logger.debug(f"{self.tcp_session_id} - Unregistered TCP session")
+            if self.local_port_ephemeral:
+                stack.tcp_ephemeral_ports.release(self.local_ip_address, self.local_port)
+            self.__cancel_timers()
+
+    def __header_len(self):
+        """ Length of IP and TCP headers that precede segment data """
+
+        return (IP6_HEADER_LEN if self.local_ip_address.version == 6 else IP4_HEADER_LEN) + TCP_HEADER_LEN
+
+    def __path_mss(self):
+        """ Segment size allowed by both peer's MSS and current path MTU towards peer """
+
+        return min(self.snd_mss, stack.packet_handler.path_mtu(self.remote_ip_address) - self.__header_len())
+
+    def __schedule_fsm_timer(self, delay):
+        """ Schedule FSM time event to be run after delay """
+
+        return stack.timer.schedule(delay, self.tcp_fsm, kwargs={"timer": True})
+
+    def __cancel_timers(self):
+        """ Cancel all the timers session armed so closed session doesn't leave any events in the timer """
+
+        for timer in [*self.tx_retransmit_timer.values(), self.timer_delayed_ack, self.timer_time_wait, self.timer_persist]:
+            if timer:
+                timer.cancel()
+        self.tx_retransmit_timer.clear()
+        self.timer_delayed_ack = self.timer_time_wait = self.timer_persist = None
 
     def __transmit_packet(self, seq=None, flag_syn=False, flag_ack=False, flag_fin=False, flag_rst=False, raw_data=b""):
         """ Send out TCP packet """
@@ -256,6 +293,9 @@ class TcpSession:
         seq = seq if seq else self.snd_nxt
         ack = self.rcv_nxt if flag_ack else 0
 
+        if flag_syn:
+            self.rcv_mss = config.mtu - self.__header_len()
+
         stack.packet_handler.phtx_tcp(
             ip_src=self.local_ip_address,
             ip_dst=self.remote_ip_address,
@@ -270,6 +310,7 @@ class TcpSession:
             tcp_win=self.rcv_wnd,
             tcp_mss=self.rcv_mss if flag_syn else None,
             raw_data=raw_data,
+            tcp_gso_size=path_mss if len(raw_data) > (path_mss := self.__path_mss()) else None,
         )
         self.rcv_una = self.rcv_nxt
         self.snd_nxt = seq + len(raw_data) + flag_syn + flag_fin
@@ -280,16 +321,17 @@ class TcpSession:
         if flag_fin:
             self.snd_fin = self.snd_nxt
 
-        # If in ESTABLISHED state then reset ACK delay timer
-        if self.state == "ESTABLISHED":
-            stack.timer.register_timer(self.tcp_session_id + "-delayed_ack", DELAYED_ACK_DELAY)
+        # Packet carried ACK for all the data we received so far, no need to keep delayed ACK timer running
+        if self.timer_delayed_ack:
+            self.timer_delayed_ack.cancel()
+            self.timer_delayed_ack = None
 
         # If packet contains data then Initialize / adjust packet's retransmit counter and timer
         if raw_data or flag_syn or flag_fin:
             self.tx_retransmit_timeout_counter[seq] = self.tx_retransmit_timeout_counter.get(seq, -1) + 1
-            stack.timer.register_timer(
-                self.tcp_session_id + "-retransmit_seq-" + str(seq), PACKET_RETRANSMIT_TIMEOUT * (1 << self.tx_retransmit_timeout_counter[seq])
-            )
+            if timer := self.tx_retransmit_timer.get(seq, None):
+                timer.cancel()
+            self.tx_retransmit_timer[seq] = self.__schedule_fsm_timer(PACKET_RETRANSMIT_TIMEOUT * (1 << self.tx_retransmit_timeout_counter[seq]))
 
         self.logger.debug(
             f"{self.tcp_session_id} - Sent packet: {'S' if flag_syn else ''}{'F' if flag_fin else ''}{'R' if flag_rst else ''}"
@@ -300,7 +342,7 @@ class TcpSession:
         """ Process the incoming segment and enqueue the data to be used by socket """
 
         with self.lock_rx_buffer:
-            self.rx_buffer.extend(list(raw_data))
+            self.rx_buffer.append(raw_data)
             # If rx_buffer event has not been realeased yet (it could be released if some data were siting in buffer already) then release it
             if not self.event_rx_buffer._value:
                 self.event_rx_buffer.release()
@@ -322,23 +364,31 @@ class TcpSession:
             self.__transmit_packet(flag_syn=True, flag_ack=True)
             return
 
-        # Make sure we in the state that allows sending data out
+        # Make sure we in the state that allows sending data out, then send out as many segments as the sliding window allows
         if self.state in {"ESTABLISHED", "CLOSE_WAIT"}:
-            remaining_data_len = len(self.tx_buffer) - self.tx_buffer_nxt
-            usable_window = self.snd_ewn - self.tx_buffer_nxt
-            transmit_data_len = min(self.snd_mss, usable_window, remaining_data_len)
-            if remaining_data_len:
+            # With TSO segment can be super-segment of up to 64KB that kernel is going to cut into MSS sized ones
+            segment_len = VNET_HDR_GSO_MAX_DATA if config.vnet_hdr and config.vnet_hdr_tso else self.__path_mss()
+            burst_count = 0
+            while remaining_data_len := len(self.tx_buffer) - self.tx_buffer_nxt:
+                usable_window = self.snd_ewn - self.tx_buffer_nxt
+                transmit_data_len = min(segment_len, usable_window, remaining_data_len)
                 self.logger.opt(ansi=True).debug(
                     f"{self.tcp_session_id} - Sliding window <yellow>[{self.snd_una}|{self.snd_nxt}|{self.snd_una + self.snd_ewn}]</>"
                 )
                 self.logger.opt(ansi=True).debug(
                     f"{self.tcp_session_id} - {usable_window} left in window, {remaining_data_len} left in buffer, {transmit_data_len} to be sent"
                 )
-                if transmit_data_len:
-                    with self.lock_tx_buffer:
-                        transmit_data = self.tx_buffer[self.tx_buffer_nxt : self.tx_buffer_nxt + transmit_data_len]
-                    self.logger.debug(f"{self.tcp_session_id} - Transmitting data segment: seq {self.snd_nxt} len {len(transmit_data)}")
-                    self.__transmit_packet(flag_ack=True, raw_data=bytes(transmit_data))
+                if transmit_data_len <= 0:
+                    break
+                if config.tcp_tx_burst_limit and burst_count == config.tcp_tx_burst_limit:
+                    self.logger.debug(f"{self.tcp_session_id} - Reached limit of {burst_count} segments per burst")
+                    break
+                with self.lock_tx_buffer:
+                    transmit_data = self.tx_buffer.peek(self.tx_buffer_nxt, transmit_data_len)
+                self.logger.debug(f"{self.tcp_session_id} - Transmitting data segment: seq {self.snd_nxt} len {len(transmit_data)}")
+                self.__transmit_packet(flag_ack=True, raw_data=transmit_data)
+                burst_count += 1
+            if len(self.tx_buffer) - self.tx_buffer_nxt or burst_count:
                 return
 
         # Check if we need to (re)transmit final FIN packet
@@ -350,16 +400,56 @@ class TcpSession:
     def __delayed_ack(self):
         """ Run Delayed ACK mechanism """
 
-        if stack.timer.timer_expired(self.tcp_session_id + "-delayed_ack"):
-            if self.rcv_nxt > self.rcv_una:
-                self.__transmit_packet(flag_ack=True)
-                self.logger.debug(f"{self.tcp_session_id} - Sent out delayed ACK ({self.rcv_nxt})")
-            stack.timer.register_timer(self.tcp_session_id + "-delayed_ack", DELAYED_ACK_DELAY)
+        # Nothing to acknowledge
+        if self.rcv_nxt is None or self.rcv_nxt <= self.rcv_una:
+            return
+
+        # Got data that needs to be acknowledged -> Arm delayed ACK timer
+        if self.timer_delayed_ack is None:
+            self.timer_delayed_ack = self.__schedule_fsm_timer(DELAYED_ACK_DELAY)
+            return
+
+        # Delayed ACK timer expired and no other packet carried the ACK in the meantime -> Send out ACK packet
+        if not self.timer_delayed_ack.active:
+            self.__transmit_packet(flag_ack=True)
+            self.logger.debug(f"{self.tcp_session_id} - Sent out delayed ACK ({self.rcv_nxt})")
+
+    def __zero_window_probe(self):
+        """ Run persist timer mechanism, probe peer's zero window so session doesn't stall if peer's window update gets lost """
+
+        # Window is open, there is data in flight (covered by retransmit timer) or there is no data to send -> Disarm persist timer
+        if self.snd_wnd or self.snd_nxt != self.snd_una or len(self.tx_buffer) == self.tx_buffer_nxt:
+            if self.timer_persist:
+                self.timer_persist.cancel()
+                self.timer_persist = None
+            self.persist_backoff = 0
+            return
+
+        # Peer's window just closed -> Arm persist timer
+        if self.timer_persist is None:
+            self.timer_persist = self.__schedule_fsm_timer(PERSIST_TIMEOUT)
+            return
+
+        # Persist timer expired -> Send out segment with already acknowledged SEQ, peer responds to it with ACK carrying its current window
+        if not self.timer_persist.active:
+            stack.packet_handler.phtx_tcp(
+                ip_src=self.local_ip_address,
+                ip_dst=self.remote_ip_address,
+                tcp_sport=self.local_port,
+                tcp_dport=self.remote_port,
+                tcp_seq=self.snd_una - 1,
+                tcp_ack=self.rcv_nxt,
+                tcp_flag_ack=True,
+                tcp_win=self.rcv_wnd,
+            )
+            self.persist_backoff += 1
+            self.timer_persist = self.__schedule_fsm_timer(min(PERSIST_TIMEOUT << self.persist_backoff, PERSIST_TIMEOUT_MAX))
+            self.logger.debug(f"{self.tcp_session_id} - Sent out zero window probe, seq {self.snd_una - 1}")
 
     def __retransmit_packet_timeout(self):
         """ Retransmit packet after expired timeout """
 
-        if self.snd_una in self.tx_retransmit_timeout_counter and stack.timer.timer_expired(self.tcp_session_id + "-retransmit_seq-" + str(self.snd_una)):
+        if self.snd_una in self.tx_retransmit_timeout_counter and not self.tx_retransmit_timer[self.snd_una].active:
             if self.tx_retransmit_timeout_counter[self.snd_una] == PACKET_RETRANSMIT_MAX_COUNT:
                 # Send RST packet if we received any packet from peer already
                 if self.rcv_nxt is not None:
@@ -395,6 +485,9 @@ class TcpSession:
     def __process_ack_packet(self, packet):
         """ Process regular data/ACK packet """
 
+        # Peer acknowledging new data confirms that the neighbor on the path to it is reachable (RFC 4861, section 7.3.1)
+        if packet.ack > self.snd_una and self.remote_ip_address.version == 6:
+            stack.packet_handler.icmp6_nd_cache.confirm_reachability(self.remote_ip_address)
         # Make note of the local SEQ that has been acked by peer
         self.snd_una = max(self.snd_una, packet.ack)
         # Adjust local SEQ accordingly to what peer acked (needed after the retransmit happens and peer is jumping to previously received SEQ)
@@ -408,15 +501,15 @@ class TcpSession:
             self.logger.debug(f"{self.tcp_session_id} - Enqueued {len(packet.raw_data)} bytes starting at {packet.seq}")
         # Purge acked data from TX buffer
         with self.lock_tx_buffer:
-            del self.tx_buffer[: self.tx_buffer_una]
+            self.tx_buffer.consume(self.tx_buffer_una)
         self.tx_buffer_seq_mod += self.tx_buffer_una
         self.logger.debug(f"{self.tcp_session_id} - Purged TX buffer up to SEQ {self.snd_una}")
         # Update remote window size
         if self.snd_wnd != packet.win * self.snd_wsc:
             self.logger.debug(f"{self.tcp_session_id} - Updated sending window size {self.snd_wnd} -> {packet.win * self.snd_wsc}")
             self.snd_wnd = packet.win * self.snd_wsc
-        # Enlarge effective sending window
-        self.snd_ewn = min(self.snd_ewn << 1, self.snd_wnd)
+        # Enlarge effective sending window, make sure it can recover after peer's window has been closed
+        self.snd_ewn = min(max(self.snd_ewn << 1, self.snd_mss), self.snd_wnd)
         self.logger.debug(f"{self.tcp_session_id} - Updated effective sending window to {self.snd_ewn}")
         # Purge expired tx packet retransmit requests
         for seq in list(self.tx_retransmit_request_counter):
@@ -427,6 +520,7 @@ class TcpSession:
         for seq in list(self.tx_retransmit_timeout_counter):
             if seq < packet.ack:
                 self.tx_retransmit_timeout_counter.pop(seq)
+                self.tx_retransmit_timer.pop(seq).cancel()
                 self.logger.debug(f"{self.tcp_session_id} - Purged expired TX packet retransmit timeout for {seq}")
         # Purge expired rx retransmit requests
         for seq in list(self.rx_retransmit_request_counter):
@@ -456,7 +550,7 @@ class TcpSession:
         if packet and all({packet.flag_syn}) and not any({packet.flag_ack, packet.flag_fin, packet.flag_rst}):
             # Packet sanity check
             if packet.ack == 0 and not packet.raw_data:
-                # Create new session in LISTEN state
+                # Create new session in LISTEN state, it takes over the listener index entry from this session
                 tcp_session = TcpSession(
                     local_ip_address=self.local_ip_address,
                     local_port=self.local_port,
@@ -466,16 +560,13 @@ class TcpSession:
                 )
                 tcp_session.listen()
                 # Adjust this session to match incoming connection
-                stack.tcp_sessions.pop(self.tcp_session_id)
                 self.local_ip_address = packet.local_ip_address
                 self.local_port = packet.local_port
                 self.remote_ip_address = packet.remote_ip_address
                 self.remote_port = packet.remote_port
-                stack.tcp_sessions[self.tcp_session_id] = self
-                # Register the new listening session
-                stack.tcp_sessions[tcp_session.tcp_session_id] = tcp_session
+                stack.tcp_sessions.register(self)
                 # Initialize session parameters
-                self.snd_mss = min(packet.mss, config.mtu - 40)
+                self.snd_mss = min(packet.mss, config.mtu - self.__header_len())
                 self.snd_wnd = packet.win * self.snd_wsc  # For SYN / SYN + ACK packets this is initialized with wscale=1
                 self.snd_wsc = packet.wscale if packet.wscale else 1  # Peer's wscale set to None means that peer desn't support window scaling
                 self.logger.debug(f"{self.tcp_session_id} - Initialized remote window scale at {self.snd_wsc}")
@@ -506,7 +597,7 @@ class TcpSession:
             # Packet sanity check
             if packet.ack == self.snd_nxt and not packet.raw_data:
                 # Initialize session parameters
-                self.snd_mss = min(packet.mss, config.mtu - 40)
+                self.snd_mss = min(packet.mss, config.mtu - self.__header_len())
                 self.snd_wnd = packet.win * self.snd_wsc  # For SYN / SYN + ACK packets this is initialized with wscale=1
                 self.snd_wsc = packet.wscale if packet.wscale else 1  # Peer's wscale set to None means that peer desn't support window scaling
                 self.logger.debug(f"{self.tcp_session_id} - Initialized remote window scale at {self.snd_wsc}")
@@ -599,6 +690,7 @@ class TcpSession:
             self.__retransmit_packet_timeout()
             self.__transmit_data()
             self.__delayed_ack()
+            self.__zero_window_probe()
             if self.closing and not self.tx_buffer:
                 self.__change_state("FIN_WAIT_1")
             return
@@ -692,7 +784,7 @@ class TcpSession:
                     # Change state to TIME_WAIT
                     self.__change_state("TIME_WAIT")
                     # Initialize TIME_WAIT delay
-                    stack.timer.register_timer(self.tcp_session_id + "-time_wait", TIME_WAIT_DELAY)
+                    self.timer_time_wait = self.__schedule_fsm_timer(TIME_WAIT_DELAY)
                 else:
                     # Change state to CLOSING
                     self.__change_state("CLOSING")
@@ -730,7 +822,7 @@ class TcpSession:
                 # Change state to TIME_WAIT
                 self.__change_state("TIME_WAIT")
                 # Initialize TIME_WAIT delay
-                stack.timer.register_timer(self.tcp_session_id + "-time_wait", TIME_WAIT_DELAY)
+                self.timer_time_wait = self.__schedule_fsm_timer(TIME_WAIT_DELAY)
                 return
 
         # Got RST + ACK packet -> Change state to CLOSED
@@ -751,7 +843,7 @@ class TcpSession:
                 self.snd_una = packet.ack
                 self.__change_state("TIME_WAIT")
                 # Initialize TIME_WAIT delay
-                stack.timer.register_timer(self.tcp_session_id + "-time_wait", TIME_WAIT_DELAY)
+                self.timer_time_wait = self.__schedule_fsm_timer(TIME_WAIT_DELAY)
                 return
 
         # Got RST + ACK packet -> Change state to CLOSED
@@ -770,6 +862,7 @@ class TcpSession:
             self.__retransmit_packet_timeout()
             self.__transmit_data()
             self.__delayed_ack()
+            self.__zero_window_probe()
             if self.closing and not self.tx_buffer:
                 self.__change_state("LAST_ACK")
             return
@@ -834,25 +927,38 @@ class TcpSession:
         """ TCP FSM TIME_WAIT state handler """
 
         # Got timer event -> Run TIME_WAIT delay
-        if timer and stack.timer.timer_expired(self.tcp_session_id + "-time_wait"):
+        if timer and self.timer_time_wait and not self.timer_time_wait.active:
             self.__change_state("CLOSED")
             return
 
     def tcp_fsm(self, packet=None, syscall=None, timer=False):
         """ Run TCP finite state machine """
 
-        # Process event
+        fsm = {
+            "CLOSED": self.__tcp_fsm_closed,
+            "LISTEN": self.__tcp_fsm_listen,
+            "SYN_SENT": self.__tcp_fsm_syn_sent,
+            "SYN_RCVD": self.__tcp_fsm_syn_rcvd,
+            "ESTABLISHED": self.__tcp_fsm_established,
+            "FIN_WAIT_1": self.__tcp_fsm_fin_wait_1,
+            "FIN_WAIT_2": self.__tcp_fsm_fin_wait_2,
+            "CLOSING": self.__tcp_fsm_closing,
+            "CLOSE_WAIT": self.__tcp_fsm_close_wait,
+            "LAST_ACK": self.__tcp_fsm_last_ack,
+            "TIME_WAIT": self.__tcp_fsm_time_wait,
+        }
+
         with self.lock_fsm:
-            return {
-                "CLOSED": self.__tcp_fsm_closed,
-                "LISTEN": self.__tcp_fsm_listen,
-                "SYN_SENT": self.__tcp_fsm_syn_sent,
-                "SYN_RCVD": self.__tcp_fsm_syn_rcvd,
-                "ESTABLISHED": self.__tcp_fsm_established,
-                "FIN_WAIT_1": self.__tcp_fsm_fin_wait_1,
-                "FIN_WAIT_2": self.__tcp_fsm_fin_wait_2,
-                "CLOSING": self.__tcp_fsm_closing,
-                "CLOSE_WAIT": self.__tcp_fsm_close_wait,
-                "LAST_ACK": self.__tcp_fsm_last_ack,
-                "TIME_WAIT": self.__tcp_fsm_time_wait,
-            }[self.state](packet, syscall, timer)
+            # Process event
+            event_state = self.state
+            retval = fsm[self.state](packet, syscall, timer)
+
+            # There is no periodic FSM tick, so run time event right after each event to let the current state send out whatever the event made
+            # possible and arm timers it needs, repeat it if state changed so the new state gets chance to act immediately as well, time event
+            # itself already was such pass for the state it ran in
+            state = event_state if timer else None
+            while state != self.state:
+                state = self.state
+                fsm[self.state](None, None, True)
+
+            return retval
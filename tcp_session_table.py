@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+############################################################################
+#                                                                          #
+#  PyTCP - Python TCP/IP stack                                             #
+#  Copyright (C) 2020  Sebastian Majewski                                  #
+#                                                                          #
+#  This program is free software: you can redistribute it and/or modify    #
+#  it under the terms of the GNU General Public License as published by    #
+#  the Free Software Foundation, either version 3 of the License, or       #
+#  (at your option) any later version.                                     #
+#                                                                          #
+#  This program is distributed in the hope that it will be useful,         #
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of          #
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the           #
+#  GNU General Public License for more details.                            #
+#                                                                          #
+#  You should have received a copy of the GNU General Public License       #
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.  #
+#                                                                          #
+#  Author's email: ccie18643@gmail.com                                     #
+#  Github repository: https://github.com/ccie18643/PyTCP                   #
+#                                                                          #
+############################################################################
+
+##############################################################################################
+#                                                                                            #
+#  This program is a work in progress and it changes on daily basis due to new features      #
+#  being implemented, changes being made to already implemented features, bug fixes, etc.    #
+#  Therefore if the current version is not working as expected try to clone it again the     #
+#  next day or shoot me an email describing the problem. Any input is appreciated. Also      #
+#  keep in mind that some features may be implemented only partially (as needed for stack    #
+#  operation) or they may be implemented in sub-optimal or not 100% RFC compliant way (due   #
+#  to lack of time) or last but not least they may contain bug(s) that i didn't notice yet.  #
+#                                                                                            #
+##############################################################################################
+
+
+#
+# tcp_session_table.py - module contains class supporting TCP session lookup table
+#
+
+
+import threading
+from collections import Counter
+
+from ip_helper import IP4_MAPPED, ip_key
+
+
+class TcpSessionTable:
+    """ Support for TCP session lookup, connected sessions are keyed by (local_ip, local_port, remote_ip, remote_port) and listening ones by (local_ip, local_port) """
+
+    def __init__(self):
+        """ Class constructor """
+
+        self.lock = threading.RLock()
+        self.connections = {}
+        self.listeners = {}
+
+        # Number of registered sessions using given (local_ip, local_port) pair, lets port allocator skip ports taken by explicit binds
+        self.local_ports = Counter()
+
+    def __iter__(self):
+        """ Iterate over snapshot of all the registered sessions """
+
+        with self.lock:
+            return iter([*self.listeners.values(), *self.connections.values()])
+
+    def __len__(self):
+        """ Number of registered sessions """
+
+        return len(self.listeners) + len(self.connections)
+
+    @staticmethod
+    def __key(tcp_session):
+        """ Build lookup key for given session """
+
+        if tcp_session.remote_port == "*":
+            return ip_key(tcp_session.local_ip_address), tcp_session.local_port
+
+        return ip_key(tcp_session.local_ip_address), tcp_session.local_port, ip_key(tcp_session.remote_ip_address), tcp_session.remote_port
+
+    def register(self, tcp_session):
+        """ Add session to the table """
+
+        key = self.__key(tcp_session)
+
+        with self.lock:
+            table = self.listeners if len(key) == 2 else self.connections
+            if key not in table:
+                self.local_ports[key[:2]] += 1
+            table[key] = tcp_session
+
+    def unregister(self, tcp_session):
+        """ Remove session from the table, session is removed only if it is the one registered under its key """
+
+        key = self.__key(tcp_session)
+        table = self.listeners if len(key) == 2 else self.connections
+
+        with self.lock:
+            if table.get(key, None) is tcp_session:
+                del table[key]
+                if (count := self.local_ports[key[:2]] - 1) > 0:
+                    self.local_ports[key[:2]] = count
+                else:
+                    del self.local_ports[key[:2]]
+
+    def local_port_in_use(self, local_ip_address, local_port):
+        """ Check if any session bound to given local address, to unspecified address of the same IP version or to wildcard address uses given port """
+
+        local_ip_key = ip_key(local_ip_address)
+        unspecified_key = None if local_ip_key is None else IP4_MAPPED if local_ip_key >> 32 == 0xFFFF else 0
+
+        return any((_, local_port) in self.local_ports for _ in (local_ip_key, unspecified_key, None))
+    def find_connection(self, local_ip_address, local_port, remote_ip_address, remote_port):
+        """ Find session matching inbound packet """
+
+        with self.lock:
+            return self.connections.get((ip_key(local_ip_address), local_port, ip_key(remote_ip_address), remote_port), None)
+
+    def find_listener(self, local_ip_address, local_port):
+        """ Find listening session matching inbound packet, specific address takes precedence over unspecified address and wildcard """
+
+        local_ip_key = ip_key(local_ip_address)
+
+        with self.lock:
+            for key in ((local_ip_key, local_port), (IP4_MAPPED if local_ip_key >> 32 == 0xFFFF else 0, local_port), (None, local_port)):
+                if tcp_session := self.listeners.get(key, None):
+                    return tcp_session
+
+        return None
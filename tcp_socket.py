@@ -124,7 +124,7 @@ class TcpSocket:
 
         self.logger.debug(f"{self.socket_id} - Waiting for established inbound connection")
         self.event_tcp_session_established.acquire()
-        for tcp_session in stack.tcp_sessions.values():
+        for tcp_session in stack.tcp_sessions:
             if tcp_session.socket is self and tcp_session.state == "ESTABLISHED":
                 return TcpSocket(tcp_session=tcp_session)
         return None
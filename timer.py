@@ -48,9 +48,46 @@ import loguru
 
 import stack
 
+# Timer resolution is one milisecond, wheel levels are sized after the classic cascading timer wheel design (256 slots at the
+# lowest level and 64 slots at each of the higher ones), all together they cover 2^32 ms (about 49 days) of delay
+TIMER_WHEEL_BITS = (8, 6, 6, 6, 6)
+
+
+def timer_tick():
+    """ Current monotonic time expressed in timer ticks (miliseconds) """
+
+    return time.monotonic_ns() // 1_000_000
+
+
+class TimerHandle:
+    """ Cancellable reference to single event scheduled in the timer wheel """
+
+    __slots__ = ("method", "args", "kwargs", "expires", "slot", "cancelled")
+
+    def __init__(self, method, args, kwargs, expires):
+        """ Class constructor """
+
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.expires = expires
+        self.slot = None  # Wheel slot handle is currently stored in
+        self.cancelled = False
+
+    def cancel(self):
+        """ Cancel event, safe to be called multiple times and after the event fired already """
+
+        stack.timer.cancel(self)
+
+    @property
+    def active(self):
+        """ Check if event is still pending """
+
+        return self.slot is not None
+
 
 class TimerTask:
-    """ Timer task support class """
+    """ Timer task support class, provides repeated method execution on top of the timer wheel """
 
     def __init__(self, method, args, kwargs, delay, delay_exp, repeat_count, stop_condition):
         """ Class constructor, repeat_count = -1 means infinite, delay_exp means to raise delay time exponentialy after each method execution """
@@ -63,32 +100,42 @@ class TimerTask:
         self.repeat_count = repeat_count
         self.stop_condition = stop_condition
 
-        self.remaining_delay = delay
         self.delay_exp_factor = 0
+        self.handle = stack.timer.schedule(delay, self.fire)
 
-    def tick(self):
-        """ Tick input from timer """
+    def fire(self):
+        """ Execute method and schedule its next execution if needed """
 
-        self.remaining_delay -= 1
+        self.handle = None
 
         if self.stop_condition and self.stop_condition():
-            self.remaining_delay = 0
-            return
-
-        if self.remaining_delay:
             return
 
         self.method(*self.args, **self.kwargs)
 
         if self.repeat_count:
-            self.remaining_delay = self.delay * (1 << self.delay_exp_factor) if self.delay_exp else self.delay
+            self.handle = stack.timer.schedule(self.delay * (1 << self.delay_exp_factor) if self.delay_exp else self.delay, self.fire)
             self.delay_exp_factor += 1
             if self.repeat_count > 0:
                 self.repeat_count -= 1
 
+    def cancel(self):
+        """ Stop any further method executions """
+
+        self.repeat_count = 0
+        if self.handle:
+            self.handle.cancel()
+            self.handle = None
+
+    @property
+    def remaining_delay(self):
+        """ Number of ticks left till next method execution, zero means task is not active anymore """
+
+        return max(self.handle.expires - timer_tick(), 1) if self.handle else 0
+
 
 class Timer:
-    """ Support for stack timer """
+    """ Support for stack timer, implemented as hierarchical timing wheel with O(1) insert and cancel operations """
 
     def __init__(self):
         """ Class constructor """
@@ -99,45 +146,145 @@ class Timer:
 
         self.run_timer = True
 
-        self.tasks = []
+        self.lock = threading.RLock()
+        self.event_schedule = threading.Condition(self.lock)
+
+        self.wheel = [[set() for _ in range(1 << _)] for _ in TIMER_WHEEL_BITS]
+        self.wheel_shift = [sum(TIMER_WHEEL_BITS[:_]) for _ in range(len(TIMER_WHEEL_BITS))]
+        self.wheel_count = 0  # Number of events currently stored in the wheel
+        self.wheel_tick = timer_tick()  # Next tick to be processed
+
+        # Named timers kept for the register_timer / timer_expired interface
         self.timers = {}
 
         threading.Thread(target=self.__thread_timer).start()
         self.logger.debug("Started timer")
 
+    def __wheel_insert(self, handle):
+        """ Put handle into wheel slot matching its expiration tick, must be called with lock held """
+
+        delta = max(handle.expires - self.wheel_tick, 0)
+
+        for level, bits in enumerate(TIMER_WHEEL_BITS):
+            span = 1 << (self.wheel_shift[level] + bits)
+            if delta < span or level == len(TIMER_WHEEL_BITS) - 1:
+                expires = self.wheel_tick + min(delta, span - 1)
+                handle.slot = self.wheel[level][(expires >> self.wheel_shift[level]) & ((1 << bits) - 1)]
+                handle.slot.add(handle)
+                return
+
+    def __wheel_cascade(self, level):
+        """ Move all handles from current slot of given level into lower levels, return slot index """
+
+        index = (self.wheel_tick >> self.wheel_shift[level]) & ((1 << TIMER_WHEEL_BITS[level]) - 1)
+        slot = self.wheel[level][index]
+        self.wheel[level][index] = set()
+        for handle in slot:
+            self.__wheel_insert(handle)
+        return index
+
+    def __wheel_advance(self, tick):
+        """ Process all ticks up to the given one and return list of expired handles, must be called with lock held """
+
+        expired = []
+
+        while self.wheel_tick <= tick:
+            index = self.wheel_tick & ((1 << TIMER_WHEEL_BITS[0]) - 1)
+
+            # Cascade handles from higher levels when lowest level wraps around
+            if index == 0:
+                for level in range(1, len(TIMER_WHEEL_BITS)):
+                    if self.__wheel_cascade(level):
+                        break
+
+            if slot := self.wheel[0][index]:
+                self.wheel[0][index] = set()
+                for handle in slot:
+                    handle.slot = None
+                expired.extend(slot)
+                self.wheel_count -= len(slot)
+
+            self.wheel_tick += 1
+
+        return expired
+
+    def __wheel_next_tick(self):
+        """ Find the nearest tick that may need processing, it is either next non empty slot or next lowest level wrap around """
+
+        index = self.wheel_tick & ((1 << TIMER_WHEEL_BITS[0]) - 1)
+        for offset, slot in enumerate(self.wheel[0][index:]):
+            if slot:
+                return self.wheel_tick + offset
+        return self.wheel_tick + (1 << TIMER_WHEEL_BITS[0]) - index
+
     def __thread_timer(self):
-        """ Thread responsible for executing registered methods on every timer tick """
+        """ Thread responsible for executing expired timer events """
 
         while self.run_timer:
-            time.sleep(0.001)
+            with self.event_schedule:
+                # Do not wake up at all when there is nothing scheduled
+                while not self.wheel_count and self.run_timer:
+                    self.event_schedule.wait()
+                    self.wheel_tick = max(self.wheel_tick, timer_tick())
+
+                # Sleep till the nearest event, scheduling of new event wakes thread up so it can recalculate its sleep time
+                if (timeout := self.__wheel_next_tick() - timer_tick()) > 0:
+                    self.event_schedule.wait(timeout / 1000)
+
+                expired = self.__wheel_advance(timer_tick())
 
-            # Tck registered timers
-            for name in self.timers:
-                self.timers[name] -= 1
+            # Execute events outside of the lock so their methods are free to schedule or cancel other events
+            for handle in sorted(expired, key=lambda _: _.expires):
+                if not handle.cancelled:
+                    handle.method(*handle.args, **handle.kwargs)
 
-            # Cleanup expired timers
-            self.timers = {_: __ for _, __ in self.timers.items() if __}
+    def schedule(self, delay, method, args=None, kwargs=None):
+        """ Schedule method to be executed once after delay (in miliseconds), return handle that can be used to cancel it """
 
-            # Tick registered methods
-            for task in self.tasks:
-                task.tick()
+        handle = TimerHandle(method, [] if args is None else args, {} if kwargs is None else kwargs, timer_tick() + max(delay, 1))
 
-            # Cleanup expired methods
-            self.tasks = [_ for _ in self.tasks if _.remaining_delay]
+        with self.lock:
+            if not self.wheel_count:
+                self.wheel_tick = max(self.wheel_tick, timer_tick())
+            self.__wheel_insert(handle)
+            self.wheel_count += 1
+            self.event_schedule.notify()
+
+        return handle
+
+    def cancel(self, handle):
+        """ Cancel scheduled event """
+
+        with self.lock:
+            handle.cancelled = True
+            if handle.slot is not None:
+                handle.slot.discard(handle)
+                handle.slot = None
+                self.wheel_count -= 1
 
     def register_method(self, method, args=None, kwargs=None, delay=1, delay_exp=False, repeat_count=-1, stop_condition=None):
-        """ Register method to be executed by timer """
+        """ Register method to be executed by timer, return task object that can be used to cancel it """
 
-        self.tasks.append(TimerTask(method, [] if args is None else args, {} if kwargs is None else kwargs, delay, delay_exp, repeat_count, stop_condition))
+        return TimerTask(method, [] if args is None else args, {} if kwargs is None else kwargs, delay, delay_exp, repeat_count, stop_condition)
 
     def register_timer(self, name, timeout):
         """ Register delay timer """
 
-        self.timers[name] = timeout
+        with self.lock:
+            if handle := self.timers.get(name, None):
+                self.cancel(handle)
+            self.timers[name] = self.schedule(timeout, self.__expire_timer, args=[name])
+
+    def __expire_timer(self, name):
+        """ Remove expired timer, unless it has been re-registered in the meantime """
+
+        with self.lock:
+            if (handle := self.timers.get(name, None)) and not handle.active:
+                self.timers.pop(name)
 
     def timer_expired(self, name):
         """ Check if timer expired """
 
-        self.logger.opt(ansi=True).trace(f"<red>Active timers: {self.timers}</>")
+        self.logger.opt(ansi=True).trace(f"<red>Active timers: {list(self.timers)}</>")
 
-        return not self.timers.get(name, None)
+        return name not in self.timers
@@ -42,10 +42,15 @@
 
 
 import os
+import select
 import threading
 
 import loguru
 
+import config
+import ps_vnet_hdr
+from ring import Ring
+
 
 class TxRing:
     """ Support for sending packets to the network """
@@ -55,10 +60,20 @@ class TxRing:
 
         self.tap = tap
 
-        self.tx_ring = []
+        self.tx_ring = Ring(config.tx_ring_size, config.tx_ring_drop)
         self.logger = loguru.logger.bind(object_name="tx_ring.")
 
-        self.packet_enqueued = threading.Semaphore(0)
+        # In run to completion mode packets are written to non-blocking TAP interface directly by the thread that sends them, packets that
+        # TAP interface is not ready to take are requeued with TX ring and written out in order by backlog thread once interface becomes writable
+        if config.datapath == "run_to_completion":
+            self.lock = threading.Lock()
+            self.backlog = 0
+            self.requeued = 0
+            self.poll = select.poll()
+            self.poll.register(self.tap, select.POLLOUT)
+            threading.Thread(target=self.__thread_backlog).start()
+            self.logger.debug("Started TX ring in run to completion mode")
+            return
 
         threading.Thread(target=self.__thread_dequeue).start()
         self.logger.debug("Started TX ring")
@@ -68,15 +83,49 @@ class TxRing:
 
         while True:
             # Wait till packets is avaiable int he queue the pick it up
-            self.packet_enqueued.acquire()
-            ether_packet_tx = self.tx_ring.pop(0)
+            ether_packet_tx = self.tx_ring.dequeue()
             self.logger.opt(ansi=True).debug(f"{ether_packet_tx.tracker}")
             self.__transmit(ether_packet_tx)
 
+    def __thread_backlog(self):
+        """ Write out packets requeued in run to completion mode, waiting for TAP interface to become writable """
+
+        while True:
+            ether_packet_tx = self.tx_ring.dequeue()
+            while True:
+                self.poll.poll()
+                with self.lock:
+                    try:
+                        self.__transmit(ether_packet_tx)
+                    except BlockingIOError:
+                        continue
+                    self.backlog -= 1
+                    break
+
+    def __requeue(self, ether_packet_tx):
+        """ Requeue packet TAP interface is not ready to take, packets sent after it are queued behind it so order is preserved """
+
+        # Requeued packets are always tail dropped regardless of ring drop policy, evicting queued packet would leave 'backlog' counting packet
+        # that never gets written out, ring is filled only under the lock held here so it can't get full between the check and enqueue
+        if len(self.tx_ring) >= self.tx_ring.capacity:
+            self.tx_ring.dropped += 1
+            self.logger.warning(f"{ether_packet_tx.tracker}, TX ring full, dropped packet ({self.tx_ring})")
+            return
+
+        self.tx_ring.enqueue(ether_packet_tx)
+
+        self.backlog += 1
+        self.requeued += 1
+        self.logger.debug(f"{ether_packet_tx.tracker}, TAP interface not ready for write, requeued packet ({self.tx_ring}, requeued {self.requeued})")
+
     def __transmit(self, ether_packet_tx):
         """ Transmit packet """
 
-        os.write(self.tap, ether_packet_tx.get_raw_packet())
+        if config.vnet_hdr:
+            os.writev(self.tap, [ether_packet_tx.vnet_hdr.raw_header if ether_packet_tx.vnet_hdr else ps_vnet_hdr.VNET_HDR_NONE, ether_packet_tx.get_raw_packet()])
+        else:
+            os.write(self.tap, ether_packet_tx.get_raw_packet())
+
         self.logger.opt(ansi=True).debug(
             f"<magenta>[TX]</> {ether_packet_tx.tracker}<yellow>{ether_packet_tx.tracker.latency}</> - {len(ether_packet_tx)} bytes"
         )
@@ -84,12 +133,22 @@ class TxRing:
     def enqueue(self, ether_packet_tx, urgent=False):
         """ Enqueue outbound Ethernet packet to TX ring """
 
-        if urgent:
-            self.tx_ring.insert(0, ether_packet_tx)
-            self.logger.opt(ansi=True).debug(f"{ether_packet_tx.tracker}, priority: Urgent, queue len: {len(self.tx_ring)}")
-
-        else:
-            self.tx_ring.append(ether_packet_tx)
-            self.logger.opt(ansi=True).debug(f"{ether_packet_tx.tracker}, priorty: Normal, queue len: {len(self.tx_ring)}")
-
-        self.packet_enqueued.release()
+        if config.datapath == "run_to_completion":
+            with self.lock:
+                if self.backlog:
+                    self.__requeue(ether_packet_tx)
+                    return
+                try:
+                    self.__transmit(ether_packet_tx)
+                except BlockingIOError:
+                    self.__requeue(ether_packet_tx)
+                    return
+                self.tx_ring.enqueued += 1
+                self.tx_ring.dequeued += 1
+            return
+
+        if not self.tx_ring.enqueue(ether_packet_tx, urgent=urgent):
+            self.logger.warning(f"{ether_packet_tx.tracker}, TX ring full, dropped packet ({self.tx_ring})")
+            return
+
+        self.logger.opt(ansi=True).debug(f"{ether_packet_tx.tracker}, priority: {'Urgent' if urgent else 'Normal'}, queue len: {len(self.tx_ring)}")
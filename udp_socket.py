@@ -60,6 +60,7 @@ class UdpSocket:
 
         self.local_ip_address = None
         self.local_port = None
+        self.local_port_ephemeral = False
         self.remote_ip_address = "*"
         self.remote_port = "*"
 
@@ -71,13 +72,27 @@ class UdpSocket:
     def socket_id(self):
         return f"UDP/{self.local_ip_address}/{self.local_port}/{self.remote_ip_address}/{self.remote_port}"
 
-    def bind(self, local_ip_address, local_port):
-        """ Bind the socket to local address """
+    def bind(self, local_ip_address, local_port=None):
+        """ Bind the socket to local address, ephemeral port is picked if local port is not specified """
 
         self.local_ip_address = local_ip_address
-        self.local_port = local_port
+        self.local_port_ephemeral = not local_port  # Ephemeral port needs to be returned to allocator once socket is closed
+        self.local_port = local_port if local_port else stack.udp_ephemeral_ports.allocate(local_ip_address, self.__local_port_in_use)
+        if self.local_port is None:
+            self.logger.warning(f"{self.socket_id} - Unable to bind socket, no free ephemeral ports left")
+            return False
+        # Explicitly bound port may already be taken by another socket, ephemeral ports are never handed out while in use
+        if self.socket_id in stack.udp_sockets:
+            self.logger.warning(f"{self.socket_id} - Unable to bind socket, address already in use")
+            return False
         stack.udp_sockets[self.socket_id] = self
         self.logger.debug(f"{self.socket_id} - Socket bound to local address")
+        return True
+
+    def __local_port_in_use(self, port):
+        """ Check if port picked by allocator is already used by socket explicitly bound to it """
+
+        return any(f"UDP/{_}/{port}/*/*" in stack.udp_sockets for _ in (self.local_ip_address, "0.0.0.0", "::", "*"))
 
     @staticmethod
     def send_to(packet):
@@ -102,6 +117,8 @@ class UdpSocket:
         """ Close socket """
 
         stack.udp_sockets.pop(self.socket_id)
+        if self.local_port_ephemeral:
+            stack.udp_ephemeral_ports.release(self.local_ip_address, self.local_port)
         self.logger.debug(f"Closed UDP socket {self.socket_id}")
 
     def process_packet(self, packet):